@@ -0,0 +1,63 @@
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from models import db, AnalysisJob
+
+# Background analysis threads per web worker; jobs beyond this wait in the queue
+JOB_WORKERS = int(os.environ.get('QPCR_JOB_WORKERS', 2))
+
+_executor = None
+
+def get_job_executor():
+    """Return this worker's job executor, starting it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='qpcr-job')
+    return _executor
+
+def create_job(filename, wells_total):
+    """Insert a queued job row and return it"""
+    job = AnalysisJob(id=uuid.uuid4().hex, status='queued', filename=filename,
+                      wells_total=wells_total, wells_done=0)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def start_job(app, job_id, work):
+    """Run work(progress) in the background; work returns the JSON-serializable result"""
+    return get_job_executor().submit(_run_job, app, job_id, work)
+
+def _update_job(job_id, **fields):
+    AnalysisJob.query.filter_by(id=job_id).update(fields)
+    db.session.commit()
+
+def _run_job(app, job_id, work):
+    with app.app_context():
+        try:
+            _update_job(job_id, status='running', started_at=datetime.utcnow())
+            
+            def progress(done, total):
+                _update_job(job_id, wells_done=done)
+            
+            result = work(progress)
+            _update_job(
+                job_id,
+                status='completed',
+                wells_done=AnalysisJob.wells_total,
+                session_id=result.get('session_id'),
+                result=json.dumps(result),
+                finished_at=datetime.utcnow()
+            )
+        except Exception as e:
+            db.session.rollback()
+            print(f"Analysis job {job_id} failed: {e}")
+            try:
+                _update_job(job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+            except Exception as db_error:
+                db.session.rollback()
+                print(f"Could not record failure of job {job_id}: {db_error}")
+        finally:
+            db.session.remove()
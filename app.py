@@ -1,14 +1,40 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, g, abort, stream_with_context
+import importlib.util
+import base64
+import hashlib
 import json
 import os
-from qpcr_analyzer import process_csv_data, validate_csv_structure
-from models import db, AnalysisSession, WellResult
-from sqlalchemy.orm import DeclarativeBase
+import time
+import zipfile
+from datetime import datetime, timedelta
+import click
+import numpy as np
+from qpcr_analyzer import (process_csv_data, batch_analyze_plates, validate_csv_structure, validate_plate_array,
+                           classify_curves, quality_thresholds, ANALYZER_VERSION, ROBUST_FIT_ENABLED)
+from plate_csv import parse_plate_csv, is_plate_archive, iter_archive_plates, MAX_BATCH_PLATES
+from models import db, AnalysisSession, WellResult, AnalysisJob
+from analysis_jobs import create_job, start_job
+from result_cache import WellResultCache, RESULT_CACHE_SIZE
+from migrations import (ensure_curve_storage_schema, ensure_columns, ensure_indexes, migrate_curve_storage,
+                        backfill_session_assays)
+from fit_priors import AssayPriors, WARM_START_ENABLED, assay_key
+from session_stats import SessionStats, BUCKET_SIZES
+from curve_transport import compact_well
+from well_query import (WELLS_PAGE_SIZE, WELLS_MAX_PAGE_SIZE, compare_well, decode_well_cursor, parse_sort,
+                        query_wells, session_conditions, well_conditions)
+from response_cache import CompressedResponseCache, RESPONSE_CACHE_MB, compress, decompress, preferred_encoding
+from session_export import EXPORT_FORMATS, iter_arrow, iter_csv
+from session_retention import delete_sessions, prune_expired_sessions, start_retention_pruner, RETENTION_DAYS
+from metrics import METRICS_ENABLED, NULL_TIMER, REQUEST_SECONDS, render_prometheus, start_timer
+from sqlalchemy import and_, or_, select, true, update
+from sqlalchemy.orm import DeclarativeBase, undefer_group
+from werkzeug.exceptions import HTTPException
 
 class Base(DeclarativeBase):
     pass
 
-app = Flask(__name__)
+# Static files go through static_files below, which sets the cache headers
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY") or "qpcr_analyzer_secret_key_2025"
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///mydb.db")
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
@@ -20,126 +46,998 @@ db.init_app(app)
 
 with app.app_context():
     db.create_all()
+    ensure_curve_storage_schema(db.engine)
+    ensure_columns(db.engine)
+    ensure_indexes(db.engine)
+    backfill_session_assays(db.engine)
+
+@app.cli.command('prune-sessions')
+@click.option('--days', type=float, default=RETENTION_DAYS, show_default=True,
+              help='Delete sessions uploaded more than this many days ago')
+def prune_sessions_command(days):
+    """Delete expired sessions and compact the database"""
+    sessions, wells = prune_expired_sessions(days)
+    print(f"Pruned {sessions} sessions ({wells} wells)")
+
+@app.cli.command('migrate-curve-storage')
+def migrate_curve_storage_command():
+    """Convert JSON curve columns of existing well results to packed binary arrays"""
+    converted = migrate_curve_storage()
+    print(f"Converted {converted} well results to packed curve storage")
+
+# Per-well results keyed by data hash, so re-uploaded runs skip refitting
+result_cache = WellResultCache() if RESULT_CACHE_SIZE > 0 else None
+
+# Per-assay starting points for the fitter, built from stored sessions
+assay_priors = AssayPriors()
+
+# Aggregates for /stats, cached per closed time bucket
+session_stats = SessionStats()
+
+# Serialized /sessions/<id> responses, stored compressed
+session_responses = CompressedResponseCache() if RESPONSE_CACHE_MB > 0 else None
+
+# Cache lifetime of static assets requested with a content version (?v=...)
+STATIC_MAX_AGE = int(os.environ.get('QPCR_STATIC_MAX_AGE', 31536000))
+
+def sessions_deleted(session_ids=None):
+    """Drop in-process aggregates and cached responses that may include deleted sessions"""
+    session_stats.invalidate()
+    assay_priors.clear()
+    if session_responses is not None:
+        if session_ids is None:
+            session_responses.clear()
+        else:
+            for session_id in session_ids:
+                session_responses.evict_session(session_id)
+
+# Background retention pruning (QPCR_RETENTION_DAYS)
+start_retention_pruner(app, on_pruned=sessions_deleted)
+
+# Page sizes for the session listing
+SESSIONS_PAGE_SIZE = int(os.environ.get('QPCR_SESSIONS_PAGE_SIZE', '50'))
+SESSIONS_MAX_PAGE_SIZE = 500
+
+@app.before_request
+def start_request_clock():
+    if METRICS_ENABLED:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    if METRICS_ENABLED and 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start,
+                                endpoint=request.endpoint or 'unmatched', status=response.status_code)
+    return response
+
+def request_timer():
+    """Stage timer for this request; ?timing=1 adds the breakdown to processing_info"""
+    return start_timer(breakdown=request.args.get('timing') == '1')
+
+def curve_transport():
+    """Compact curve options of this request: None for full lists, else compact_well keyword arguments.
+    
+    ?curves=compact switches to compact curves; downsample=N LTTB-downsamples
+    raw data and precision=full keeps raw values lossless.
+    """
+    if request.args.get('curves') != 'compact':
+        return None
+    downsample = request.args.get('downsample', type=int)
+    return {
+        'downsample': downsample if downsample and downsample > 0 else None,
+        'full_precision': request.args.get('precision') == 'full'
+    }
+
+def compact_results(results, transport):
+    """Analysis response with compact curves; the wells are copied, the cached results stay as they are"""
+    if transport is None or 'individual_results' not in results:
+        return results
+    return {**results, 'individual_results': {
+        well_id: compact_well(analysis, **transport) for well_id, analysis in results['individual_results'].items()
+    }}
+
+def request_assay(filename):
+    """Assay of an uploaded run: ?assay= or the X-Assay header, otherwise derived from the file name"""
+    return request.args.get('assay') or request.headers.get('X-Assay') or assay_key(filename)
+
+def warm_start_priors(assay, well_ids, timer=NULL_TIMER):
+    """Warm-start priors for one plate, or None when warm starts are off (QPCR_WARM_START, ?warm_start=0/1)"""
+    if not parse_bool_arg('warm_start', WARM_START_ENABLED):
+        return None
+    with timer.stage('warm_start_priors'):
+        return assay_priors.for_plate(assay, well_ids)
+
+def robust_fit():
+    """Whether this request screens wells and fits with a robust loss (QPCR_ROBUST_FIT, ?robust=0/1)"""
+    return parse_bool_arg('robust', ROBUST_FIT_ENABLED)
+
+# index.html with versioned asset URLs, rebuilt when any of the files change
+_index_page = {}
+
+def render_index_page():
+    """index.html with ?v=<content hash> on the script and stylesheet URLs"""
+    paths = ['index.html', 'static/script.js', 'static/style.css']
+    stamp = tuple(os.path.getmtime(path) for path in paths)
+    if _index_page.get('stamp') != stamp:
+        with open('index.html') as f:
+            html = f.read()
+        for path in paths[1:]:
+            with open(path, 'rb') as f:
+                version = hashlib.sha256(f.read()).hexdigest()[:12]
+            html = html.replace(f'"{path}"', f'"{path}?v={version}"')
+        _index_page.update(stamp=stamp, html=html, etag=hashlib.sha256(html.encode()).hexdigest()[:16])
+    return _index_page['html'], _index_page['etag']
 
 @app.route('/')
 def index():
-    return send_from_directory('.', 'index.html')
+    html, etag = render_index_page()
+    response = app.response_class(html, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/static/<path:filename>')
 def static_files(filename):
-    return send_from_directory('static', filename)
+    """Static assets; versioned URLs (?v=) never change and are cached for QPCR_STATIC_MAX_AGE"""
+    if not request.args.get('v'):
+        return send_from_directory('static', filename)
+    response = send_from_directory('static', filename, max_age=STATIC_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/analyze', methods=['POST'])
 def analyze_data():
     """Endpoint to analyze qPCR data and save results to database"""
     try:
-        # Get JSON data from request
-        data = request.get_json()
-        filename = request.headers.get('X-Filename', 'unknown.csv')
+        timer = request_timer()
+        data, filename, warnings, error_response = read_json_plate(timer)
+        if error_response:
+            return error_response
         
-        if not data:
-            return jsonify({'error': 'No data provided', 'success': False}), 400
+        return run_analysis(data, filename, warnings, timer)
         
-        # Validate data structure
-        errors, warnings = validate_csv_structure(data)
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}',
+            'success': False
+        }), 500
+
+@app.route('/analyze/upload', methods=['POST'])
+def analyze_upload():
+    """Endpoint to analyze a raw qPCR CSV (multipart 'file' field or request body), parsed server-side"""
+    try:
+        timer = request_timer()
+        data, filename, warnings, error_response = read_csv_plate(timer)
+        if error_response:
+            return error_response
         
-        if errors:
+        return run_analysis(data, filename, warnings, timer)
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}',
+            'success': False
+        }), 500
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze many plates in one request: CSV files and zip archives of CSVs, or JSON {"plates": [...]}"""
+    try:
+        timer = request_timer()
+        plates = read_batch_plates(timer)
+        if not plates:
+            return jsonify({'error': 'No plates provided', 'success': False}), 400
+        if len(plates) > MAX_BATCH_PLATES:
             return jsonify({
-                'error': 'Data validation failed',
-                'validation_errors': errors,
-                'validation_warnings': warnings,
+                'error': f'Too many plates ({len(plates)}); at most {MAX_BATCH_PLATES} per batch',
                 'success': False
             }), 400
         
-        # Process the data
-        results = process_csv_data(data)
+        results = analyze_and_save_batch(plates, timer, details=request.args.get('details') == '1')
         
-        if not results.get('success', False):
-            return jsonify(results), 500
+        with timer.stage('jsonify'):
+            response = jsonify(results)
+        timer.finish()
         
-        # Save results to database
-        try:
-            session = AnalysisSession(
-                filename=filename,
-                total_wells=results['summary']['total_wells'],
-                good_curves=results['summary']['good_curves'],
-                success_rate=results['summary']['success_rate'],
-                cycle_min=results['cycle_info']['min'] if results.get('cycle_info') else None,
-                cycle_max=results['cycle_info']['max'] if results.get('cycle_info') else None,
-                cycle_count=results['cycle_info']['count'] if results.get('cycle_info') else None
-            )
+        # Nothing could be analyzed: the per-plate errors explain why
+        return response if results['summary']['analyzed'] else (response, 400)
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}',
+            'success': False
+        }), 500
+
+def read_batch_plates(timer=NULL_TIMER):
+    """Load every plate of a batch request; plates that fail to parse or validate carry an 'error' instead of 'data'"""
+    if request.is_json:
+        body = request.get_json() or {}
+        entries = body.get('plates') if isinstance(body, dict) else None
+        if not isinstance(entries, list):
+            return []
+        plates = []
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                plates.append({'filename': f'plate_{i + 1}.csv', 'error': 'Plate must be a JSON object'})
+                continue
+            filename = entry.get('filename') or f'plate_{i + 1}.csv'
+            data = entry.get('data')
+            if not data:
+                plates.append({'filename': filename, 'error': 'No data provided'})
+                continue
+            with timer.stage('validation'):
+                errors, warnings = validate_csv_structure(data)
+            plates.append(batch_plate(filename, data, warnings, errors))
+        return plates
+    
+    plates = []
+    for field in request.files:
+        for upload in request.files.getlist(field):
+            filename = upload.filename or f'plate_{len(plates) + 1}.csv'
+            if is_plate_archive(filename, upload.stream):
+                try:
+                    for name, member in iter_archive_plates(upload.stream, filename):
+                        plates.append(load_batch_csv(name, member, timer))
+                        if len(plates) > MAX_BATCH_PLATES:
+                            # Enough to reject the batch; do not parse the rest
+                            return plates
+                except zipfile.BadZipFile as e:
+                    plates.append({'filename': filename, 'error': f'Invalid archive: {str(e)}'})
+            else:
+                plates.append(load_batch_csv(filename, upload.stream, timer))
+    return plates
+
+def load_batch_csv(filename, stream, timer=NULL_TIMER):
+    try:
+        data, warnings, errors = load_csv_plate(stream, timer)
+    except ValueError as e:
+        return {'filename': filename, 'error': f'Invalid CSV: {str(e)}'}
+    return batch_plate(filename, data, warnings, errors)
+
+def batch_plate(filename, data, warnings, errors):
+    if errors:
+        return {'filename': filename, 'error': 'Data validation failed',
+                'validation_errors': errors, 'validation_warnings': warnings}
+    # Each plate of a batch is its own run; ?assay= / X-Assay still applies to all of them
+    return {'filename': filename, 'data': data, 'warnings': warnings, 'assay': request_assay(filename)}
+
+def analyze_and_save_batch(plates, timer=NULL_TIMER, details=False):
+    """Fit all valid plates together, store one session per plate and build the batch response"""
+    valid = {i: plate['data'] for i, plate in enumerate(plates) if 'data' in plate}
+    
+    plate_results = {}
+    engine_info = {}
+    if valid:
+        priors = None
+        if parse_bool_arg('warm_start', WARM_START_ENABLED):
+            priors = {i: warm_start_priors(plates[i]['assay'], data, timer) for i, data in valid.items()}
+        with timer.stage('analysis'):
+            plate_results, engine_info = batch_analyze_plates(valid, cache=result_cache, timer=timer, priors=priors,
+                                                              robust=robust_fit())
+    
+    start = time.perf_counter()
+    if plate_results:
+        save_batch_results(plates, plate_results, timer)
+    save_seconds = time.perf_counter() - start
+    
+    entries = []
+    for i, plate in enumerate(plates):
+        if i not in plate_results:
+            entries.append({'success': False, **{k: v for k, v in plate.items() if k != 'data'}})
+            continue
+        results = plate_results[i]
+        entry = {
+            'filename': plate['filename'],
+            'success': True,
+            'session_id': results.get('session_id'),
+            'summary': results['summary'],
+            'cycle_info': results['cycle_info'],
+            'good_curves': results['good_curves']
+        }
+        if plate['warnings']:
+            entry['validation_warnings'] = plate['warnings']
+        if 'database_warning' in results:
+            entry['database_warning'] = results['database_warning']
+        if details:
+            entry['individual_results'] = results['individual_results']
+        entries.append(entry)
+    
+    total_wells = sum(r['summary']['total_wells'] for r in plate_results.values())
+    good_curves = sum(r['summary']['good_curves'] for r in plate_results.values())
+    processing_info = {
+        'processing_timestamp': datetime.now().isoformat(),
+        'total_wells_processed': total_wells,
+        'fit_engine': engine_info.get('fit_engine'),
+        'result_cache': engine_info.get('result_cache'),
+        'database_save_seconds': round(save_seconds, 4)
+    }
+    if timer.breakdown:
+        processing_info['timings'] = timer.summary()
+    
+    return {
+        'success': bool(plate_results),
+        'plates': entries,
+        'summary': {
+            'plates': len(plates),
+            'analyzed': len(plate_results),
+            'failed': len(plates) - len(plate_results),
+            'total_wells': total_wells,
+            'good_curves': good_curves,
+            'success_rate': good_curves / total_wells * 100 if total_wells > 0 else 0
+        },
+        'processing_info': processing_info
+    }
+
+def save_batch_results(plates, plate_results, timer=NULL_TIMER):
+    """Store every analyzed plate as its own session in one transaction, falling back to one transaction per plate"""
+    try:
+        sessions = {i: AnalysisSession.from_analysis_results(plates[i]['filename'], results, plates[i]['assay'])
+                    for i, results in plate_results.items()}
+        
+        with timer.stage('db_insert'):
+            db.session.add_all(sessions.values())
+            db.session.flush()  # Get the session IDs
             
+            # Wells of all plates go in with a single executemany
+            WellResult.bulk_insert_many([
+                (sessions[i].id, results['individual_results'], plates[i]['data'])
+                for i, results in plate_results.items()
+            ])
+        
+        # Read the IDs before commit expires the sessions
+        session_ids = {i: session.id for i, session in sessions.items()}
+        
+        with timer.stage('db_commit'):
+            db.session.commit()
+        
+        for i, session_id in session_ids.items():
+            plate_results[i]['session_id'] = session_id
+    
+    except Exception as db_error:
+        db.session.rollback()
+        print(f"Database error saving batch, saving plates one by one: {db_error}")
+        # One bad plate should not cost the others their sessions
+        for i, results in plate_results.items():
+            save_analysis_results(plates[i]['filename'], results, plates[i]['data'], timer, plates[i]['assay'])
+
+def read_json_plate(timer=NULL_TIMER):
+    """Load and validate a JSON well dict from the request: (data, filename, warnings, error_response)"""
+    # Get JSON data from request
+    with timer.stage('json_parse'):
+        data = request.get_json()
+    filename = request.headers.get('X-Filename', 'unknown.csv')
+    
+    if not data:
+        return None, filename, [], (jsonify({'error': 'No data provided', 'success': False}), 400)
+    
+    # Validate data structure
+    with timer.stage('validation'):
+        errors, warnings = validate_csv_structure(data)
+    
+    if errors:
+        return None, filename, warnings, validation_failed(errors, warnings)
+    
+    return data, filename, warnings, None
+
+def read_csv_plate(timer=NULL_TIMER):
+    """Parse and validate a raw CSV upload from the request: (data, filename, warnings, error_response)"""
+    if 'file' in request.files:
+        upload = request.files['file']
+        stream = upload.stream
+        filename = request.headers.get('X-Filename') or upload.filename or 'unknown.csv'
+    else:
+        stream = request.stream
+        filename = request.headers.get('X-Filename', 'unknown.csv')
+    
+    try:
+        data, warnings, errors = load_csv_plate(stream, timer)
+    except ValueError as e:
+        return None, filename, [], (jsonify({'error': f'Invalid CSV: {str(e)}', 'success': False}), 400)
+    
+    if errors:
+        return None, filename, warnings, validation_failed(errors, warnings)
+    
+    return data, filename, warnings, None
+
+def load_csv_plate(stream, timer=NULL_TIMER):
+    """Parse and validate one plate CSV stream: (data, warnings, errors); raises ValueError on malformed CSV"""
+    # Parse row by row straight into the plate array
+    with timer.stage('csv_parse'):
+        well_names, cycles, rfu, parse_warnings = parse_plate_csv(stream)
+    
+    with timer.stage('validation'):
+        errors, warnings = validate_plate_array(well_names, cycles, rfu)
+    warnings = parse_warnings + warnings
+    
+    if errors:
+        return None, warnings, errors
+    
+    # Wells are row views of the plate array, not per-well Python lists
+    data = {name: {'cycles': cycles, 'rfu': rfu[i]} for i, name in enumerate(well_names)}
+    return data, warnings, []
+
+def validation_failed(errors, warnings):
+    return jsonify({
+        'error': 'Data validation failed',
+        'validation_errors': errors,
+        'validation_warnings': warnings,
+        'success': False
+    }), 400
+
+def run_analysis(data, filename, warnings, timer=NULL_TIMER):
+    """Analyze a validated plate, save it and build the response"""
+    assay = request_assay(filename)
+    priors = warm_start_priors(assay, data, timer)
+    results = analyze_and_save(data, filename, warnings, timer=timer, assay=assay, priors=priors,
+                               robust=robust_fit())
+    
+    with timer.stage('jsonify'):
+        response = jsonify(compact_results(results, curve_transport()))
+    timer.finish()
+    
+    if not results.get('success', False):
+        return response, 500
+    
+    return response
+
+def analyze_and_save(data, filename, warnings, progress=None, timer=NULL_TIMER, assay=None, priors=None, robust=False):
+    """Process a validated plate and store it; returns the response body"""
+    # Process the data
+    with timer.stage('analysis'):
+        results = process_csv_data(data, cache=result_cache, progress=progress, timer=timer, priors=priors,
+                                   robust=robust)
+    
+    if not results.get('success', False):
+        return results
+    
+    # Save results to database
+    save_analysis_results(filename, results, data, timer, assay)
+    
+    # Include validation warnings in successful response
+    if warnings:
+        results['validation_warnings'] = warnings
+    
+    # Everything up to here; serializing the response itself is only in /metrics
+    if timer.breakdown:
+        results['processing_info']['timings'] = timer.summary()
+    
+    return results
+
+def save_analysis_results(filename, results, data, timer=NULL_TIMER, assay=None):
+    """Store an analysis session and its wells in one transaction; on failure the results are returned unsaved"""
+    start = time.perf_counter()
+    try:
+        session = AnalysisSession.from_analysis_results(filename, results, assay)
+        
+        with timer.stage('db_insert'):
             db.session.add(session)
             db.session.flush()  # Get the session ID
             
-            # Save individual well results
-            for well_id, well_result in results['individual_results'].items():
-                well_record = WellResult.from_analysis_result(
-                    session.id, well_id, well_result, data.get(well_id, {})
-                )
-                db.session.add(well_record)
-            
+            # Save individual well results with a single executemany
+            WellResult.bulk_insert(session.id, results['individual_results'], data)
+        
+        with timer.stage('db_commit'):
             db.session.commit()
-            
-            results['session_id'] = session.id
-            
-        except Exception as db_error:
-            db.session.rollback()
-            print(f"Database error: {db_error}")
-            # Continue without database save - don't fail the analysis
-            results['database_warning'] = 'Results analyzed but not saved to database'
         
-        # Include validation warnings in successful response
-        if warnings:
-            results['validation_warnings'] = warnings
+        results['session_id'] = session.id
+        
+    except Exception as db_error:
+        db.session.rollback()
+        print(f"Database error: {db_error}")
+        # Continue without database save - don't fail the analysis
+        results['database_warning'] = 'Results analyzed but not saved to database'
+    
+    if 'processing_info' in results:
+        results['processing_info']['database_save_seconds'] = round(time.perf_counter() - start, 4)
+
+@app.route('/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Queue a plate (JSON like /analyze, or a raw CSV like /analyze/upload) for background analysis"""
+    try:
+        timer = request_timer()
+        if request.is_json:
+            data, filename, warnings, error_response = read_json_plate(timer)
+        else:
+            data, filename, warnings, error_response = read_csv_plate(timer)
+        if error_response:
+            return error_response
+        
+        # Priors are looked up here, while the request's database session is at hand
+        assay = request_assay(filename)
+        priors = warm_start_priors(assay, data, timer)
+        robust = robust_fit()
+        job = create_job(filename, len(data))
+        
+        def work(progress):
+            results = analyze_and_save(data, filename, warnings, progress=progress, timer=timer,
+                                       assay=assay, priors=priors, robust=robust)
+            timer.finish()
+            if not results.get('success', False):
+                raise RuntimeError(results.get('error', 'Analysis failed'))
+            return results
         
-        return jsonify(results)
+        start_job(app, job.id, work)
+        
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/jobs/{job.id}',
+            'result_url': f'/jobs/{job.id}/result'
+        }), 202
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'error': f'Server error: {str(e)}',
             'success': False
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Report the status and progress of an analysis job"""
+    try:
+        job = AnalysisJob.query.get_or_404(job_id)
+        return jsonify(job.to_dict())
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Return the analysis response of a finished job"""
+    try:
+        job = AnalysisJob.query.get_or_404(job_id)
+        
+        if job.status == 'failed':
+            return jsonify({'error': job.error, 'success': False, 'job': job.to_dict()}), 500
+        if job.status != 'completed':
+            return jsonify({'message': 'Job not finished', 'job': job.to_dict()}), 202
+        
+        # Stored already serialized, exactly as /analyze would have returned it
+        return app.response_class(job.result, mimetype='application/json')
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+def encode_session_cursor(session):
+    """Opaque cursor pointing just past a session in upload order"""
+    raw = f"{session.upload_timestamp.isoformat()}|{session.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_session_cursor(cursor):
+    timestamp, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(timestamp), int(session_id)
+
+def parse_bool_arg(name, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'no')
+
 @app.route('/sessions', methods=['GET'])
 def get_sessions():
-    """Get all analysis sessions"""
+    """List analysis sessions, newest first, one page at a time"""
     try:
-        sessions = AnalysisSession.query.order_by(AnalysisSession.upload_timestamp.desc()).all()
-        return jsonify({
+        limit = min(max(request.args.get('limit', SESSIONS_PAGE_SIZE, type=int), 1), SESSIONS_MAX_PAGE_SIZE)
+        query = AnalysisSession.query
+        
+        try:
+            if request.args.get('from'):
+                query = query.filter(AnalysisSession.upload_timestamp >= datetime.fromisoformat(request.args['from']))
+            if request.args.get('to'):
+                query = query.filter(AnalysisSession.upload_timestamp <= datetime.fromisoformat(request.args['to']))
+            if request.args.get('min_success_rate'):
+                query = query.filter(AnalysisSession.success_rate >= float(request.args['min_success_rate']))
+            if request.args.get('max_success_rate'):
+                query = query.filter(AnalysisSession.success_rate <= float(request.args['max_success_rate']))
+            cursor = decode_session_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+        
+        if request.args.get('filename'):
+            query = query.filter(AnalysisSession.filename.ilike(f"%{request.args['filename']}%"))
+        
+        total = query.count() if parse_bool_arg('include_total', True) else None
+        
+        if cursor:
+            # Keyset pagination: continue strictly after the last session of the previous page
+            timestamp, session_id = cursor
+            query = query.filter(or_(
+                AnalysisSession.upload_timestamp < timestamp,
+                and_(AnalysisSession.upload_timestamp == timestamp, AnalysisSession.id < session_id)
+            ))
+        
+        sessions = query.order_by(
+            AnalysisSession.upload_timestamp.desc(), AnalysisSession.id.desc()
+        ).limit(limit + 1).all()
+        
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
+        response = {
             'sessions': [session.to_dict() for session in sessions],
-            'total': len(sessions)
-        })
+            'count': len(sessions),
+            'next_cursor': encode_session_cursor(sessions[-1]) if has_more else None
+        }
+        if total is not None:
+            response['total'] = total
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/wells', methods=['GET'])
+def get_wells():
+    """Wells across sessions, filtered and sorted on indexed columns, one page at a time; curves are never loaded"""
+    try:
+        limit = min(max(request.args.get('limit', WELLS_PAGE_SIZE, type=int), 1), WELLS_MAX_PAGE_SIZE)
+        try:
+            conditions = session_conditions(request.args) + well_conditions(request.args)
+            sort_name, descending = parse_sort(request.args.get('sort'))
+            cursor = decode_well_cursor(request.args['cursor'], sort_name) if request.args.get('cursor') else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+        
+        wells, next_cursor, total = query_wells(conditions, sort_name, descending, limit, cursor,
+                                                include_total=parse_bool_arg('include_total', False))
+        response = {
+            'wells': wells,
+            'count': len(wells),
+            'next_cursor': next_cursor
+        }
+        if total is not None:
+            response['total'] = total
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/wells/compare', methods=['GET'])
+def compare_wells():
+    """One well position (?well_id=A1) across sessions (session_ids, from/to, assay), as aligned parameter arrays"""
+    try:
+        well_id = request.args.get('well_id', '')
+        if not well_id or ',' in well_id:
+            return jsonify({'error': 'Give exactly one well_id to compare'}), 400
+        try:
+            return jsonify(compare_well(well_id, session_conditions(request.args)))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """Success rate over time, anomaly frequencies, r2/midpoint histograms and per-well failure rates, aggregated in SQL"""
+    try:
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in BUCKET_SIZES:
+            return jsonify({'error': f"Invalid bucket '{bucket}'; use one of {', '.join(BUCKET_SIZES)}"}), 400
+        try:
+            start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+            end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+        
+        return jsonify(session_stats.summary(start, end, bucket, request.args.get('assay')))
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/sessions/<int:session_id>/export', methods=['GET'])
+def export_session(session_id):
+    """Stream one session's well results as CSV, Parquet or Arrow; ?curves=1 adds the raw and fitted curves"""
+    try:
+        if db.session.get(AnalysisSession, session_id) is None:
+            abort(404)
+        return export_response(AnalysisSession.id == session_id, f'session_{session_id}')
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/sessions/export', methods=['GET'])
+def export_sessions():
+    """Stream the well results of many sessions: ?ids=1,2,3, or from/to (ISO dates) and assay; everything if none given"""
+    try:
+        conditions = []
+        try:
+            if request.args.get('ids'):
+                conditions.append(AnalysisSession.id.in_([int(i) for i in request.args['ids'].split(',') if i]))
+            if request.args.get('from'):
+                conditions.append(AnalysisSession.upload_timestamp >= datetime.fromisoformat(request.args['from']))
+            if request.args.get('to'):
+                conditions.append(AnalysisSession.upload_timestamp <= datetime.fromisoformat(request.args['to']))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+        if request.args.get('assay'):
+            conditions.append(AnalysisSession.assay == request.args['assay'])
+        
+        return export_response(and_(true(), *conditions), 'sessions')
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+def export_response(session_filter, name):
+    """Generator response for an export; rows are read from the database while the response is sent"""
+    file_format = request.args.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Invalid format '{file_format}'; use one of {', '.join(EXPORT_FORMATS)}"}), 400
+    include_curves = parse_bool_arg('curves', False)
+    
+    if file_format == 'csv':
+        chunks = iter_csv(session_filter, include_curves)
+        mimetype = 'text/csv'
+    else:
+        if importlib.util.find_spec('pyarrow') is None:
+            return jsonify({'error': f'{file_format} export needs pyarrow (pip install pyarrow)'}), 400
+        chunks = iter_arrow(session_filter, include_curves, file_format)
+        mimetype = 'application/vnd.apache.parquet' if file_format == 'parquet' else 'application/vnd.apache.arrow.stream'
+    
+    return app.response_class(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{name}.{file_format}"'}
+    )
+
 @app.route('/sessions/<int:session_id>', methods=['GET'])
 def get_session_details(session_id):
-    """Get detailed results for a specific session"""
+    """Get detailed results for a specific session; ?curves=0 leaves out the curve arrays, ?curves=compact encodes them.
+    
+    Responses carry an ETag and Last-Modified so unchanged sessions are
+    answered with 304, and serialized bodies are kept compressed in
+    session_responses.
+    """
     try:
         session = AnalysisSession.query.get_or_404(session_id)
-        wells = WellResult.query.filter_by(session_id=session_id).all()
+        view = tuple(sorted((k, v) for k, v in request.args.items(multi=True) if k in SESSION_VIEW_ARGS))
+        etag = session_etag(session, view)
+        last_modified = session.last_modified.replace(microsecond=0)
         
-        return jsonify({
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and since.replace(tzinfo=None) >= last_modified
+        if not_modified:
+            return session_response(b'', etag, last_modified, status=304)
+        
+        encoding = preferred_encoding(request.accept_encodings)
+        if session_responses is not None:
+            cached = session_responses.get(session_id, view, etag)
+            if cached is not None:
+                return session_response(recode(cached[1], cached[0], encoding), etag, last_modified, encoding)
+        
+        transport = curve_transport()
+        include_curves = transport is not None or parse_bool_arg('curves', True)
+        
+        query = WellResult.query.filter_by(session_id=session_id)
+        if include_curves:
+            # Load the deferred curve columns in the same query instead of one per well
+            query = query.options(undefer_group('curves'))
+        wells = [well.to_dict(include_curves=include_curves) for well in query.all()]
+        if transport is not None:
+            wells = [compact_well(well, **transport) for well in wells]
+        
+        body = jsonify({
             'session': session.to_dict(),
-            'wells': [well.to_dict() for well in wells]
-        })
+            'wells': wells
+        }).get_data()
+        
+        if session_responses is not None:
+            stored_encoding = encoding or 'gzip'
+            stored = session_responses.put(session_id, view, etag, body, stored_encoding)
+            body = recode(stored, stored_encoding, encoding) if encoding else body
+        elif encoding:
+            body = compress(body, encoding)
+        return session_response(body, etag, last_modified, encoding)
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
+# Query arguments that change the /sessions/<id> representation
+SESSION_VIEW_ARGS = ('curves', 'downsample', 'precision')
+
+def session_etag(session, view):
+    """Weak validator of one view of a stored session; changes with the analyzer version and on reclassification"""
+    key = f"{session.id}:{ANALYZER_VERSION}:{session.last_modified.isoformat()}:{view!r}"
+    return hashlib.sha256(key.encode()).hexdigest()[:20]
+
+def recode(body, encoding, wanted):
+    """Body compressed with encoding, converted to the wanted content coding (None for identity)"""
+    if encoding == wanted:
+        return body
+    body = decompress(body, encoding)
+    return compress(body, wanted) if wanted else body
+
+def session_response(body, etag, last_modified, encoding=None, status=200):
+    response = app.response_class(body, status=status, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    # Clients always revalidate; an unchanged session then costs one primary-key lookup and a 304
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+    if encoding and status == 200:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.route('/sessions/<int:session_id>/wells/<well_id>', methods=['GET'])
+def get_session_well(session_id, well_id):
+    """Get one well of a session, including its curves (?curves=compact as for the whole session)"""
+    try:
+        well = WellResult.query.filter_by(session_id=session_id, well_id=well_id).options(
+            undefer_group('curves')
+        ).first()
+        if well is None:
+            return jsonify({'error': f'Well {well_id} not found in session {session_id}'}), 404
+        
+        transport = curve_transport()
+        well = well.to_dict()
+        return jsonify({'well': compact_well(well, **transport) if transport is not None else well})
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/sessions/<int:session_id>/reclassify', methods=['POST'])
+def reclassify_session(session_id):
+    """Re-evaluate is_good_scurve of a stored session under new thresholds, from stored metrics only"""
+    try:
+        start = time.perf_counter()
+        session = AnalysisSession.query.get_or_404(session_id)
+        body = request.get_json(silent=True) or {}
+        
+        try:
+            thresholds = quality_thresholds(body.get('thresholds'))
+        except ValueError as e:
+            return jsonify({'error': str(e), 'success': False}), 400
+        dry_run = body.get('dry_run', False)
+        if not isinstance(dry_run, bool):
+            return jsonify({'error': 'dry_run must be true or false', 'success': False}), 400
+        
+        result = reclassify_wells(session, thresholds, dry_run)
+        if not dry_run:
+            session_stats.invalidate()
+            if session_responses is not None:
+                session_responses.evict_session(session_id)
+        result['reclassify_seconds'] = round(time.perf_counter() - start, 4)
+        return jsonify(result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Database error: {str(e)}', 'success': False}), 500
+
+def reclassify_wells(session, thresholds, dry_run=False):
+    """Classify every well of a session with classify_curves and store the changes with set-based updates"""
+    rows = db.session.execute(
+        select(WellResult.id, WellResult.well_id, WellResult.is_good_scurve, WellResult.r2_score,
+               WellResult.steepness, WellResult.amplitude, WellResult.rfu_range,
+               WellResult.data_points, WellResult.anomalies)
+        .where(WellResult.session_id == session.id)
+        .order_by(WellResult.id)
+    ).all()
+    
+    ids = np.array([row.id for row in rows], dtype=np.int64)
+    rfu_range = np.array([row.rfu_range for row in rows], dtype=float)
+    
+    # Wells saved before rfu_range was stored: derive it once from the raw curve
+    backfill = {}
+    missing = [int(i) for i in ids[np.isnan(rfu_range)]]
+    if missing:
+        position = {row_id: i for i, row_id in enumerate(ids.tolist())}
+        for row_id, raw_rfu in db.session.execute(
+            select(WellResult.id, WellResult.raw_rfu).where(WellResult.id.in_(missing))
+        ):
+            if raw_rfu is not None and np.isfinite(raw_rfu).any():
+                rfu_range[position[row_id]] = np.nanmax(raw_rfu) - np.nanmin(raw_rfu)
+                backfill[row_id] = float(rfu_range[position[row_id]])
+    
+    anomalies = None
+    if thresholds['reject_anomalies']:
+        anomalies = [json.loads(row.anomalies) if row.anomalies else [] for row in rows]
+    
+    was_good = np.array([bool(row.is_good_scurve) for row in rows], dtype=bool)
+    good = classify_curves(
+        [row.r2_score for row in rows],
+        [row.steepness for row in rows],
+        [row.amplitude for row in rows],
+        rfu_range,
+        np.array([row.data_points or 0 for row in rows]),
+        anomalies,
+        thresholds
+    ) if rows else np.zeros(0, dtype=bool)
+    
+    now_good = ids[good & ~was_good]
+    now_poor = ids[~good & was_good]
+    previous_good = session.good_curves
+    good_curves = int(good.sum())
+    total = session.total_wells or len(rows)
+    success_rate = good_curves / total * 100 if total > 0 else 0
+    
+    if not dry_run:
+        options = {'synchronize_session': False}
+        if now_good.size:
+            db.session.execute(update(WellResult).where(WellResult.id.in_(now_good.tolist()))
+                               .values(is_good_scurve=True), execution_options=options)
+        if now_poor.size:
+            db.session.execute(update(WellResult).where(WellResult.id.in_(now_poor.tolist()))
+                               .values(is_good_scurve=False), execution_options=options)
+        if backfill:
+            db.session.execute(update(WellResult), [{'id': k, 'rfu_range': v} for k, v in backfill.items()])
+        session.good_curves = good_curves
+        session.success_rate = success_rate
+        session.updated_at = datetime.utcnow()  # Gives cached views of the session a new ETag
+        db.session.commit()
+    
+    # A dry run reports the counts the session would get
+    summary = session.to_dict()
+    summary.update(good_curves=good_curves, success_rate=success_rate)
+    well_ids = {row.id: row.well_id for row in rows}
+    return {
+        'session': summary,
+        'thresholds': thresholds,
+        'dry_run': dry_run,
+        'previous_good_curves': previous_good,
+        'good_curves': good_curves,
+        'now_good': [well_ids[i] for i in now_good.tolist()],
+        'now_poor': [well_ids[i] for i in now_poor.tolist()],
+        'success': True
+    }
+
 @app.route('/sessions/<int:session_id>', methods=['DELETE'])
 def delete_session(session_id):
     """Delete a specific session and its results"""
     try:
-        session = AnalysisSession.query.get_or_404(session_id)
-        db.session.delete(session)  # Cascade will delete associated wells
-        db.session.commit()
+        if db.session.get(AnalysisSession, session_id) is None:
+            abort(404)
+        
+        # Set-based delete; the wells are never loaded
+        delete_sessions([session_id])
+        sessions_deleted([session_id])
         
         return jsonify({'message': 'Session deleted successfully'})
+    except HTTPException:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
+@app.route('/sessions', methods=['DELETE'])
+def delete_sessions_bulk():
+    """Delete many sessions in one transaction: JSON {"ids": [...]}, {"before": iso}, {"older_than_days": n} or {"all": true}"""
+    try:
+        body = request.get_json(silent=True) or {}
+        try:
+            if body.get('ids') is not None:
+                if not isinstance(body['ids'], list):
+                    raise ValueError('ids must be a list')
+                # Only JSON integers; floats would truncate and booleans are ints to Python
+                if not all(isinstance(i, int) and not isinstance(i, bool) for i in body['ids']):
+                    raise ValueError('ids must be integers')
+                selection = {'session_ids': body['ids']}
+            elif body.get('before'):
+                selection = {'before': datetime.fromisoformat(body['before'])}
+            elif body.get('older_than_days') is not None:
+                selection = {'before': datetime.utcnow() - timedelta(days=float(body['older_than_days']))}
+            elif body.get('all') is True:
+                selection = {'delete_all': True}
+            else:
+                raise ValueError('Give ids, before, older_than_days or all')
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid request: {str(e)}', 'success': False}), 400
+        
+        start = time.perf_counter()
+        sessions, wells = delete_sessions(**selection)
+        sessions_deleted()
+        
+        return jsonify({
+            'success': True,
+            'deleted_sessions': sessions,
+            'deleted_wells': wells,
+            'delete_seconds': round(time.perf_counter() - start, 4)
+        })
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}', 'success': False}), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -149,6 +1047,13 @@ def health_check():
         'version': '2.1.0-database'
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Stage timings and fit statistics of this worker process, in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled (QPCR_METRICS=0)'}), 404
+    return app.response_class(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -0,0 +1,254 @@
+"""Time each stage of the analysis pipeline on synthetic plates and write the results as JSON"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Rows x columns of the standard plate formats
+PLATE_LAYOUTS = {96: (8, 12), 384: (16, 24), 1536: (32, 48)}
+
+ROW_NAMES = [chr(ord('A') + i) for i in range(26)] + ['AA', 'AB', 'AC', 'AD', 'AE', 'AF']
+
+def well_names(n_wells):
+    """Well ids in plate order (A1, A2, ...) for a standard layout, or numbered wells otherwise"""
+    if n_wells not in PLATE_LAYOUTS:
+        return [f'W{i + 1}' for i in range(n_wells)]
+    rows, cols = PLATE_LAYOUTS[n_wells]
+    return [f'{ROW_NAMES[r]}{c + 1}' for r in range(rows) for c in range(cols)]
+
+def _draw_kinds(rng, n_wells, good, flat, noisy, nan):
+    total = good + flat + noisy + nan
+    counts = np.floor(np.array([good, flat, noisy, nan]) / total * n_wells).astype(int)
+    counts[0] += n_wells - counts.sum()
+    kinds = np.repeat(['good', 'flat', 'noisy', 'nan'], counts)
+    rng.shuffle(kinds)
+    return kinds
+
+def well_kinds(n_wells=96, good=0.6, flat=0.2, noisy=0.15, nan=0.05, seed=0):
+    """Curve type of every well of the matching synthetic_plate"""
+    kinds = _draw_kinds(np.random.default_rng(seed), n_wells, good, flat, noisy, nan)
+    return dict(zip(well_names(n_wells), kinds.tolist()))
+
+def synthetic_plate(n_wells=96, n_cycles=40, good=0.6, flat=0.2, noisy=0.15, nan=0.05, seed=0):
+    """Well dict in the /analyze format with the given proportions of curve types
+
+    good:  clean sigmoids with 1% noise
+    flat:  negative wells, baseline plus small noise
+    noisy: sigmoids buried in heavy noise and drift
+    nan:   good sigmoids with a few missing readings
+    """
+    rng = np.random.default_rng(seed)
+    kinds = _draw_kinds(rng, n_wells, good, flat, noisy, nan)
+    
+    x = np.arange(1, n_cycles + 1, dtype=float)
+    cycles = x.tolist()
+    data = {}
+    for well_id, kind in zip(well_names(n_wells), kinds):
+        L = rng.uniform(500, 5000)
+        k = rng.uniform(0.3, 1.2)
+        x0 = rng.uniform(0.4, 0.85) * n_cycles
+        B = rng.uniform(50, 200)
+        if kind == 'flat':
+            rfu = B + rng.normal(0, 5, n_cycles)
+        elif kind == 'noisy':
+            rfu = L / (1 + np.exp(-k * (x - x0))) + B + rng.uniform(1, 4) * x + rng.normal(0, L * 0.15, n_cycles)
+        else:
+            rfu = L / (1 + np.exp(-k * (x - x0))) + B + rng.normal(0, L * 0.01, n_cycles)
+            if kind == 'nan':
+                rfu[rng.choice(n_cycles, size=max(1, n_cycles // 20), replace=False)] = np.nan
+        data[well_id] = {'cycles': cycles, 'rfu': rfu.tolist()}
+    return data
+
+def time_stage(func, repeat):
+    """Run func repeat times; returns (timing summary, result of the last run)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return {
+        'median_seconds': statistics.median(samples),
+        'min_seconds': min(samples),
+        'runs': repeat
+    }, result
+
+def clean_well(well_data):
+    """Finite points of one well, as the per-well functions expect"""
+    cycles = np.asarray(well_data['cycles'], dtype=float)
+    rfu = np.asarray(well_data['rfu'], dtype=float)
+    finite = np.isfinite(rfu)
+    return cycles[finite], rfu[finite]
+
+def evaluations_by_kind(well_ids, fits, kinds=None):
+    """Mean curve_fit evaluations over all fitted wells, and per curve type when kinds is given"""
+    groups = {'all': []}
+    for well_id, fit in zip(well_ids, fits):
+        if 'function_evaluations' not in fit:
+            continue
+        groups['all'].append(fit['function_evaluations'])
+        if kinds:
+            groups.setdefault(kinds[well_id], []).append(fit['function_evaluations'])
+    return {kind: statistics.mean(values) for kind, values in groups.items() if values}
+
+def benchmark_plate(app_module, data, repeat, per_well_sample, kinds=None):
+    """Timings of every pipeline stage for one plate; kinds (well id -> curve type) adds evaluation counts per type"""
+    from qpcr_analyzer import (validate_csv_structure, analyze_curve_quality,
+                               detect_curve_anomalies, batch_analyze_wells)
+    from flask import jsonify
+    
+    stages = {}
+    stages['validate_csv_structure'], _ = time_stage(lambda: validate_csv_structure(data), repeat)
+    
+    # Per-well fitting is slow on flat wells, so it runs on an evenly spaced sample
+    wells = [clean_well(w) for w in data.values()]
+    sample_ids = list(data)
+    if per_well_sample:
+        step = max(1, len(wells) // per_well_sample)
+        sample_ids = sample_ids[::step][:per_well_sample]
+    sample = [clean_well(data[w]) for w in sample_ids]
+    stages['analyze_curve_quality'], fits = time_stage(
+        lambda: [analyze_curve_quality(c, r) for c, r in sample], repeat)
+    stages['analyze_curve_quality']['wells'] = len(sample)
+    stages['analyze_curve_quality']['per_well_seconds'] = stages['analyze_curve_quality']['median_seconds'] / max(len(sample), 1)
+    stages['analyze_curve_quality']['mean_function_evaluations'] = evaluations_by_kind(sample_ids, fits, kinds)
+    
+    stages['detect_curve_anomalies'], _ = time_stage(
+        lambda: [detect_curve_anomalies(c, r) for c, r in wells], repeat)
+    
+    stages['batch_analyze_wells'], results = time_stage(lambda: batch_analyze_wells(data), repeat)
+    
+    with app_module.app.app_context():
+        stages['json_response'], response = time_stage(lambda: jsonify(results).get_data(), repeat)
+    stages['json_response']['bytes'] = len(response)
+    
+    # Full round trip through the Flask test client; persistence time comes from the app itself
+    client = app_module.app.test_client()
+    request_samples = []
+    save_samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        reply = client.post('/analyze', json=data, headers={'X-Filename': 'benchmark.csv'})
+        request_samples.append(time.perf_counter() - start)
+        if reply.status_code != 200:
+            raise RuntimeError(f'/analyze returned {reply.status_code}: {reply.get_data(as_text=True)[:200]}')
+        save_samples.append(reply.get_json()['processing_info'].get('database_save_seconds', 0.0))
+    stages['db_persistence'] = {
+        'median_seconds': statistics.median(save_samples),
+        'min_seconds': min(save_samples),
+        'runs': repeat
+    }
+    stages['analyze_request'] = {
+        'median_seconds': statistics.median(request_samples),
+        'min_seconds': min(request_samples),
+        'runs': repeat
+    }
+    
+    summary = results['summary']
+    return {
+        'stages': stages,
+        'good_curves': summary['good_curves'],
+        'fit_engine': results.get('fit_engine')
+    }
+
+def compare(current, baseline_path, threshold):
+    """Print median ratios against a previous run; returns the regressed stages"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['wells'], r['cycles']): r for r in baseline['results']}
+    
+    regressions = []
+    for result in current['results']:
+        old = previous.get((result['wells'], result['cycles']))
+        if not old:
+            continue
+        for stage, timing in result['stages'].items():
+            # Sampled stages are compared per well, since the sample size can differ between runs
+            key = 'per_well_seconds' if 'per_well_seconds' in timing else 'median_seconds'
+            if not old['stages'].get(stage, {}).get(key):
+                continue
+            ratio = timing[key] / old['stages'][stage][key]
+            flag = ' REGRESSION' if ratio > threshold else ''
+            print(f"{result['wells']:>5} wells x {result['cycles']:>2} cycles  {stage:<24} {ratio:6.2f}x{flag}", file=sys.stderr)
+            if flag:
+                regressions.append((result['wells'], result['cycles'], stage, ratio))
+    return regressions
+
+def int_list(text):
+    return [int(v) for v in text.split(',') if v]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--wells', type=int_list, default=[96, 384, 1536], help='comma-separated plate sizes')
+    parser.add_argument('--cycles', type=int_list, default=[40], help='comma-separated cycle counts (e.g. 25,40,60)')
+    parser.add_argument('--good', type=float, default=0.6, help='share of clean sigmoid wells')
+    parser.add_argument('--flat', type=float, default=0.2, help='share of flat negative wells')
+    parser.add_argument('--noisy', type=float, default=0.15, help='share of noisy wells')
+    parser.add_argument('--nan', type=float, default=0.05, help='share of wells with missing readings')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage; the median is reported')
+    parser.add_argument('--per-well-sample', type=int, default=96, help='wells timed with analyze_curve_quality (0 = all)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Isolated SQLite database, and no result cache so every run really fits
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+        os.environ['QPCR_RESULT_CACHE_SIZE'] = '0'
+        os.environ['QPCR_PERSISTENT_CACHE'] = '0'
+        import app as app_module
+        import qpcr_analyzer
+        import scipy
+        
+        report = {
+            'created_at': datetime.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'numpy': np.__version__,
+                'scipy': scipy.__version__,
+                'analyzer_version': qpcr_analyzer.ANALYZER_VERSION,
+                'batch_fit': qpcr_analyzer.BATCH_FIT_ENABLED,
+                'parallel_workers': qpcr_analyzer.PARALLEL_WORKERS
+            },
+            'mix': {'good': args.good, 'flat': args.flat, 'noisy': args.noisy, 'nan': args.nan},
+            'results': []
+        }
+        
+        for n_wells in args.wells:
+            for n_cycles in args.cycles:
+                data = synthetic_plate(n_wells, n_cycles, args.good, args.flat, args.noisy, args.nan, args.seed)
+                kinds = well_kinds(n_wells, args.good, args.flat, args.noisy, args.nan, args.seed)
+                result = benchmark_plate(app_module, data, args.repeat, args.per_well_sample, kinds)
+                report['results'].append({'wells': n_wells, 'cycles': n_cycles, **result})
+                print(f"{n_wells} wells x {n_cycles} cycles: batch_analyze_wells "
+                      f"{result['stages']['batch_analyze_wells']['median_seconds']:.3f}s", file=sys.stderr)
+        
+        with app_module.app.app_context():
+            app_module.db.engine.dispose()
+    
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
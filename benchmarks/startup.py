@@ -0,0 +1,62 @@
+"""Measure the cold-start cost of a web worker: wall time and peak RSS of `import app`"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so nothing is already imported
+PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('matplotlib', 'pandas', 'sklearn') if name in sys.modules]
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'import_seconds': elapsed, 'max_rss_mb': rss_kb / 1024, 'heavy_modules': heavy}))
+'''
+
+def run_probe(env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=REPO_ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        # Keep the benchmark away from the real database
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        env['PYTHONDONTWRITEBYTECODE'] = '1'
+        
+        run_probe(env)  # Warm the OS file cache and create the schema
+        samples = [run_probe(env) for _ in range(args.runs)]
+    
+    summary = {
+        'runs': args.runs,
+        'import_seconds_median': statistics.median(s['import_seconds'] for s in samples),
+        'import_seconds_min': min(s['import_seconds'] for s in samples),
+        'max_rss_mb_median': statistics.median(s['max_rss_mb'] for s in samples),
+        'heavy_modules': samples[-1]['heavy_modules']
+    }
+    
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"import app: {summary['import_seconds_median']:.3f}s median "
+              f"({summary['import_seconds_min']:.3f}s min over {args.runs} runs)")
+        print(f"peak RSS:   {summary['max_rss_mb_median']:.1f} MB")
+        print(f"heavy modules loaded: {', '.join(summary['heavy_modules']) or 'none'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import base64
+import os
+
+import numpy as np
+
+# Quantization step of compact raw RFU, in RFU; values are exact to half of it
+CURVE_QUANT_STEP = float(os.environ.get('QPCR_CURVE_QUANT_STEP', 0.01))
+
+CURVE_KEYS = ('fitted_curve', 'raw_cycles', 'raw_rfu')
+
+def _b64(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+def encode_series(values, step=CURVE_QUANT_STEP, full_precision=False):
+    """Compact JSON form of a float series.
+    
+    range:  evenly spaced values as start/step/count (cycle numbers)
+    f8:     lossless little-endian float64, base64
+    delta:  values quantized to multiples of scale, first value in start and
+            successive differences as little-endian i2/i4, base64; NaN
+            positions are listed in missing
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n >= 2 and np.all(np.isfinite(values)):
+        spacing = values[1] - values[0]
+        if np.array_equal(values, values[0] + spacing * np.arange(n)):
+            return {'encoding': 'range', 'start': float(values[0]), 'step': float(spacing), 'count': n}
+    
+    if full_precision or n == 0:
+        return {'encoding': 'f8', 'count': n, 'data': _b64(values, '<f8')}
+    
+    finite = np.isfinite(values)
+    missing = np.flatnonzero(~finite)
+    quantized = np.zeros(n, dtype=np.int64)
+    quantized[finite] = np.round(values[finite] / step)
+    # Missing points repeat the previous value, so they cost a zero delta
+    if len(missing):
+        filled = np.maximum.accumulate(np.where(finite, np.arange(n), 0))
+        quantized = quantized[filled]
+    deltas = np.diff(quantized)
+    dtype = '<i2' if len(deltas) == 0 or np.abs(deltas).max() < 2 ** 15 else '<i4'
+    if dtype == '<i4' and np.abs(deltas).max() >= 2 ** 31:
+        return {'encoding': 'f8', 'count': n, 'data': _b64(values, '<f8')}
+    encoded = {
+        'encoding': 'delta',
+        'dtype': dtype[1:],
+        'scale': step,
+        'start': int(quantized[0]),
+        'count': n,
+        'data': _b64(deltas, dtype)
+    }
+    if len(missing):
+        encoded['missing'] = missing.tolist()
+    return encoded
+
+def decode_series(encoded):
+    """Inverse of encode_series, as a float64 array"""
+    n = encoded['count']
+    if encoded['encoding'] == 'range':
+        return encoded['start'] + encoded['step'] * np.arange(n)
+    data = base64.b64decode(encoded['data'])
+    if encoded['encoding'] == 'f8':
+        return np.frombuffer(data, dtype='<f8').copy()
+    deltas = np.frombuffer(data, dtype='<' + encoded['dtype']).astype(np.int64)
+    values = np.concatenate([[encoded['start']], encoded['start'] + np.cumsum(deltas)]) * encoded['scale']
+    values[encoded.get('missing', [])] = np.nan
+    return values
+
+def lttb(x, y, n_out):
+    """Indices of the Largest-Triangle-Three-Buckets downsample of (x, y) to n_out points"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        next_start, next_end = edges[b + 1], edges[b + 2] if b + 2 < len(edges) else n
+        # Average of the next bucket is the third corner of each triangle
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[b + 1] = previous
+    return selected
+
+def compact_well(well, downsample=None, full_precision=False, step=CURVE_QUANT_STEP):
+    """Copy of a well result dict with its curve lists replaced by compact encodings.
+    
+    The fitted curve is left out; clients rebuild it from fit_parameters with
+    the sigmoid L / (1 + exp(-k * (x - x0))) + B. Raw data, when present,
+    goes into 'raw' as encoded cycles and rfu, optionally LTTB-downsampled
+    to downsample points.
+    """
+    compact = {key: value for key, value in well.items() if key not in CURVE_KEYS}
+    cycles = well.get('raw_cycles')
+    rfu = well.get('raw_rfu')
+    if cycles is not None and rfu is not None:
+        cycles = np.asarray(cycles, dtype=float)
+        rfu = np.asarray(rfu, dtype=float)
+        if downsample:
+            finite = np.isfinite(rfu)
+            cycles, rfu = cycles[finite], rfu[finite]
+            keep = lttb(cycles, rfu, downsample)
+            cycles, rfu = cycles[keep], rfu[keep]
+        compact['raw'] = {
+            'cycles': encode_series(cycles, step, full_precision),
+            'rfu': encode_series(rfu, step, full_precision)
+        }
+    compact['curve_encoding'] = 'compact'
+    return compact
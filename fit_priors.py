@@ -0,0 +1,103 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import select
+
+from models import db, AnalysisSession, WellResult
+
+# Warm-start fits from earlier sessions of the same assay (per request: ?warm_start=1 / 0)
+WARM_START_ENABLED = os.environ.get('QPCR_WARM_START', '0') == '1'
+# Most recent sessions of an assay that make up its prior
+WARM_START_SESSIONS = int(os.environ.get('QPCR_WARM_START_SESSIONS', 20))
+# Good wells an assay needs before its plate-wide median stands in for unseen well positions
+MIN_ASSAY_WELLS = 8
+# Assays whose priors are kept in memory per worker
+MAX_CACHED_ASSAYS = 64
+
+_DIGITS = re.compile(r'\d+')
+
+# Placeholder names given to uploads without a file name; these runs share no assay
+_UNNAMED = {'unknown', 'plate_#'}
+
+def assay_key(filename):
+    """Assay of a run derived from its file name: lowercased, without extension, digit runs as '#'
+    
+    'CovidPanel_2025-03-14_run2.csv' and 'covidpanel_2025-04-02_run7.csv'
+    both give 'covidpanel_#-#-#_run#'.
+    """
+    name = os.path.splitext(os.path.basename(filename or ''))[0].lower().strip()
+    key = _DIGITS.sub('#', name)
+    return key if key and key not in _UNNAMED else None
+
+class AssayPriors:
+    """Median fit parameters per well position over the latest sessions of each assay, cached per worker"""
+    
+    def __init__(self, sessions=WARM_START_SESSIONS, maxsize=MAX_CACHED_ASSAYS):
+        self.sessions = sessions
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # assay -> (newest session id, per-well medians, assay median)
+        self._lock = threading.Lock()
+    
+    def for_plate(self, assay, well_ids):
+        """{well_id: (L, k, x0, B)} for the wells the assay has a prior for; empty if it has none"""
+        if not assay or self.sessions <= 0:
+            return {}
+        
+        session_ids = db.session.execute(
+            select(AnalysisSession.id)
+            .where(AnalysisSession.assay == assay)
+            .order_by(AnalysisSession.id.desc())
+            .limit(self.sessions)
+        ).scalars().all()
+        if not session_ids:
+            return {}
+        
+        # A new session of the assay invalidates its cached prior
+        with self._lock:
+            entry = self._entries.get(assay)
+            if entry is not None and entry[0] == session_ids[0]:
+                self._entries.move_to_end(assay)
+        if entry is None or entry[0] != session_ids[0]:
+            entry = (session_ids[0], *self._build(session_ids))
+            with self._lock:
+                self._entries[assay] = entry
+                self._entries.move_to_end(assay)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        
+        _, by_well, assay_median = entry
+        priors = {}
+        for well_id in well_ids:
+            prior = by_well.get(well_id, assay_median)
+            if prior is not None:
+                priors[well_id] = prior
+        return priors
+    
+    def _build(self, session_ids):
+        """Per-well and plate-wide median (L, k, x0, B) of the good fits in these sessions"""
+        rows = db.session.execute(
+            select(WellResult.well_id, WellResult.fit_parameters)
+            .where(WellResult.session_id.in_(session_ids), WellResult.is_good_scurve.is_(True))
+        ).all()
+        params = [(well_id, p) for well_id, p in rows if p is not None and len(p) == 4]
+        if not params:
+            return {}, None
+        
+        well_ids = np.array([well_id for well_id, _ in params], dtype=object)
+        P = np.array([p for _, p in params], dtype=float)
+        
+        # Group rows by well position with one sort, then take each group's median
+        order = np.argsort(well_ids, kind='stable')
+        names, starts = np.unique(well_ids[order], return_index=True)
+        groups = np.split(P[order], starts[1:])
+        by_well = {name: tuple(np.median(group, axis=0)) for name, group in zip(names, groups)}
+        
+        assay_median = tuple(np.median(P, axis=0)) if len(P) >= MIN_ASSAY_WELLS else None
+        return by_well, assay_median
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+# Aggregate stage and per-well fit statistics for /metrics; set QPCR_METRICS=0 to turn all of it off
+METRICS_ENABLED = os.environ.get('QPCR_METRICS', '1') != '0'
+
+# Always include the per-stage breakdown in processing_info (otherwise only with ?timing=1)
+TIMING_BREAKDOWN = os.environ.get('QPCR_TIMING_BREAKDOWN', '0') == '1'
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+EVALUATION_BUCKETS = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_registry = []
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = 'counter'
+    
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+    
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in values]
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels; observe_many takes a whole array at once"""
+    kind = 'histogram'
+    
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = np.asarray(buckets, dtype=float)
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # label values -> [bucket counts (last is +Inf), sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+    
+    def observe(self, value, **labels):
+        self.observe_many([value], **labels)
+    
+    def observe_many(self, values, **labels):
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        # Bucket i counts values <= buckets[i]; the extra slot catches everything above
+        counts = np.bincount(np.searchsorted(self.buckets, values, side='left'), minlength=len(self.buckets) + 1)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [np.zeros(len(self.buckets) + 1, dtype=np.int64), 0.0, 0]
+            series[0] += counts
+            series[1] += float(values.sum())
+            series[2] += int(values.size)
+    
+    def render(self):
+        with self._lock:
+            series = sorted((key, (counts.copy(), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = np.cumsum(counts)
+            for bound, value in zip(self.buckets, cumulative):
+                le = ('le', _format_value(float(bound)))
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {value}')
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", "+Inf"))} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+def render_prometheus():
+    """All metrics of this process in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+REQUEST_SECONDS = Histogram('qpcr_request_seconds', 'Wall time of HTTP requests', SECONDS_BUCKETS, ('endpoint', 'status'))
+STAGE_SECONDS = Histogram('qpcr_stage_seconds', 'Wall time of each analysis stage', SECONDS_BUCKETS, ('stage',))
+WELLS_ANALYZED = Counter('qpcr_wells_analyzed_total', 'Wells analyzed, by fitting engine', ('engine',))
+WELL_FIT_SECONDS = Histogram('qpcr_well_fit_seconds',
+                             'Fit wall time per well (batch fits share the pass time evenly)',
+                             SECONDS_BUCKETS, ('engine',))
+WELL_FIT_EVALUATIONS = Histogram('qpcr_well_fit_function_evaluations',
+                                 'Model evaluations per well fit (iterations for the batch engine)',
+                                 EVALUATION_BUCKETS, ('engine',))
+WELL_FIT_FAILURES = Counter('qpcr_well_fit_failures_total', 'Wells whose fit failed, by reason', ('reason',))
+
+def fit_failure_reason(error):
+    """Short label for an analyze_curve_quality error message"""
+    message = str(error).lower()
+    if 'insufficient' in message:
+        return 'insufficient_data'
+    if 'maximum number of function evaluations' in message:
+        return 'max_evaluations'
+    if 'infeasible' in message or 'bounds' in message:
+        return 'bad_bounds'
+    if 'nan' in message or 'inf' in message:
+        return 'non_finite'
+    return 'other'
+
+class FitStats:
+    """Per-well fit statistics gathered while a plate (or one chunk of it) is analyzed"""
+    
+    def __init__(self):
+        self.stages = {}
+        self.engines = []
+        self.seconds = []
+        self.evaluations = []
+        self.failures = []
+    
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+    
+    def add_fit(self, engine, seconds, analysis):
+        self.engines.append(engine)
+        self.seconds.append(seconds)
+        self.evaluations.append(analysis.get('function_evaluations', 0))
+        if 'error' in analysis:
+            self.failures.append(fit_failure_reason(analysis['error']))
+    
+    def merge(self, other):
+        for stage, seconds in other.stages.items():
+            self.add_stage(stage, seconds)
+        self.engines.extend(other.engines)
+        self.seconds.extend(other.seconds)
+        self.evaluations.extend(other.evaluations)
+        self.failures.extend(other.failures)
+
+class StageTimer:
+    """Collects the stage timings of one request; records them into the histograms when finished"""
+    enabled = True
+    
+    def __init__(self, breakdown=False):
+        self.breakdown = breakdown
+        self.timings = {}
+        self.fit_stats = FitStats()
+    
+    def stage(self, name):
+        return _TimedStage(self, name)
+    
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+    
+    def add_fit_stats(self, stats):
+        self.fit_stats.merge(stats)
+        for name, seconds in stats.stages.items():
+            self.add(name, seconds)
+    
+    def summary(self):
+        """Timing breakdown for processing_info"""
+        fits = self.fit_stats
+        return {
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.timings.items()},
+            'wells_by_engine': {engine: fits.engines.count(engine) for engine in sorted(set(fits.engines))},
+            'fit_failures': {reason: fits.failures.count(reason) for reason in sorted(set(fits.failures))}
+        }
+    
+    def finish(self):
+        """Push this request's timings and fit statistics into the process-wide metrics"""
+        if not METRICS_ENABLED:
+            return
+        for name, seconds in self.timings.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+        fits = self.fit_stats
+        engines = np.asarray(fits.engines)
+        for engine in np.unique(engines):
+            selected = engines == engine
+            WELLS_ANALYZED.inc(int(selected.sum()), engine=engine)
+            WELL_FIT_SECONDS.observe_many(np.asarray(fits.seconds)[selected], engine=engine)
+            WELL_FIT_EVALUATIONS.observe_many(np.asarray(fits.evaluations)[selected], engine=engine)
+        for reason in set(fits.failures):
+            WELL_FIT_FAILURES.inc(fits.failures.count(reason), reason=reason)
+
+class _TimedStage:
+    __slots__ = ('timer', 'name', 'start')
+    
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NullTimer:
+    """Stand-in used when metrics are off and no breakdown was asked for; every call is a no-op"""
+    enabled = False
+    breakdown = False
+    _context = nullcontext()
+    
+    def stage(self, name):
+        return self._context
+    
+    def add(self, name, seconds):
+        pass
+    
+    def add_fit_stats(self, stats):
+        pass
+    
+    def summary(self):
+        return {}
+    
+    def finish(self):
+        pass
+
+NULL_TIMER = _NullTimer()
+
+def start_timer(breakdown=False):
+    """Timer for one request; the shared no-op timer when there is nothing to record"""
+    breakdown = breakdown or TIMING_BREAKDOWN
+    if not METRICS_ENABLED and not breakdown:
+        return NULL_TIMER
+    return StageTimer(breakdown)
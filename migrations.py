@@ -0,0 +1,127 @@
+from sqlalchemy import bindparam, column, inspect, select, table, text, update
+from sqlalchemy.types import String
+
+from fit_priors import assay_key
+from models import db, AnalysisSession, WellResult, unpack_array
+
+CURVE_COLUMNS = ('fit_parameters', 'parameter_errors', 'fitted_curve', 'raw_cycles', 'raw_rfu')
+
+def ensure_curve_storage_schema(engine):
+    """Switch legacy TEXT curve columns to bytea where the database enforces column types"""
+    if engine.dialect.name != 'postgresql':
+        # SQLite stores blobs in the old TEXT columns as-is
+        return []
+    
+    inspector = inspect(engine)
+    if 'well_results' not in inspector.get_table_names():
+        return []
+    
+    column_types = {c['name']: c['type'] for c in inspector.get_columns('well_results')}
+    altered = []
+    with engine.begin() as conn:
+        for name in CURVE_COLUMNS:
+            if isinstance(column_types.get(name), String):
+                # Keeps the JSON text as bytes; migrate_curve_storage re-encodes it
+                conn.execute(text(
+                    f"ALTER TABLE well_results ALTER COLUMN {name} TYPE bytea USING convert_to({name}, 'UTF8')"
+                ))
+                altered.append(name)
+    return altered
+
+def ensure_indexes(engine):
+    """Create indexes added to the models after their tables already existed"""
+    for model in (AnalysisSession, WellResult):
+        for index in model.__table__.indexes:
+            # create_all skips existing tables, so their new indexes are added here
+            index.create(bind=engine, checkfirst=True)
+
+def ensure_columns(engine):
+    """Add nullable columns introduced after a table was created; returns the columns added"""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    added = []
+    for model in (AnalysisSession, WellResult):
+        table_name = model.__tablename__
+        if table_name not in tables:
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table_name)}
+        missing = [c for c in model.__table__.columns if c.name not in existing and c.nullable]
+        if not missing:
+            continue
+        with engine.begin() as conn:
+            for col in missing:
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {col.name} {col_type}"))
+                added.append(f"{table_name}.{col.name}")
+    return added
+
+def backfill_session_assays(engine, batch_size=1000):
+    """Derive the assay of sessions stored before the column existed from their file names; returns rows updated"""
+    sessions = AnalysisSession.__table__
+    statement = update(sessions).where(sessions.c.id == bindparam('_id')).values(assay=bindparam('_assay'))
+    
+    updated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(sessions.c.id, sessions.c.filename)
+                .where(sessions.c.assay.is_(None), sessions.c.id > last_id)
+                .order_by(sessions.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            
+            # Unnamed runs stay NULL and are simply looked at again next time
+            updates = [{'_id': row.id, '_assay': assay_key(row.filename)} for row in rows if assay_key(row.filename)]
+            if updates:
+                conn.execute(statement, updates)
+                updated += len(updates)
+    return updated
+
+def _is_legacy(value):
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return True
+    return bytes(value[:1]) == b'['
+
+def migrate_curve_storage(batch_size=500):
+    """Re-encode well results that still hold JSON curve text as packed arrays; returns rows converted"""
+    engine = db.engine
+    ensure_curve_storage_schema(engine)
+    
+    # Untyped view of the table so legacy values come back exactly as stored
+    raw = table('well_results', column('id'), *(column(name) for name in CURVE_COLUMNS))
+    typed = WellResult.__table__
+    statement = update(typed).where(typed.c.id == bindparam('_id'))
+    
+    converted = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(raw).where(raw.c.id > last_id).order_by(raw.c.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            
+            updates = []
+            for row in rows:
+                if any(_is_legacy(row[name]) for name in CURVE_COLUMNS):
+                    values = {name: None if row[name] is None else unpack_array(
+                        row[name] if isinstance(row[name], str) else bytes(row[name]))
+                        for name in CURVE_COLUMNS}
+                    updates.append({'_id': row['id'], **values})
+            if updates:
+                conn.execute(statement, updates)
+                converted += len(updates)
+    
+    # Give the space back to the filesystem
+    if converted and engine.dialect.name == 'sqlite':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM'))
+    
+    return converted
@@ -1,36 +1,116 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import Index, insert
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import TypeDecorator, LargeBinary
+import numpy as np
 import json
+import os
+import zlib
 
 db = SQLAlchemy()
 
+# One shared encoder instance; compact separators keep the stored text small
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+# zlib-compress packed curve arrays (smaller database, but decoding is no longer zero-copy)
+COMPRESS_CURVES = os.environ.get('QPCR_CURVE_COMPRESSION', '0') == '1'
+
+# Packed array header: dtype code, then compression flag
+_DTYPE_CODES = {'<f4': b'f', '<f8': b'd'}
+_CODE_DTYPES = {b'f': '<f4', b'd': '<f8'}
+
+def pack_array(values, dtype='<f8', compress=COMPRESS_CURVES):
+    """Encode a float sequence as a little-endian binary blob with a 2-byte header"""
+    data = np.ascontiguousarray(values, dtype=dtype).tobytes()
+    if compress:
+        return _DTYPE_CODES[dtype] + b'z' + zlib.compress(data, 1)
+    return _DTYPE_CODES[dtype] + b'-' + data
+
+def unpack_array(blob):
+    """Decode a packed blob (or a legacy JSON list) into a read-only NumPy array"""
+    if isinstance(blob, str) or blob[:1] == b'[':
+        # Rows written before packed storage hold JSON text
+        return np.array(json.loads(blob), dtype=float)
+    dtype = _CODE_DTYPES[bytes(blob[:1])]
+    if blob[1:2] == b'z':
+        return np.frombuffer(zlib.decompress(blob[2:]), dtype=dtype)
+    return np.frombuffer(blob, dtype=dtype, offset=2)
+
+class PackedArray(TypeDecorator):
+    """Float array column stored as a compact binary blob"""
+    impl = LargeBinary
+    cache_ok = True
+    
+    def __init__(self, dtype='<f8'):
+        super().__init__()
+        self.dtype = dtype
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return pack_array(value, self.dtype)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return unpack_array(value)
+
+def _as_list(values):
+    """Plain list for JSON responses; None stays None"""
+    return values.tolist() if values is not None else None
+
 class AnalysisSession(db.Model):
     """Store information about each analysis session"""
     __tablename__ = 'analysis_sessions'
     
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    upload_timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    upload_timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime)  # Set when stored results change after upload (reclassification)
     total_wells = db.Column(db.Integer, nullable=False)
     good_curves = db.Column(db.Integer, nullable=False)
     success_rate = db.Column(db.Float, nullable=False)
     cycle_min = db.Column(db.Integer)
     cycle_max = db.Column(db.Integer)
     cycle_count = db.Column(db.Integer)
+    assay = db.Column(db.String(255), index=True)  # Groups runs of the same assay for warm-start priors
     
     # Relationship to well results
     well_results = db.relationship('WellResult', backref='session', lazy=True, cascade='all, delete-orphan')
     
+    @classmethod
+    def from_analysis_results(cls, filename, results, assay=None):
+        """Create an AnalysisSession from batch analysis output"""
+        cycle_info = results.get('cycle_info')
+        return cls(
+            filename=filename,
+            assay=assay,
+            total_wells=results['summary']['total_wells'],
+            good_curves=results['summary']['good_curves'],
+            success_rate=results['summary']['success_rate'],
+            cycle_min=cycle_info['min'] if cycle_info else None,
+            cycle_max=cycle_info['max'] if cycle_info else None,
+            cycle_count=cycle_info['count'] if cycle_info else None
+        )
+    
+    @property
+    def last_modified(self):
+        """When the stored results last changed"""
+        return self.updated_at or self.upload_timestamp
+    
     def to_dict(self):
         return {
             'id': self.id,
             'filename': self.filename,
             'upload_timestamp': self.upload_timestamp.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'total_wells': self.total_wells,
             'good_curves': self.good_curves,
             'success_rate': self.success_rate,
             'cycle_range': f"{self.cycle_min}-{self.cycle_max}" if self.cycle_min and self.cycle_max else None,
-            'cycle_count': self.cycle_count
+            'cycle_count': self.cycle_count,
+            'assay': self.assay
         }
 
 class WellResult(db.Model):
@@ -51,17 +131,34 @@ class WellResult(db.Model):
     baseline = db.Column(db.Float)
     data_points = db.Column(db.Integer)
     cycle_range = db.Column(db.Float)
+    rfu_range = db.Column(db.Float)  # Needed to reclassify without the raw curve
+    ct_threshold = db.Column(db.Float)  # Cycle where the fit crosses QPCR_CT_THRESHOLD above baseline
+    ct_sdm = db.Column(db.Float)  # Second-derivative-maximum cycle of the fit
+    efficiency = db.Column(db.Float)  # Amplification efficiency at ct_sdm (1.0 = doubling per cycle)
+    fit_path = db.Column(db.String(32))  # batch, batch_warm, curve_fit, or screened_flat/screened_noisy (not fitted)
     
-    # JSON fields for complex data
-    fit_parameters = db.Column(db.Text)  # JSON string
-    parameter_errors = db.Column(db.Text)  # JSON string
-    fitted_curve = db.Column(db.Text)  # JSON string
+    # Packed float arrays; measured data and fit results keep full precision.
+    # Deferred as the 'curves' group so listings and summaries never load them.
+    fit_parameters = deferred(db.Column(PackedArray('<f8')), group='curves')
+    parameter_errors = deferred(db.Column(PackedArray('<f8')), group='curves')
+    fitted_curve = deferred(db.Column(PackedArray('<f4')), group='curves')  # Recomputable from fit_parameters
     anomalies = db.Column(db.Text)  # JSON string
-    raw_cycles = db.Column(db.Text)  # JSON string
-    raw_rfu = db.Column(db.Text)  # JSON string
+    raw_cycles = deferred(db.Column(PackedArray('<f4')), group='curves')  # Cycle numbers are exact in float32
+    raw_rfu = deferred(db.Column(PackedArray('<f8')), group='curves')
     
-    def to_dict(self):
-        return {
+    __table_args__ = (
+        # Also serves plain session_id lookups through its leading column
+        Index('ix_well_results_session_well', 'session_id', 'well_id'),
+        # Cross-session queries (GET /wells): one well position across runs, and range filters/sorts
+        Index('ix_well_results_well_session', 'well_id', 'session_id'),
+        Index('ix_well_results_r2_score', 'r2_score'),
+        Index('ix_well_results_midpoint', 'midpoint'),
+        Index('ix_well_results_amplitude', 'amplitude'),
+        Index('ix_well_results_steepness', 'steepness'),
+    )
+    
+    def to_dict(self, include_curves=True):
+        result = {
             'id': self.id,
             'session_id': self.session_id,
             'well_id': self.well_id,
@@ -74,33 +171,111 @@ class WellResult(db.Model):
             'baseline': self.baseline,
             'data_points': self.data_points,
             'cycle_range': self.cycle_range,
-            'fit_parameters': json.loads(self.fit_parameters) if self.fit_parameters else None,
-            'parameter_errors': json.loads(self.parameter_errors) if self.parameter_errors else None,
-            'fitted_curve': json.loads(self.fitted_curve) if self.fitted_curve else None,
-            'anomalies': json.loads(self.anomalies) if self.anomalies else [],
-            'raw_cycles': json.loads(self.raw_cycles) if self.raw_cycles else None,
-            'raw_rfu': json.loads(self.raw_rfu) if self.raw_rfu else None
+            'rfu_range': self.rfu_range,
+            'ct_threshold': self.ct_threshold,
+            'ct_sdm': self.ct_sdm,
+            'efficiency': self.efficiency,
+            'fit_path': self.fit_path,
+            'anomalies': json.loads(self.anomalies) if self.anomalies else []
         }
+        if include_curves:
+            result.update({
+                'fit_parameters': _as_list(self.fit_parameters),
+                'parameter_errors': _as_list(self.parameter_errors),
+                'fitted_curve': _as_list(self.fitted_curve),
+                'raw_cycles': _as_list(self.raw_cycles),
+                'raw_rfu': _as_list(self.raw_rfu)
+            })
+        return result
     
     @classmethod
     def from_analysis_result(cls, session_id, well_id, analysis_result, raw_data):
         """Create WellResult from analysis output"""
-        return cls(
-            session_id=session_id,
-            well_id=well_id,
-            is_good_scurve=analysis_result.get('is_good_scurve', False),
-            r2_score=analysis_result.get('r2_score'),
-            rmse=analysis_result.get('rmse'),
-            amplitude=analysis_result.get('amplitude'),
-            steepness=analysis_result.get('steepness'),
-            midpoint=analysis_result.get('midpoint'),
-            baseline=analysis_result.get('baseline'),
-            data_points=analysis_result.get('data_points'),
-            cycle_range=analysis_result.get('cycle_range'),
-            fit_parameters=json.dumps(analysis_result.get('fit_parameters', [])),
-            parameter_errors=json.dumps(analysis_result.get('parameter_errors', [])),
-            fitted_curve=json.dumps(analysis_result.get('fitted_curve', [])),
-            anomalies=json.dumps(analysis_result.get('anomalies', [])),
-            raw_cycles=json.dumps(raw_data.get('cycles', [])),
-            raw_rfu=json.dumps(raw_data.get('rfu', []))
-        )
\ No newline at end of file
+        return cls(**cls.row_from_analysis_result(session_id, well_id, analysis_result, raw_data))
+    
+    @staticmethod
+    def row_from_analysis_result(session_id, well_id, analysis_result, raw_data):
+        """Column dict for one well, ready for a bulk insert"""
+        return {
+            'session_id': session_id,
+            'well_id': well_id,
+            'is_good_scurve': analysis_result.get('is_good_scurve', False),
+            'r2_score': analysis_result.get('r2_score'),
+            'rmse': analysis_result.get('rmse'),
+            'amplitude': analysis_result.get('amplitude'),
+            'steepness': analysis_result.get('steepness'),
+            'midpoint': analysis_result.get('midpoint'),
+            'baseline': analysis_result.get('baseline'),
+            'data_points': analysis_result.get('data_points'),
+            'cycle_range': analysis_result.get('cycle_range'),
+            'rfu_range': analysis_result.get('rfu_range'),
+            'ct_threshold': analysis_result.get('ct_threshold'),
+            'ct_sdm': analysis_result.get('ct_sdm'),
+            'efficiency': analysis_result.get('efficiency'),
+            'fit_path': analysis_result.get('fit_path'),
+            'fit_parameters': analysis_result.get('fit_parameters', []),
+            'parameter_errors': analysis_result.get('parameter_errors', []),
+            'fitted_curve': analysis_result.get('fitted_curve', []),
+            'anomalies': _encode(analysis_result.get('anomalies', [])),
+            'raw_cycles': raw_data.get('cycles', []),
+            'raw_rfu': raw_data.get('rfu', [])
+        }
+    
+    @classmethod
+    def bulk_insert(cls, session_id, individual_results, raw_data):
+        """Insert all wells of a session with one executemany; the caller owns the transaction"""
+        return cls.bulk_insert_many([(session_id, individual_results, raw_data)])
+    
+    @classmethod
+    def bulk_insert_many(cls, sessions):
+        """Insert the wells of several sessions, given as (session_id, individual_results, raw_data), with one executemany"""
+        rows = [
+            cls.row_from_analysis_result(session_id, well_id, well_result, raw_data.get(well_id, {}))
+            for session_id, individual_results, raw_data in sessions
+            for well_id, well_result in individual_results.items()
+        ]
+        if rows:
+            db.session.execute(insert(cls), rows)
+        return len(rows)
+
+class CachedWellAnalysis(db.Model):
+    """Persistent tier of the per-well result cache, keyed by a hash of the well data"""
+    __tablename__ = 'well_analysis_cache'
+    
+    cache_key = db.Column(db.String(64), primary_key=True)
+    analyzer_version = db.Column(db.String(64), nullable=False, index=True)
+    result = db.Column(db.Text, nullable=False)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AnalysisJob(db.Model):
+    """Background analysis job; kept in the database so any worker can report on it"""
+    __tablename__ = 'analysis_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    filename = db.Column(db.String(255), nullable=False)
+    wells_total = db.Column(db.Integer, nullable=False)
+    wells_done = db.Column(db.Integer, nullable=False, default=0)
+    session_id = db.Column(db.Integer, db.ForeignKey('analysis_sessions.id', ondelete='SET NULL'))
+    error = db.Column(db.Text)
+    result = db.Column(db.Text)  # JSON string of the final /analyze response
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'progress': {
+                'wells_done': self.wells_done,
+                'wells_total': self.wells_total,
+                'percent': round(self.wells_done / self.wells_total * 100, 1) if self.wells_total else 100.0
+            },
+            'session_id': self.session_id,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,148 @@
+import csv
+import io
+import os
+import zipfile
+
+import numpy as np
+
+# Upper bounds on a single upload, so the parsed plate array has a fixed worst-case size
+MAX_UPLOAD_CYCLES = int(os.environ.get('QPCR_MAX_UPLOAD_CYCLES', 1000))
+MAX_UPLOAD_WELLS = int(os.environ.get('QPCR_MAX_UPLOAD_WELLS', 6144))
+# Plates accepted by one batch request, counting every CSV inside uploaded archives
+MAX_BATCH_PLATES = int(os.environ.get('QPCR_MAX_BATCH_PLATES', 200))
+
+# Rows are parsed into fixed-size blocks that are concatenated once at the end
+_BLOCK_ROWS = 64
+# Data rows inspected when the header has no "Cycle" column
+_DETECTION_ROWS = 10
+
+def _to_float(cell):
+    try:
+        return float(cell)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _parse_row(row, width):
+    """Parse one CSV row into a float array of fixed width; blanks and text become NaN"""
+    values = np.full(width, np.nan)
+    cells = row[:width]
+    try:
+        values[:len(cells)] = np.array(cells, dtype=float)
+    except ValueError:
+        values[:len(cells)] = [_to_float(cell) for cell in cells]
+    return values
+
+def _detect_cycle_column(headers, rows):
+    """Same column detection as prepareAnalysisData in static/script.js"""
+    # Method 1: Look for "Cycle" in headers
+    for i, header in enumerate(headers):
+        if header and 'cycle' in header.lower():
+            return i
+    
+    # Method 2: a column with a sequential run of numbers
+    for col in range(min(3, len(headers))):
+        numbers = rows[:, col][np.isfinite(rows[:, col])] if len(rows) else np.array([])
+        if len(numbers) >= 5 and np.all(np.diff(numbers) == 1):
+            return col
+    
+    # Method 3: Fallback - use first column with most numeric data
+    counts = [int(np.isfinite(rows[:, col]).sum()) if len(rows) else 0 for col in range(min(3, len(headers)))]
+    if counts and max(counts) > 0:
+        return int(np.argmax(counts))
+    return None
+
+def parse_plate_csv(stream, max_cycles=MAX_UPLOAD_CYCLES, max_wells=MAX_UPLOAD_WELLS):
+    """Parse a CFX-style plate CSV from a binary stream, one row at a time.
+    
+    Returns (well_names, cycles, rfu, warnings) where cycles is a 1-D array and
+    rfu an (n_wells x n_cycles) array. Only the current row and the parsed
+    float blocks are held in memory; raises ValueError on malformed input.
+    """
+    if not hasattr(stream, 'read1'):
+        stream = io.BufferedReader(stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        return _parse_rows(csv.reader(text), max_cycles, max_wells)
+    finally:
+        # Leave closing the upload stream to the caller
+        text.detach()
+
+def _parse_rows(reader, max_cycles, max_wells):
+    headers = next((row for row in reader if any(cell.strip() for cell in row)), None)
+    if headers is None or len(headers) < 2:
+        raise ValueError('CSV file appears to be empty or invalid')
+    width = len(headers)
+    if width - 1 > max_wells:
+        raise ValueError(f'Too many columns ({width - 1}); at most {max_wells} wells per upload')
+    
+    blocks = []
+    block = np.empty((_BLOCK_ROWS, width))
+    filled = 0
+    total = 0
+    
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        if total >= max_cycles:
+            raise ValueError(f'Too many rows; at most {max_cycles} cycles per upload')
+        
+        block[filled] = _parse_row(row, width)
+        filled += 1
+        total += 1
+        if filled == _BLOCK_ROWS:
+            blocks.append(block)
+            block = np.empty((_BLOCK_ROWS, width))
+            filled = 0
+    blocks.append(block[:filled])
+    data = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+    del blocks, block
+    
+    cycle_col = _detect_cycle_column(headers, data[:_DETECTION_ROWS])
+    if cycle_col is None:
+        raise ValueError('Could not detect cycle column')
+    
+    # Keep rows with a valid cycle number, as the browser parser does
+    data = data[np.isfinite(data[:, cycle_col])]
+    cycles = data[:, cycle_col].copy()
+    
+    warnings = []
+    well_names = []
+    well_cols = []
+    for col in range(cycle_col + 1, width):
+        name = headers[col].strip()
+        if not name or 'cycle' in name.lower():
+            continue
+        if not np.all(np.isfinite(data[:, col])):
+            warnings.append(f"Well {name}: RFU column incomplete, well skipped")
+            continue
+        well_names.append(name)
+        well_cols.append(col)
+    
+    rfu = np.ascontiguousarray(data[:, well_cols].T)
+    return well_names, cycles, rfu, warnings
+
+def is_plate_archive(filename, stream):
+    """True for a zip upload (by name or content); the stream position is left unchanged"""
+    if filename and filename.lower().endswith('.zip'):
+        return True
+    if not stream.seekable():
+        return False
+    position = stream.tell()
+    try:
+        return zipfile.is_zipfile(stream)
+    finally:
+        stream.seek(position)
+
+def iter_archive_plates(stream, archive_name='archive.zip'):
+    """Yield (name, binary stream) for every CSV file in a zip archive, in archive order"""
+    with zipfile.ZipFile(stream) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            base = name.rsplit('/', 1)[-1]
+            # Skip folders and the metadata files macOS adds to archives
+            if info.is_dir() or name.startswith('__MACOSX/') or base.startswith('.'):
+                continue
+            if not base.lower().endswith('.csv'):
+                continue
+            with archive.open(info) as member:
+                yield f"{archive_name}/{name}", member
@@ -1,17 +1,372 @@
 import numpy as np
 from scipy.optimize import curve_fit
-import matplotlib.pyplot as plt
-from sklearn.metrics import r2_score
-import pandas as pd
+import os
+import time
+import atexit
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from metrics import FitStats, NULL_TIMER
 warnings.filterwarnings('ignore')
 
+# Bump when analysis output changes in a way the result cache should not paper over
+ANALYZER_VERSION = '2.5.1'
+
+# Fit every well of a plate in one vectorized pass; set QPCR_BATCH_FIT=0 to use per-well curve_fit only
+BATCH_FIT_ENABLED = os.environ.get('QPCR_BATCH_FIT', '1') != '0'
+BATCH_FIT_MAX_ITER = int(os.environ.get('QPCR_BATCH_FIT_MAX_ITER', 200))
+# A converged fit on a bound is kept when a projected Gauss-Newton step would gain less than this share of its cost
+BATCH_FIT_GTOL = float(os.environ.get('QPCR_BATCH_FIT_GTOL', 1e-3))
+
+# Spread large plates over a persistent process pool; 0 or 1 workers keeps analysis in-process
+PARALLEL_WORKERS = int(os.environ.get('QPCR_PARALLEL_WORKERS', 0))
+PARALLEL_CHUNK_SIZE = int(os.environ.get('QPCR_PARALLEL_CHUNK_SIZE', 96))
+
+# Warm starts: how far the midpoint may move from the prior, and the steepness range around it (factor)
+WARM_START_X0_WINDOW = float(os.environ.get('QPCR_WARM_START_X0_WINDOW', 5))
+WARM_START_K_FACTOR = float(os.environ.get('QPCR_WARM_START_K_FACTOR', 3))
+# Warm-started wells also fitted from a cold start to measure the speedup (0 = no measurement)
+WARM_START_CONTROL_WELLS = int(os.environ.get('QPCR_WARM_START_CONTROL_WELLS', 16))
+
+# Fixed Ct threshold, in RFU above the fitted baseline
+CT_THRESHOLD = float(os.environ.get('QPCR_CT_THRESHOLD', 100))
+
+# Robust mode: classify flat and noisy wells without fitting, fit the rest with an outlier-tolerant loss
+ROBUST_FIT_ENABLED = os.environ.get('QPCR_ROBUST_FIT', '0') == '1'
+ROBUST_LOSS = os.environ.get('QPCR_ROBUST_LOSS', 'soft_l1')  # soft_l1 or huber
+ROBUST_LOSS_SCALE = float(os.environ.get('QPCR_ROBUST_LOSS_SCALE', 2.0))  # In multiples of each well's noise level
+ROBUST_MAX_NFEV = int(os.environ.get('QPCR_ROBUST_MAX_NFEV', 100))  # Function evaluations per well and engine
+# Residuals beyond this many robust standard deviations are outliers, left out of r2 (at most 10% of points)
+ROBUST_OUTLIER_SIGMAS = 5.0
+ROBUST_MAX_OUTLIER_FRACTION = 0.1
+# Wells whose end rises less than this fraction of their RFU range above their start are screened as flat
+SCREEN_MIN_RISE_FRACTION = 0.1
+
+_process_pool = None
+
 def sigmoid(x, L, k, x0, B):
     """Sigmoid function for qPCR amplification curves"""
     return L / (1 + np.exp(-k * (x - x0))) + B
 
-def analyze_curve_quality(cycles, rfu, plot=False):
-    """Analyze if a curve matches S-shaped pattern and return quality metrics"""
+def sigmoid_jacobian(x, L, k, x0, B):
+    """Closed-form Jacobian of sigmoid with respect to (L, k, x0, B)"""
+    x = np.asarray(x, dtype=float)
+    with np.errstate(over='ignore'):
+        s = 1.0 / (1.0 + np.exp(-k * (x - x0)))
+    ds = s * (1.0 - s)
+    return np.column_stack([s, L * ds * (x - x0), -L * ds * k, np.ones_like(s)])
+
+def threshold_cycles(P, cycle_min, cycle_max, threshold=CT_THRESHOLD):
+    """Ct by fixed threshold and by second-derivative maximum, and amplification efficiency, for rows of (L, k, x0, B).
+    
+    All three come analytically from the fitted sigmoid. Returns three arrays
+    (ct_threshold, ct_sdm, efficiency); entries are NaN where the fit has no
+    such point within [cycle_min, cycle_max].
+    """
+    P = np.asarray(P, dtype=float).reshape(-1, 4)
+    L, k, x0 = P[:, 0], P[:, 1], P[:, 2]
+    valid = np.isfinite(P).all(axis=1) & (L > 0) & (k > 0)
+    
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # Baseline-corrected curve reaches the threshold where L / (1 + e^(-k(c - x0))) = threshold
+        ct_threshold = x0 - np.log(L / threshold - 1) / k
+        # The second derivative of a logistic curve peaks ln(2 + sqrt(3)) / k before its midpoint
+        ct_sdm = x0 - np.log(2 + np.sqrt(3)) / k
+        # Cycle-over-cycle gain F(c) / F(c - 1) - 1 of the baseline-corrected curve at the SDM cycle
+        efficiency = (2 + np.sqrt(3)) / (3 + np.sqrt(3)) * np.expm1(k)
+    
+    ct_threshold = np.where(valid & (L > threshold) & (ct_threshold >= cycle_min) & (ct_threshold <= cycle_max),
+                            ct_threshold, np.nan)
+    ct_sdm = np.where(valid & (ct_sdm >= cycle_min) & (ct_sdm <= cycle_max), ct_sdm, np.nan)
+    efficiency = np.where(valid, efficiency, np.nan)
+    return ct_threshold, ct_sdm, efficiency
+
+def _add_threshold_cycles(data_dict, well_results):
+    """Set ct_threshold, ct_sdm and efficiency on every well result with one pass over the plate"""
+    well_ids = list(data_dict)
+    P = np.full((len(well_ids), 4), np.nan)
+    cycle_min = np.full(len(well_ids), np.nan)
+    cycle_max = np.full(len(well_ids), np.nan)
+    for i, well_id in enumerate(well_ids):
+        params = well_results[well_id].get('fit_parameters')
+        cycles = data_dict[well_id]['cycles']
+        if params is not None and len(params) == 4 and len(cycles) > 0:
+            P[i] = params
+            cycle_min[i] = np.min(cycles)
+            cycle_max[i] = np.max(cycles)
+    
+    values = threshold_cycles(P, cycle_min, cycle_max)
+    for name, column in zip(('ct_threshold', 'ct_sdm', 'efficiency'), values):
+        for well_id, value in zip(well_ids, column.tolist()):
+            well_results[well_id][name] = value if np.isfinite(value) else None
+
+def _initial_fit_parameters(cycles, rfu):
+    """Initial guesses and adaptive bounds for the sigmoid fit of a single well"""
+    X = np.asarray(cycles, dtype=float)[None, :]
+    Y = np.asarray(rfu, dtype=float)[None, :]
+    p0, lower, upper = _initial_fit_parameters_plate(X, Y, np.ones(X.shape, dtype=bool))
+    return list(p0[0]), (list(lower[0]), list(upper[0]))
+
+def _initial_fit_parameters_plate(X, Y, mask):
+    """Data-driven initial guesses and adaptive bounds for every row of a left-aligned plate"""
+    n_wells = X.shape[0]
+    rows = np.arange(n_wells)
+    Y_min = np.where(mask, Y, np.inf).min(axis=1)
+    Y_max = np.where(mask, Y, -np.inf).max(axis=1)
+    X_min = np.where(mask, X, np.inf).min(axis=1)
+    X_max = np.where(mask, X, -np.inf).max(axis=1)
+    rfu_range = Y_max - Y_min
+    
+    # Baseline and plateau from robust percentiles
+    Y_masked = np.where(mask, Y, np.nan)
+    B_guess = np.nanpercentile(Y_masked, 5, axis=1)
+    L_guess = np.nanpercentile(Y_masked, 95, axis=1) - B_guess
+    
+    # Midpoint at the steepest first difference
+    dY = np.where(mask[:, 1:], np.diff(Y, axis=1), -np.inf)
+    steepest = np.argmax(dY, axis=1)
+    x0_guess = (X[rows, steepest] + X[rows, steepest + 1]) / 2
+    
+    # Steepness from the log-linear (exponential) region below the midpoint: log(rfu - B) ~ k*x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        height = (Y - B_guess[:, None]) / L_guess[:, None]
+        exp_phase = mask & (X <= x0_guess[:, None]) & (height > 0.02) & (height < 0.3)
+        Z = np.log(np.where(exp_phase, Y - B_guess[:, None], 1.0))
+        w = exp_phase.astype(float)
+        n = w.sum(axis=1)
+        sx, sz = (w * X).sum(axis=1), (w * Z).sum(axis=1)
+        slope = (n * (w * X * Z).sum(axis=1) - sx * sz) / (n * (w * X * X).sum(axis=1) - sx ** 2)
+        # Otherwise use the maximum slope of the sigmoid, L*k/4
+        dX = X[rows, steepest + 1] - X[rows, steepest]
+        k_fallback = 4 * dY[rows, steepest] / (dX * L_guess)
+    k_guess = np.where((n >= 3) & np.isfinite(slope) & (slope > 0), slope,
+                       np.where(np.isfinite(k_fallback) & (k_fallback > 0), k_fallback, 0.5))
+    
+    # Adaptive bounds based on data
+    lower = np.column_stack([rfu_range * 0.1, np.full(n_wells, 0.01), X_min, Y_min - rfu_range * 0.1])
+    upper = np.column_stack([rfu_range * 5, np.full(n_wells, 10.0), X_max, Y_max])
+    p0 = np.column_stack([L_guess, k_guess, x0_guess, B_guess])
+    
+    # Flat wells and wells without an exponential phase keep the conservative start,
+    # since the data-driven guesses there only chase noise and take far longer to converge
+    n_valid = mask.sum(axis=1)
+    conservative = np.column_stack([rfu_range * 1.1, np.full(n_wells, 0.5),
+                                    X[rows, np.maximum(n_valid, 1) // 2], Y_min])
+    no_signal = (rfu_range < DEFAULT_QUALITY_THRESHOLDS['min_amplitude']) | (n < 3)
+    p0 = np.where(no_signal[:, None], conservative, p0)
+    p0 = np.where(np.isfinite(p0), p0, lower)
+    return np.clip(p0, lower, upper), lower, upper
+
+def _warm_start_parameters_plate(X, Y, mask, prior):
+    """Initial guesses from prior (L, k, x0, B) rows, with steepness and midpoint bounds tightened around them.
+    
+    Amplitude and baseline bounds stay data-driven, since they follow the
+    sample and the instrument rather than the assay. Returns p0, lower, upper
+    and a mask of rows whose tightened bounds are still usable.
+    """
+    p0, lower, upper = _initial_fit_parameters_plate(X, Y, mask)
+    k, x0 = prior[:, 1], prior[:, 2]
+    lower = lower.copy()
+    upper = upper.copy()
+    lower[:, 1] = np.maximum(lower[:, 1], k / WARM_START_K_FACTOR)
+    upper[:, 1] = np.minimum(upper[:, 1], k * WARM_START_K_FACTOR)
+    lower[:, 2] = np.maximum(lower[:, 2], x0 - WARM_START_X0_WINDOW)
+    upper[:, 2] = np.minimum(upper[:, 2], x0 + WARM_START_X0_WINDOW)
+    
+    # The prior's baseline is instrument-specific; keep the data-driven guess for B
+    start = np.column_stack([prior[:, 0], k, x0, p0[:, 3]])
+    usable = np.all(np.isfinite(prior[:, :3]), axis=1) & np.all(lower < upper, axis=1)
+    start = np.where(np.isfinite(start), start, p0)
+    return np.clip(start, lower, upper), lower, upper, usable
+
+def _pinned_by_prior(X, Y, mask, P, lower, upper):
+    """Rows of P resting on a bound the warm start tightened, where the prior rather than the data decided the fit"""
+    _, cold_lower, cold_upper = _initial_fit_parameters_plate(X, Y, mask)
+    tol = 1e-8 * (upper - lower)
+    pinned = ((P - lower <= tol) & (lower > cold_lower)) | ((upper - P <= tol) & (upper < cold_upper))
+    return np.any(pinned, axis=1)
+
+def r2_score(y_true, y_pred):
+    """Coefficient of determination, matching sklearn.metrics.r2_score for a single output"""
+    y_true = np.asarray(y_true, dtype=float)
+    ss_res = np.sum((y_true - y_pred) ** 2)
+    ss_tot = np.sum((y_true - np.mean(y_true)) ** 2)
+    if ss_tot == 0:
+        # Constant data: perfect prediction scores 1, anything else 0
+        return 1.0 if ss_res == 0 else 0.0
+    return 1.0 - ss_res / ss_tot
+
+# Cutoffs behind is_good_scurve; a stored session can be reclassified with other values
+DEFAULT_QUALITY_THRESHOLDS = {
+    'min_r2': 0.9,
+    'min_r2_short_run': 0.85,         # Relaxed for shorter runs
+    'short_run_max_points': 20,       # Runs with at most this many points count as short
+    'min_steepness': 0.05,
+    'min_amplitude': 50,
+    'min_amplitude_fraction': 0.3,    # Of the well's RFU range (adaptive amplitude threshold)
+    'reject_anomalies': []            # Anomaly labels that disqualify a well outright
+}
+
+def quality_thresholds(overrides=None):
+    """Default quality thresholds updated with overrides; raises ValueError on unknown or non-numeric values"""
+    thresholds = dict(DEFAULT_QUALITY_THRESHOLDS)
+    for name, value in (overrides or {}).items():
+        if name not in thresholds:
+            raise ValueError(f"Unknown threshold '{name}'")
+        if name == 'reject_anomalies':
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError("'reject_anomalies' must be a list of anomaly labels")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Threshold '{name}' must be a number")
+        thresholds[name] = value
+    return thresholds
+
+def classify_curves(r2, steepness, amplitude, rfu_range, data_points, anomalies=None, thresholds=DEFAULT_QUALITY_THRESHOLDS):
+    """is_good_scurve from fit metrics alone; takes scalars or per-well arrays, never refits.
+    
+    anomalies, if given, is one label list per well and is only consulted
+    when thresholds['reject_anomalies'] is non-empty. Missing metrics
+    (NaN) classify as not good.
+    """
+    r2 = np.asarray(r2, dtype=float)
+    r2_threshold = np.where(np.asarray(data_points) > thresholds['short_run_max_points'],
+                            thresholds['min_r2'], thresholds['min_r2_short_run'])
+    min_amplitude = np.maximum(thresholds['min_amplitude'],
+                               np.asarray(rfu_range, dtype=float) * thresholds['min_amplitude_fraction'])
+    good = ((r2 > r2_threshold)
+            & (np.asarray(steepness, dtype=float) > thresholds['min_steepness'])
+            & (np.asarray(amplitude, dtype=float) > min_amplitude))
+    
+    if thresholds['reject_anomalies'] and anomalies is not None:
+        rejected = set(thresholds['reject_anomalies'])
+        flagged = np.array([bool(rejected.intersection(labels)) for labels in anomalies], dtype=bool)
+        good = good & ~flagged.reshape(good.shape)
+    return good
+
+def _summarize_fit(cycles, rfu, popt, perr, robust=False):
+    """Build the quality criteria dict for a fitted well; robust fits score r2 without outlier points"""
+    # Calculate fit quality
+    fit_rfu = sigmoid(cycles, *popt)
+    
+    # Calculate residuals
+    residuals = rfu - fit_rfu
+    rmse = np.sqrt(np.mean(residuals**2))
+    
+    outliers = _outlier_points(residuals) if robust else np.zeros(len(residuals), dtype=bool)
+    r2 = r2_score(rfu[~outliers], fit_rfu[~outliers])
+    
+    # Extract parameters
+    L, k, x0, B = popt
+    
+    # Dynamic quality criteria based on data characteristics
+    rfu_range = np.max(rfu) - np.min(rfu)
+    cycle_range = np.max(cycles) - np.min(cycles)
+    
+    # Quality criteria for S-curve identification - convert numpy types to Python types
+    criteria = {
+        'r2_score': float(r2),
+        'rmse': float(rmse),
+        'amplitude': float(L),
+        'steepness': float(k),
+        'midpoint': float(x0),
+        'baseline': float(B),
+        'is_good_scurve': bool(classify_curves(r2, k, L, rfu_range, len(cycles))),
+        'fit_parameters': [float(x) for x in popt],
+        'parameter_errors': [float(x) for x in perr],
+        'fitted_curve': [float(x) for x in fit_rfu],
+        'data_points': int(len(cycles)),
+        'cycle_range': float(cycle_range),
+        'rfu_range': float(rfu_range)
+    }
+    if robust:
+        criteria['outlier_cycles'] = [float(x) for x in cycles[outliers]]
+    return criteria
+
+def _outlier_points(residuals):
+    """Mask of residuals far outside the robust (MAD) spread of the rest; empty if too many would go"""
+    deviation = np.abs(residuals - np.median(residuals))
+    sigma = 1.4826 * np.median(deviation)
+    outliers = deviation > ROBUST_OUTLIER_SIGMAS * sigma if sigma > 0 else np.zeros(len(residuals), dtype=bool)
+    if outliers.sum() > max(1, int(ROBUST_MAX_OUTLIER_FRACTION * len(residuals))):
+        # Widespread misfit is not an outlier problem
+        return np.zeros(len(residuals), dtype=bool)
+    return outliers
+
+def _noise_scale_plate(Y, mask):
+    """Per-row noise level from the median absolute second difference, which a smooth sigmoid barely moves"""
+    d2 = np.abs(Y[:, 2:] - 2 * Y[:, 1:-1] + Y[:, :-2])
+    d2 = np.where(mask[:, 2:], d2, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        # Second differences of white noise have six times its variance
+        sigma = 1.4826 * np.nanmedian(d2, axis=1) / np.sqrt(6)
+    rfu_range = np.where(mask, Y, -np.inf).max(axis=1) - np.where(mask, Y, np.inf).min(axis=1)
+    # Noise-free curves still need a positive scale for the loss
+    return np.maximum(np.nan_to_num(sigma), 1e-3 * np.maximum(rfu_range, 1.0))
+
+def _robust_loss(residuals, weights, f_scale, loss):
+    """Row costs and IRLS weights for soft_l1 or huber loss with per-row scale f_scale (None: least squares)"""
+    if loss is None:
+        return np.sum(weights * residuals ** 2, axis=1), weights
+    scale2 = (f_scale ** 2)[:, None]
+    z = residuals ** 2 / scale2
+    if loss == 'huber':
+        rho = np.where(z <= 1, z, 2 * np.sqrt(z) - 1)
+        drho = np.where(z <= 1, 1.0, 1 / np.sqrt(np.maximum(z, 1)))
+    else:
+        rho = 2 * (np.sqrt(1 + z) - 1)
+        drho = 1 / np.sqrt(1 + z)
+    return np.sum(weights * scale2 * rho, axis=1), weights * drho
+
+def screen_plate(Y, mask, anomalies):
+    """Reason to skip fitting each row of a plate: 'flat', 'noisy' or None.
+    
+    Uses the anomaly labels already computed for the plate plus one cheap
+    monotonicity check, so obvious negatives are classified without a fit:
+    low_amplitude or an end barely above the start is flat, high_noise is
+    noisy. Rows with too few points are left to the normal path.
+    """
+    n = mask.sum(axis=1)
+    col = np.arange(Y.shape[1])[None, :]
+    edge = np.maximum(3, n // 5)[:, None]
+    head = mask & (col < edge)
+    tail = mask & (col >= (n[:, None] - edge))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rise = (np.where(tail, Y, 0).sum(axis=1) / tail.sum(axis=1)
+                - np.where(head, Y, 0).sum(axis=1) / head.sum(axis=1))
+    rfu_range = np.where(mask, Y, -np.inf).max(axis=1) - np.where(mask, Y, np.inf).min(axis=1)
+    
+    reasons = []
+    for i, labels in enumerate(anomalies):
+        if n[i] < 5:
+            reasons.append(None)
+        elif 'low_amplitude' in labels or not rise[i] >= SCREEN_MIN_RISE_FRACTION * rfu_range[i]:
+            reasons.append('flat')
+        elif 'high_noise' in labels:
+            reasons.append('noisy')
+        else:
+            reasons.append(None)
+    return reasons
+
+def _screened_result(cycles, rfu, reason):
+    """Result of a well classified by screening alone: not a good S-curve, no fit"""
+    return {
+        'is_good_scurve': False,
+        'fit_path': f'screened_{reason}',
+        'function_evaluations': 0,
+        'data_points': int(len(cycles)),
+        'cycle_range': float(np.max(cycles) - np.min(cycles)),
+        'rfu_range': float(np.max(rfu) - np.min(rfu))
+    }
+
+def analyze_curve_quality(cycles, rfu, plot=False, start=None, robust=False):
+    """Analyze if a curve matches S-shaped pattern and return quality metrics.
+    
+    start, if given, is (p0, (lower, upper)) to use instead of the data-driven guesses.
+    robust fits with ROBUST_LOSS and at most ROBUST_MAX_NFEV evaluations.
+    """
     try:
         # Ensure we have enough data points
         if len(cycles) < 5 or len(rfu) < 5:
@@ -29,64 +384,34 @@ def analyze_curve_quality(cycles, rfu, plot=False):
         if len(cycles) < 5:
             return {'error': 'Insufficient valid data points', 'is_good_scurve': False}
         
-        # Dynamic initial parameter guesses based on data characteristics
-        rfu_range = np.max(rfu) - np.min(rfu)
-        L_guess = rfu_range * 1.1  # Amplitude with some buffer
-        k_guess = 0.5  # Steepness - start conservative
-        x0_guess = cycles[len(cycles)//2]  # Midpoint
-        B_guess = np.min(rfu)  # Baseline
+        p0, bounds = start if start is not None else _initial_fit_parameters(cycles, rfu)
         
-        # Adaptive bounds based on data
-        cycle_range = np.max(cycles) - np.min(cycles)
-        bounds = (
-            [rfu_range * 0.1, 0.01, np.min(cycles), np.min(rfu) - rfu_range * 0.1],  # Lower bounds
-            [rfu_range * 5, 10, np.max(cycles), np.max(rfu)]  # Upper bounds
-        )
+        options = {}
+        if robust:
+            f_scale = ROBUST_LOSS_SCALE * _noise_scale_plate(rfu[None, :], np.ones((1, len(rfu)), dtype=bool))[0]
+            options = {'loss': ROBUST_LOSS, 'f_scale': f_scale}
         
         # Fit sigmoid with bounds
-        popt, pcov = curve_fit(
+        popt, pcov, infodict, _, _ = curve_fit(
             sigmoid, cycles, rfu, 
-            p0=[L_guess, k_guess, x0_guess, B_guess],
+            p0=p0,
             bounds=bounds,
-            maxfev=5000,
-            method='trf'
+            jac=sigmoid_jacobian,
+            maxfev=ROBUST_MAX_NFEV if robust else 5000,
+            method='trf',
+            full_output=True,
+            **options
         )
         
-        # Calculate fit quality
-        fit_rfu = sigmoid(cycles, *popt)
-        r2 = r2_score(rfu, fit_rfu)
-        
-        # Calculate residuals
-        residuals = rfu - fit_rfu
-        rmse = np.sqrt(np.mean(residuals**2))
-        
-        # Extract parameters
-        L, k, x0, B = popt
-        
-        # Dynamic quality criteria based on data characteristics
-        min_amplitude = max(50, rfu_range * 0.3)  # Adaptive amplitude threshold
-        r2_threshold = 0.9 if len(cycles) > 20 else 0.85  # Relaxed for shorter runs
-        
-        # Quality criteria for S-curve identification - convert numpy types to Python types
-        criteria = {
-            'r2_score': float(r2),
-            'rmse': float(rmse),
-            'amplitude': float(L),
-            'steepness': float(k),
-            'midpoint': float(x0),
-            'baseline': float(B),
-            'is_good_scurve': bool(r2 > r2_threshold and k > 0.05 and L > min_amplitude),
-            'fit_parameters': [float(x) for x in popt],
-            'parameter_errors': [float(x) for x in np.sqrt(np.diag(pcov))],
-            'fitted_curve': [float(x) for x in fit_rfu],
-            'data_points': int(len(cycles)),
-            'cycle_range': float(cycle_range)
-        }
+        criteria = _summarize_fit(cycles, rfu, popt, np.sqrt(np.diag(pcov)), robust)
+        criteria['function_evaluations'] = int(infodict['nfev'])
         
         if plot:
+            # Plotting is for interactive use only; keep matplotlib out of the web workers
+            import matplotlib.pyplot as plt
             plt.figure(figsize=(10, 6))
             plt.plot(cycles, rfu, 'bo', label='Data', markersize=4)
-            plt.plot(cycles, fit_rfu, 'r-', label='Sigmoid Fit (R²={:.3f})'.format(r2), linewidth=2)
+            plt.plot(cycles, criteria['fitted_curve'], 'r-', label='Sigmoid Fit (R²={:.3f})'.format(criteria['r2_score']), linewidth=2)
             plt.xlabel('Cycle')
             plt.ylabel('RFU')
             plt.legend()
@@ -99,30 +424,289 @@ def analyze_curve_quality(cycles, rfu, plot=False):
     except Exception as e:
         return {'error': str(e), 'is_good_scurve': False}
 
-def batch_analyze_wells(data_dict):
-    """Analyze multiple wells/samples for S-curve patterns"""
+def _stack_plate(data_dict, well_ids, n_max=None):
+    """Stack wells into left-aligned (n_wells x n_cycles) arrays of their finite points"""
+    # A fixed column count keeps chunked and whole-plate fits bit-identical
+    if n_max is None:
+        n_max = max((len(data_dict[w]['cycles']) for w in well_ids), default=0)
+    X = np.full((len(well_ids), n_max), np.nan)
+    Y = np.full((len(well_ids), n_max), np.nan)
+    for i, well_id in enumerate(well_ids):
+        cycles = np.asarray(data_dict[well_id]['cycles'], dtype=float)
+        rfu = np.asarray(data_dict[well_id]['rfu'], dtype=float)
+        n = min(len(cycles), len(rfu))
+        X[i, :n] = cycles[:n]
+        Y[i, :n] = rfu[:n]
+    
+    # Move the finite points of every row to the front, keeping their order
+    valid = np.isfinite(X) & np.isfinite(Y)
+    order = np.argsort(~valid, axis=1, kind='stable')
+    X = np.take_along_axis(X, order, axis=1)
+    Y = np.take_along_axis(Y, order, axis=1)
+    n_valid = valid.sum(axis=1)
+    mask = np.arange(n_max)[None, :] < n_valid[:, None]
+    X[~mask] = 0.0
+    Y[~mask] = 0.0
+    return X, Y, mask, n_valid
+
+def _sigmoid_plate(X, P):
+    """Evaluate sigmoid and its Jacobian for every row of X with per-row parameters P"""
+    L, k, x0 = P[:, 0:1], P[:, 1:2], P[:, 2:3]
+    with np.errstate(over='ignore'):
+        s = 1.0 / (1.0 + np.exp(-k * (X - x0)))
+    ds = s * (1.0 - s)
+    f = L * s + P[:, 3:4]
+    J = np.stack([s, L * ds * (X - x0), -L * ds * k, np.ones_like(s)], axis=-1)
+    return f, J
+
+def fit_sigmoid_plate(X, Y, mask, max_iter=BATCH_FIT_MAX_ITER, ftol=1e-10, xtol=1e-10, gtol=BATCH_FIT_GTOL,
+                      start=None, loss=None, f_scale=None):
+    """Fit sigmoid to every well at once with a vectorized, bound-projected Levenberg-Marquardt.
+    
+    X, Y and mask are (n_wells x n_cycles) arrays with the finite points of each
+    well left-aligned (see _stack_plate). Starting point and bounds match the
+    per-well curve_fit path. Returns the fitted parameters, their standard
+    errors and a per-well convergence mask. Wells that do not converge, or end
+    up on a bound without satisfying the first-order optimality test (see
+    _bound_optimal), are flagged so the caller can refit them with
+    analyze_curve_quality. start, if given, is
+    (P0, lower, upper) to use instead of the data-driven guesses. loss
+    ('soft_l1' or 'huber', with per-well scale f_scale) minimizes a robust
+    cost by iteratively reweighted least squares.
+    """
+    n_wells = X.shape[0]
+    W = mask.astype(float)
+    n_valid = mask.sum(axis=1)
+    
+    # Same starting point and bounds as the per-well path, unless the caller has better ones
+    if start is not None:
+        P, lower, upper = (np.array(a, dtype=float) for a in start)
+    else:
+        P, lower, upper = _initial_fit_parameters_plate(X, Y, mask)
+    bound_tol = 1e-8 * (upper - lower)
+    
+    f, _ = _sigmoid_plate(X, P)
+    cost, _ = _robust_loss(Y - f, W, f_scale, loss)
+    lam = np.full(n_wells, 1e-3)
+    active = np.isfinite(cost) & (upper[:, 0] > 0)
+    converged = np.zeros(n_wells, dtype=bool)
+    nfev = np.ones(n_wells, dtype=int)
+    
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        
+        Xa, Ya, Wa, Pa = X[idx], Y[idx], W[idx], P[idx]
+        scale = f_scale[idx] if f_scale is not None else None
+        f, J = _sigmoid_plate(Xa, Pa)
+        # Robust losses reweight every residual by the loss derivative at its current size
+        _, Wr = _robust_loss(Ya - f, Wa, scale, loss)
+        JtJ = np.einsum('nmi,nm,nmj->nij', J, Wr, J)
+        g = np.einsum('nmi,nm->ni', J, Wr * (Ya - f))
+        
+        # Marquardt damping on the diagonal keeps the system positive definite
+        diag = np.maximum(np.diagonal(JtJ, axis1=1, axis2=2), 1e-12)
+        A = JtJ + (lam[idx][:, None] * diag)[:, :, None] * np.eye(4)
+        try:
+            step = np.linalg.solve(A, g[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            step = np.array([_solve_step(A[j], g[j]) for j in range(idx.size)])
+        
+        P_new = np.clip(Pa + step, lower[idx], upper[idx])
+        f_new, _ = _sigmoid_plate(Xa, P_new)
+        cost_new, _ = _robust_loss(Ya - f_new, Wa, scale, loss)
+        nfev[idx] += 1
+        
+        improved = np.isfinite(cost_new) & (cost_new < cost[idx])
+        reduction = cost[idx] - np.where(improved, cost_new, cost[idx])
+        small_step = np.all(np.abs(P_new - Pa) <= xtol * (np.abs(Pa) + xtol), axis=1)
+        
+        P[idx[improved]] = P_new[improved]
+        cost[idx[improved]] = cost_new[improved]
+        lam[idx] = np.where(improved, np.maximum(lam[idx] / 10, 1e-12), lam[idx] * 10)
+        
+        # Per-well convergence: negligible cost reduction or step, or no descent direction left
+        done = (improved & ((reduction <= ftol * cost[idx]) | small_step)) | (lam[idx] > 1e10)
+        converged[idx[done]] = True
+        active[idx[done]] = False
+    
+    # Wells resting on a bound need the proper constrained solver, unless they are already optimal there
+    at_lower = P - lower <= bound_tol
+    at_upper = upper - P <= bound_tol
+    on_bound = np.any(at_lower | at_upper, axis=1)
+    converged &= np.all(np.isfinite(P), axis=1)
+    check = np.flatnonzero(converged & on_bound)
+    if check.size:
+        scale = f_scale[check] if f_scale is not None else None
+        optimal = _bound_optimal(X[check], Y[check], W[check], P[check], at_lower[check], at_upper[check],
+                                 gtol, scale, loss)
+        converged[check[~optimal]] = False
+    
+    # Covariance as in curve_fit: pinv(J^T J) scaled by the residual variance
+    f, J = _sigmoid_plate(X, P)
+    J = J * W[:, :, None]
+    _, s, VT = np.linalg.svd(J, full_matrices=False)
+    threshold = np.finfo(float).eps * np.maximum(n_valid, 4)[:, None] * s[:, :1]
+    inv_s2 = np.where(s > threshold, 1.0 / np.where(s > 0, s, 1.0) ** 2, 0.0)
+    pcov = np.einsum('nki,nk,nkj->nij', VT, inv_s2, VT)
+    dof = np.maximum(n_valid - 4, 1)
+    pcov *= (np.sum(W * (Y - f) ** 2, axis=1) / dof)[:, None, None]
+    perr = np.sqrt(np.diagonal(pcov, axis1=1, axis2=2))
+    
+    return P, perr, converged, nfev
+
+def _bound_optimal(X, Y, W, P, at_lower, at_upper, gtol, f_scale=None, loss=None):
+    """Whether each fit resting on a bound is a first-order optimum of the box-constrained problem.
+    
+    The gradient is projected onto the feasible set by dropping components
+    that point out through an active bound. The fit counts as optimal when a
+    Gauss-Newton step along the remaining free directions would reduce the
+    cost by at most gtol times the cost.
+    """
+    f, J = _sigmoid_plate(X, P)
+    cost, Wr = _robust_loss(Y - f, W, f_scale, loss)
+    g = np.einsum('nmi,nm->ni', J, Wr * (Y - f))
+    # g is the descent direction: a bound blocks it when it points below the lower or above the upper bound
+    blocked = (at_lower & (g < 0)) | (at_upper & (g > 0))
+    g = np.where(blocked, 0.0, g)
+    JtJ = np.einsum('nmi,nm,nmj->nij', J, Wr, J)
+    free = ~blocked
+    JtJ = np.where(free[:, :, None] & free[:, None, :], JtJ, np.eye(4))
+    gain = np.einsum('ni,nij,nj->n', g, np.linalg.pinv(JtJ), g)
+    return np.isfinite(gain) & (gain <= gtol * cost)
+
+def _solve_step(A, g):
+    """Solve a single damped normal-equation system, tolerating singular matrices"""
+    try:
+        return np.linalg.solve(A, g)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(A, g, rcond=None)[0]
+
+def batch_analyze_wells(data_dict, cache=None, progress=None, timer=NULL_TIMER, priors=None, robust=False):
+    """Analyze multiple wells/samples for S-curve patterns.
+    
+    Cached results are reused when a cache is given; progress, if given, is
+    called as progress(wells_done, total_wells) while the plate is analyzed.
+    Stage timings and per-well fit statistics go to timer (see metrics.start_timer).
+    priors, if given, maps well ids to prior (L, k, x0, B) fits used to warm-start them.
+    robust screens out flat and noisy wells and fits the rest with a robust loss.
+    """
+    # Only fit wells whose exact data has not been analyzed before
+    cached = {}
+    if cache is not None:
+        with timer.stage('cache_lookup'):
+            mode = 'robust' if robust else None
+            keys = {well_id: cache.key_for(data, mode, priors.get(well_id) if priors else None)
+                    for well_id, data in data_dict.items()}
+            stored = cache.get_many(list(set(keys.values())))
+            cached = {well_id: stored[key] for well_id, key in keys.items() if key in stored}
+    
+    to_analyze = {well_id: data for well_id, data in data_dict.items() if well_id not in cached}
+    
+    def report_chunk(done):
+        progress(len(cached) + done, len(data_dict))
+    
+    if progress is not None:
+        progress(len(cached), len(data_dict))
+    chunk_progress = report_chunk if progress is not None else None
+    well_results, batch_fitted, workers = (_analyze_plate(to_analyze, chunk_progress, timer, priors, robust)
+                                           if to_analyze else ({}, 0, 1))
+    
+    if cache is not None:
+        with timer.stage('cache_store'):
+            cache.put_many({keys[well_id]: well_results[well_id] for well_id in to_analyze})
+    
+    warm_report = None
+    if priors is not None:
+        with timer.stage('warm_start_control'):
+            warm_report = _warm_start_report(to_analyze, well_results, priors, robust)
+    fit_paths = {}
+    for well_id in to_analyze:
+        path = well_results[well_id]['fit_path']
+        fit_paths[path] = fit_paths.get(path, 0) + 1
+    screened = sum(count for path, count in fit_paths.items() if path.startswith('screened_'))
+    well_results.update(cached)
+    
+    # Always derived from the fit, so cached wells follow the current threshold
+    with timer.stage('threshold_cycles'):
+        _add_threshold_cycles(data_dict, well_results)
+    
+    return {
+        **_plate_results(data_dict, well_results),
+        'fit_engine': {
+            'mode': 'batch' if BATCH_FIT_ENABLED else 'serial',
+            'robust': robust,
+            'batch_fitted_wells': batch_fitted,
+            'curve_fit_wells': fit_paths.get('curve_fit', 0),
+            'screened_wells': screened,
+            'screened_fraction': screened / len(to_analyze) if to_analyze else None,
+            'fit_paths': fit_paths,
+            'parallel_workers': workers,
+            'warm_start': warm_report
+        },
+        'result_cache': {
+            'enabled': cache is not None,
+            'hits': len(cached),
+            'misses': len(to_analyze)
+        }
+    }
+
+def _warm_start_report(data_dict, well_results, priors, robust=False, control_wells=WARM_START_CONTROL_WELLS):
+    """Warm-start outcome for processing_info.
+    
+    The speedup compares like with like: an evenly spaced sample of up to
+    control_wells warm-started wells is fitted again from a cold start with
+    the same engine, and its mean function evaluations are set against the
+    warm fits of those same wells.
+    """
+    attempted = sum(1 for well_id in data_dict if well_id in priors)
+    warm = [well_id for well_id in data_dict if well_results[well_id].get('fit_start') == 'warm']
+    sample = warm[::max(1, len(warm) // control_wells)][:control_wells] if control_wells > 0 else []
+    
+    warm_mean = cold_mean = None
+    if sample:
+        warm_mean = float(np.mean([well_results[w]['function_evaluations'] for w in sample]))
+        cold_mean = float(np.mean(_cold_evaluations(data_dict, sample, robust)))
+    return {
+        'attempted_wells': attempted,
+        'warm_started_wells': len(warm),
+        'cold_fallback_wells': attempted - len(warm),
+        'control_wells': len(sample),
+        'mean_function_evaluations_warm': warm_mean,
+        'mean_function_evaluations_cold': cold_mean,
+        'speedup': cold_mean / warm_mean if warm_mean and cold_mean else None
+    }
+
+def _cold_evaluations(data_dict, well_ids, robust=False):
+    """Function evaluations of cold-start fits of the given wells, with the engine that warm-started them"""
+    X, Y, mask, n_valid = _stack_plate(data_dict, well_ids)
+    if BATCH_FIT_ENABLED:
+        _, _, _, nfev = fit_sigmoid_plate(X, Y, mask, **_batch_fit_options(Y, mask, robust))
+        return nfev.tolist()
+    return [analyze_curve_quality(X[i, :n_valid[i]], Y[i, :n_valid[i]], robust=robust).get('function_evaluations', 0)
+            for i in range(len(well_ids))]
+
+def _plate_results(data_dict, well_results):
+    """Per-well results in upload order, with the plate's good curves, cycle info and summary"""
     results = {}
     good_curves = []
     cycle_info = None
     
-    for well_id, data in data_dict.items():
+    # Store cycle info from first well - convert to Python types
+    for data in data_dict.values():
         cycles = data['cycles']
-        rfu = data['rfu']
-        
-        # Store cycle info from first well - convert to Python types
-        if cycle_info is None and len(cycles) > 0:
+        if len(cycles) > 0:
             cycle_info = {
                 'min': int(min(cycles)),
                 'max': int(max(cycles)),
                 'count': int(len(cycles))
             }
-        
-        analysis = analyze_curve_quality(cycles, rfu)
-        
-        # Add anomaly detection
-        anomalies = detect_curve_anomalies(cycles, rfu)
-        analysis['anomalies'] = anomalies
-        
+            break
+    
+    # Merge back in upload order regardless of how the plate was split
+    for well_id in data_dict:
+        analysis = well_results[well_id]
         results[well_id] = analysis
         
         if analysis.get('is_good_scurve', False):
@@ -139,83 +723,343 @@ def batch_analyze_wells(data_dict):
         }
     }
 
+def batch_analyze_plates(plates, cache=None, progress=None, timer=NULL_TIMER, priors=None, robust=False):
+    """Analyze several plates in one pass so the fitting engine is not restarted per plate.
+    
+    plates maps a plate key to a well dict as taken by batch_analyze_wells, and
+    priors (optional) a plate key to that plate's warm-start priors.
+    Returns ({plate key: batch_analyze_wells-style results without engine
+    info}, engine info for the whole batch).
+    """
+    combined = {(key, well_id): data for key, data_dict in plates.items() for well_id, data in data_dict.items()}
+    combined_priors = None
+    if priors is not None:
+        combined_priors = {(key, well_id): prior for key, plate_priors in priors.items()
+                           for well_id, prior in (plate_priors or {}).items()}
+    merged = batch_analyze_wells(combined, cache=cache, progress=progress, timer=timer, priors=combined_priors,
+                                 robust=robust)
+    
+    well_results = {key: {} for key in plates}
+    for (key, well_id), analysis in merged['individual_results'].items():
+        well_results[key][well_id] = analysis
+    
+    results = {key: _plate_results(data_dict, well_results[key]) for key, data_dict in plates.items()}
+    return results, {'fit_engine': merged['fit_engine'], 'result_cache': merged['result_cache']}
+
+def _analyze_plate(data_dict, progress=None, timer=NULL_TIMER, priors=None, robust=False):
+    """Analyze all wells, in chunks on the process pool when parallel mode is enabled"""
+    n_cols = max((len(d.get('cycles', [])) for d in data_dict.values()), default=0)
+    parallel = PARALLEL_WORKERS > 1 and len(data_dict) > PARALLEL_CHUNK_SIZE
+    collect_stats = timer.enabled
+    
+    # One piece is fastest in-process; chunks are only needed for the pool or to report progress
+    if not parallel and progress is None:
+        well_results, batch_fitted, stats = _analyze_well_chunk(data_dict, n_cols, collect_stats, priors, robust)
+        if stats is not None:
+            timer.add_fit_stats(stats)
+        return well_results, batch_fitted, 1
+    
+    items = list(data_dict.items())
+    chunks = [dict(items[i:i + PARALLEL_CHUNK_SIZE]) for i in range(0, len(items), PARALLEL_CHUNK_SIZE)]
+    # Each chunk only carries the priors of its own wells to the pool
+    chunk_priors = [{w: priors[w] for w in chunk if w in priors} if priors else None for chunk in chunks]
+    
+    if parallel:
+        try:
+            pool = get_process_pool()
+            chunk_results = pool.map(_analyze_well_chunk, chunks, [n_cols] * len(chunks),
+                                     [collect_stats] * len(chunks), chunk_priors, [robust] * len(chunks))
+            return _merge_chunks(chunk_results, progress, timer) + (PARALLEL_WORKERS,)
+        except BrokenProcessPool as e:
+            print(f"Process pool failed, analyzing in-process: {e}")
+            shutdown_process_pool()
+    
+    chunk_results = (_analyze_well_chunk(chunk, n_cols, collect_stats, chunk_prior, robust)
+                     for chunk, chunk_prior in zip(chunks, chunk_priors))
+    return _merge_chunks(chunk_results, progress, timer) + (1,)
+
+def _merge_chunks(chunk_results, progress=None, timer=NULL_TIMER):
+    """Collect chunk results in order, reporting wells done after each chunk"""
+    well_results = {}
+    batch_fitted = 0
+    for results, fitted, stats in chunk_results:
+        well_results.update(results)
+        batch_fitted += fitted
+        if stats is not None:
+            # Chunk stage times add up, so with a pool they measure work rather than wall time
+            timer.add_fit_stats(stats)
+        if progress is not None:
+            progress(len(well_results))
+    return well_results, batch_fitted
+
+def _analyze_well_chunk(data_dict, n_cols=None, collect_stats=False, priors=None, robust=False):
+    """Fit and check a group of wells; runs in pool workers as well as in-process.
+    
+    Wells with an entry in priors are first fitted from that warm start; any
+    that do not settle into a good fit are refitted cold as usual. In robust
+    mode, wells that screen_plate rejects are not fitted at all and the rest
+    are fitted with a robust loss. Every result records its fit_path.
+    Returns (results, wells fitted by the batch engine, FitStats or None).
+    """
+    stats = FitStats() if collect_stats else None
+    clock = time.perf_counter
+    
+    # Convert every well to the plate matrix once; fitting and anomaly checks both read from it
+    start = clock()
+    well_ids = [w for w, d in data_dict.items() if len(d['cycles']) == len(d['rfu'])]
+    X, Y, mask, n_valid = _stack_plate(data_dict, well_ids, n_cols)
+    rows = {well_id: i for i, well_id in enumerate(well_ids)}
+    n_raw = [len(data_dict[w]['cycles']) for w in well_ids]
+    if stats is not None:
+        stats.add_stage('plate_stacking', clock() - start)
+    
+    start = clock()
+    plate_anomalies = detect_plate_anomalies(Y, mask, n_raw) if well_ids else []
+    if stats is not None:
+        stats.add_stage('anomaly_detection', clock() - start)
+    
+    screened = {}
+    if robust and well_ids:
+        start = clock()
+        screened = {i: reason for i, reason in enumerate(screen_plate(Y, mask, plate_anomalies)) if reason}
+        if stats is not None:
+            stats.add_stage('screening', clock() - start)
+    
+    prior = None
+    if priors and well_ids:
+        prior = np.array([priors.get(w, (np.nan,) * 4) for w in well_ids], dtype=float)
+    
+    # Warm-started wells first; only the ones that end up good skip the cold fit below
+    warm_fits = {}
+    if prior is not None and BATCH_FIT_ENABLED:
+        start = clock()
+        warm_fits = _batch_fit_wells(X, Y, mask, n_valid, n_raw, skip=list(screened), prior=prior, robust=robust)
+        if stats is not None:
+            warm_seconds = clock() - start
+            stats.add_stage('warm_batch_fit', warm_seconds)
+            for analysis in warm_fits.values():
+                stats.add_fit('batch_warm', warm_seconds / len(warm_fits), analysis)
+    
+    # Fit all wells at once; anything the batch engine cannot settle goes through curve_fit
+    start = clock()
+    batch_fits = {}
+    if BATCH_FIT_ENABLED and well_ids:
+        batch_fits = _batch_fit_wells(X, Y, mask, n_valid, n_raw, skip=list(warm_fits) + list(screened), robust=robust)
+    if stats is not None:
+        batch_seconds = clock() - start
+        stats.add_stage('batch_fit', batch_seconds)
+        for analysis in batch_fits.values():
+            stats.add_fit('batch', batch_seconds / len(batch_fits), analysis)
+    batch_fits.update(warm_fits)
+    
+    results = {}
+    for well_id, data in data_dict.items():
+        i = rows.get(well_id)
+        analysis = batch_fits.get(i) if i is not None else None
+        if i in screened:
+            analysis = _screened_result(X[i, :n_valid[i]], Y[i, :n_valid[i]], screened[i])
+            if stats is not None:
+                stats.add_fit('screened', 0.0, analysis)
+        elif analysis is None:
+            start = clock()
+            if i is not None and n_valid[i] >= 5:
+                # Serial mode warm-starts curve_fit directly, falling back to a cold fit
+                if prior is not None and not BATCH_FIT_ENABLED:
+                    analysis = _warm_curve_fit(X[i:i + 1, :n_valid[i]], Y[i:i + 1, :n_valid[i]], prior[i:i + 1], robust)
+                if analysis is None:
+                    analysis = analyze_curve_quality(X[i, :n_valid[i]], Y[i, :n_valid[i]], robust=robust)
+            else:
+                analysis = analyze_curve_quality(data['cycles'], data['rfu'])
+            analysis['fit_path'] = 'curve_fit'
+            if stats is not None:
+                seconds = clock() - start
+                stats.add_stage('curve_fit', seconds)
+                stats.add_fit('curve_fit', seconds, analysis)
+        
+        if i is None:
+            analysis['anomalies'] = detect_curve_anomalies(data['cycles'], data['rfu'])
+        else:
+            analysis['anomalies'] = plate_anomalies[i]
+        results[well_id] = analysis
+    
+    return results, len(batch_fits), stats
+
+def _batch_fit_wells(X, Y, mask, n_valid, n_raw, skip=(), prior=None, robust=False):
+    """Run fit_sigmoid_plate over a stacked plate and return criteria for the rows it converged on.
+    
+    Rows listed in skip are left out. With prior ((n_wells x 4), NaN where
+    there is none) only rows with a usable prior are fitted, from that warm
+    start, and only good fits are returned. robust fits with ROBUST_LOSS and
+    at most ROBUST_MAX_NFEV iterations.
+    """
+    fittable = (n_valid >= 5) & (np.asarray(n_raw) >= 5)
+    fittable[list(skip)] = False
+    start = None
+    if prior is not None:
+        fittable &= np.all(np.isfinite(prior[:, :3]), axis=1)
+        if np.any(fittable):
+            p0, lower, upper, usable = _warm_start_parameters_plate(X[fittable], Y[fittable], mask[fittable], prior[fittable])
+            fittable[np.flatnonzero(fittable)[~usable]] = False
+            start = (p0[usable], lower[usable], upper[usable])
+    if not np.any(fittable):
+        return {}
+    
+    options = _batch_fit_options(Y[fittable], mask[fittable], robust)
+    try:
+        P, perr, converged, nfev = fit_sigmoid_plate(X[fittable], Y[fittable], mask[fittable], start=start, **options)
+    except Exception as e:
+        print(f"Batch fit failed, falling back to per-well fitting: {e}")
+        return {}
+    
+    pinned = np.zeros(len(P), dtype=bool)
+    if prior is not None:
+        pinned = _pinned_by_prior(X[fittable], Y[fittable], mask[fittable], P, start[1], start[2])
+    
+    fits = {}
+    rows = np.flatnonzero(fittable)
+    for j in np.flatnonzero(converged):
+        i = rows[j]
+        n = n_valid[i]
+        analysis = _summarize_fit(X[i, :n], Y[i, :n], P[j], perr[j], robust)
+        if prior is not None and (pinned[j] or not analysis['is_good_scurve']):
+            # A poor fit near the prior, or one held by its bounds, proves nothing; the cold fit decides
+            continue
+        analysis['function_evaluations'] = int(nfev[j])
+        analysis['fit_path'] = 'batch'
+        if prior is not None:
+            analysis['fit_start'] = 'warm'
+            analysis['fit_path'] = 'batch_warm'
+        fits[i] = analysis
+    return fits
+
+def _batch_fit_options(Y, mask, robust):
+    """Keyword arguments of fit_sigmoid_plate for plain or robust fits of these rows"""
+    if not robust:
+        return {}
+    f_scale = ROBUST_LOSS_SCALE * _noise_scale_plate(Y, mask)
+    return {'max_iter': ROBUST_MAX_NFEV, 'loss': ROBUST_LOSS, 'f_scale': f_scale}
+
+def _warm_curve_fit(X, Y, prior, robust=False):
+    """curve_fit one well (a 1-row plate) from its prior; None if the prior is unusable, the fit not good or held by the prior's bounds"""
+    if not np.all(np.isfinite(prior[0, :3])):
+        return None
+    p0, lower, upper, usable = _warm_start_parameters_plate(X, Y, np.ones(X.shape, dtype=bool), prior)
+    if not usable[0]:
+        return None
+    analysis = analyze_curve_quality(X[0], Y[0], start=(list(p0[0]), (list(lower[0]), list(upper[0]))), robust=robust)
+    if 'error' in analysis or not analysis['is_good_scurve']:
+        return None
+    if _pinned_by_prior(X, Y, np.ones(X.shape, dtype=bool), np.array([analysis['fit_parameters']]), lower, upper)[0]:
+        return None
+    analysis['fit_start'] = 'warm'
+    return analysis
+
+def get_process_pool():
+    """Return the process pool shared by all requests in this worker, starting it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS)
+    return _process_pool
+
+@atexit.register
+def shutdown_process_pool():
+    """Stop the shared process pool so a later request can start a fresh one"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+ANOMALY_CHECKS = ['low_amplitude', 'early_plateau', 'unstable_baseline',
+                  'negative_amplification', 'negative_rfu_values', 'high_noise']
+
 def detect_curve_anomalies(cycles, rfu):
     """Detect common qPCR curve problems - adapted for variable cycle counts"""
-    anomalies = []
-    
     if len(cycles) < 5 or len(rfu) < 5:
-        anomalies.append('insufficient_data')
-        return anomalies
-    
-    cycles = np.array(cycles)
-    rfu = np.array(rfu)
+        return ['insufficient_data']
     
-    # Remove NaN values
-    valid_indices = np.isfinite(cycles) & np.isfinite(rfu)
-    cycles = cycles[valid_indices]
-    rfu = rfu[valid_indices]
+    X, Y, mask, n_valid = _stack_plate({None: {'cycles': cycles, 'rfu': rfu}}, [None])
+    return detect_plate_anomalies(Y, mask, [min(len(cycles), len(rfu))])[0]
+
+def _masked_std(values, mask):
+    """Row-wise population standard deviation over the masked entries"""
+    count = np.maximum(mask.sum(axis=1), 1)
+    mean = np.where(mask, values, 0.0).sum(axis=1) / count
+    return np.sqrt(np.where(mask, (values - mean[:, None]) ** 2, 0.0).sum(axis=1) / count)
+
+def detect_plate_anomalies(Y, mask, n_raw):
+    """Run every detect_curve_anomalies check on a left-aligned (n_wells x n_cycles) plate at once.
     
-    if len(cycles) < 5:
-        anomalies.append('insufficient_valid_data')
-        return anomalies
+    Y and mask come from _stack_plate; n_raw holds each well's length before
+    NaN filtering. Returns one anomaly list per row, in the same order and with
+    the same labels as detect_curve_anomalies.
+    """
+    n_raw = np.asarray(n_raw)
+    n = mask.sum(axis=1)
+    n_cols = Y.shape[1]
+    if n_cols < 5:
+        return [['insufficient_data'] if r < 5 else ['insufficient_valid_data'] for r in n_raw]
     
-    rfu_range = np.max(rfu) - np.min(rfu)
+    col = np.arange(n_cols)[None, :]
+    rfu_range = np.where(mask, Y, -np.inf).max(axis=1) - np.where(mask, Y, np.inf).min(axis=1)
     
     # Check for plateau curves (no exponential phase) - adaptive threshold
-    min_amplitude = max(50, rfu_range * 0.1)
-    if rfu_range < min_amplitude:
-        anomalies.append('low_amplitude')
+    low_amplitude = rfu_range < np.maximum(50, rfu_range * 0.1)
     
     # Check for early plateau - adaptive to cycle count
-    plateau_check_point = min(len(rfu) // 2, len(rfu) - 5)
-    if plateau_check_point > 0:
-        plateau_std = np.std(rfu[plateau_check_point:])
-        if plateau_std < max(20, rfu_range * 0.05):
-            anomalies.append('early_plateau')
+    plateau_check_point = np.minimum(n // 2, n - 5)
+    plateau_std = _masked_std(Y, mask & (col >= plateau_check_point[:, None]))
+    early_plateau = (plateau_check_point > 0) & (plateau_std < np.maximum(20, rfu_range * 0.05))
     
     # Check for irregular baseline - use first 20% of data or minimum 3 points
-    baseline_points = max(3, len(rfu) // 5)
-    baseline_rfu = rfu[:baseline_points]
-    baseline_std = np.std(baseline_rfu)
-    if baseline_std > max(50, rfu_range * 0.15):
-        anomalies.append('unstable_baseline')
+    baseline_points = np.maximum(3, n // 5)
+    baseline_std = _masked_std(Y, mask & (col < baseline_points[:, None]))
+    unstable_baseline = baseline_std > np.maximum(50, rfu_range * 0.15)
     
     # Check for negative amplification in potential exponential phase
-    exp_start = max(baseline_points, len(rfu) // 4)
-    exp_end = min(len(rfu) - 1, exp_start + len(rfu) // 3)
-    if exp_end > exp_start:
-        exp_phase_rfu = rfu[exp_start:exp_end]
-        if len(exp_phase_rfu) > 2:
-            max_decrease = np.min(np.diff(exp_phase_rfu))
-            if max_decrease < -max(30, rfu_range * 0.1):
-                anomalies.append('negative_amplification')
+    exp_start = np.maximum(baseline_points, n // 4)
+    exp_end = np.minimum(n - 1, exp_start + n // 3)
+    diffs = np.diff(Y, axis=1)
+    diff_col = col[:, :-1]
+    exp_phase = (diff_col >= exp_start[:, None]) & (diff_col + 1 < exp_end[:, None])
+    max_decrease = np.where(exp_phase, diffs, np.inf).min(axis=1)
+    negative_amplification = (exp_end - exp_start > 2) & (max_decrease < -np.maximum(30, rfu_range * 0.1))
     
     # Check for data quality issues
-    if np.any(rfu < 0):
-        anomalies.append('negative_rfu_values')
+    negative_rfu_values = np.any(mask & (Y < 0), axis=1)
     
     # Check for extremely high noise
-    if len(rfu) > 5:
-        noise_level = np.std(np.diff(rfu))
-        if noise_level > rfu_range * 0.3:
-            anomalies.append('high_noise')
+    noise_level = _masked_std(diffs, mask[:, 1:])
+    high_noise = (n > 5) & (noise_level > rfu_range * 0.3)
     
+    flags = np.column_stack([low_amplitude, early_plateau, unstable_baseline,
+                             negative_amplification, negative_rfu_values, high_noise])
+    anomalies = []
+    for i in range(len(n)):
+        if n_raw[i] < 5:
+            anomalies.append(['insufficient_data'])
+        elif n[i] < 5:
+            anomalies.append(['insufficient_valid_data'])
+        else:
+            anomalies.append([ANOMALY_CHECKS[j] for j in np.flatnonzero(flags[i])])
     return anomalies
 
-def process_csv_data(data_dict):
+def process_csv_data(data_dict, cache=None, progress=None, timer=NULL_TIMER, priors=None, robust=False):
     """Process uploaded CSV data and perform comprehensive analysis"""
     try:
         if not data_dict:
             return {'error': 'No data provided', 'success': False}
         
         # Perform batch analysis
-        results = batch_analyze_wells(data_dict)
+        results = batch_analyze_wells(data_dict, cache=cache, progress=progress, timer=timer, priors=priors,
+                                      robust=robust)
         
         # Add processing metadata
         results['processing_info'] = {
             'data_points_per_well': len(list(data_dict.values())[0]['cycles']) if data_dict else 0,
-            'processing_timestamp': pd.Timestamp.now().isoformat(),
-            'total_wells_processed': len(data_dict)
+            'processing_timestamp': datetime.now().isoformat(),
+            'total_wells_processed': len(data_dict),
+            'fit_engine': results.pop('fit_engine', None),
+            'result_cache': results.pop('result_cache', None)
         }
         
         results['success'] = True
@@ -261,6 +1105,36 @@ def validate_csv_structure(data_dict):
     
     return errors, warnings
 
+def validate_plate_array(well_names, cycles, rfu):
+    """validate_csv_structure checks for a parsed plate: shared cycles and an (n_wells x n_cycles) rfu array"""
+    errors = []
+    warnings = []
+    
+    if len(well_names) == 0 or len(cycles) == 0:
+        errors.append("No data provided")
+        return errors, warnings
+    
+    if rfu.shape != (len(well_names), len(cycles)):
+        errors.append(f"RFU array shape {rfu.shape} does not match {len(well_names)} wells x {len(cycles)} cycles")
+        return errors, warnings
+    
+    if len(cycles) < 5:
+        warnings.extend(f"Well {w}: Very few data points ({len(cycles)})" for w in well_names)
+    
+    # Check for reasonable cycle values
+    if np.min(cycles) < 0 or np.max(cycles) > 100:
+        cycle_text = f"{_format_number(np.min(cycles))}-{_format_number(np.max(cycles))}"
+        warnings.extend(f"Well {w}: Unusual cycle range ({cycle_text})" for w in well_names)
+    
+    # Check for reasonable RFU values
+    negative = np.any(rfu < 0, axis=1)
+    warnings.extend(f"Well {well_names[i]}: Contains negative RFU values" for i in np.flatnonzero(negative))
+    
+    return errors, warnings
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else str(float(value))
+
 # Export functionality for results
 def export_results_to_csv(results, filename="qpcr_analysis_results.csv"):
     """Export analysis results to CSV format"""
@@ -280,10 +1154,14 @@ def export_results_to_csv(results, filename="qpcr_analysis_results.csv"):
             'Baseline': well_result.get('baseline', 'N/A'),
             'Data_Points': well_result.get('data_points', 'N/A'),
             'Cycle_Range': well_result.get('cycle_range', 'N/A'),
+            'Ct_Threshold': well_result.get('ct_threshold', 'N/A'),
+            'Ct_SDM': well_result.get('ct_sdm', 'N/A'),
+            'Efficiency': well_result.get('efficiency', 'N/A'),
             'Anomalies': ';'.join(well_result.get('anomalies', []))
         }
         export_data.append(row)
     
+    import pandas as pd
     df = pd.DataFrame(export_data)
     df.to_csv(filename, index=False)
     return df
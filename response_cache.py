@@ -0,0 +1,77 @@
+import gzip
+import importlib.util
+import os
+import threading
+from collections import OrderedDict
+
+# Compressed session responses kept per worker, in megabytes (0 disables the cache)
+RESPONSE_CACHE_MB = float(os.environ.get('QPCR_RESPONSE_CACHE_MB', 64))
+
+# Brotli is used when the optional brotli package is installed and the client accepts it
+BROTLI_AVAILABLE = importlib.util.find_spec('brotli') is not None
+
+def compress(body, encoding):
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(body, quality=5)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+def decompress(body, encoding):
+    if encoding == 'br':
+        import brotli
+        return brotli.decompress(body)
+    return gzip.decompress(body)
+
+def preferred_encoding(accept_encodings):
+    """Best content coding this server can produce for a request's Accept-Encoding; None for identity"""
+    candidates = (['br'] if BROTLI_AVAILABLE else []) + ['gzip']
+    best = max(candidates, key=lambda e: accept_encodings[e])
+    return best if accept_encodings[best] > 0 else None
+
+class CompressedResponseCache:
+    """Serialized responses keyed by (session id, view), stored compressed and bounded by total size"""
+    
+    def __init__(self, max_bytes=int(RESPONSE_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (session id, view) -> (etag, encoding, compressed body)
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get(self, session_id, view, etag):
+        """(encoding, compressed body) if a response with this ETag is cached, else None"""
+        with self._lock:
+            entry = self._entries.get((session_id, view))
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end((session_id, view))
+            return entry[1], entry[2]
+    
+    def put(self, session_id, view, etag, body, encoding):
+        """Compress and store a serialized response; returns the compressed body"""
+        compressed = compress(body, encoding)
+        if len(compressed) > self.max_bytes:
+            return compressed
+        with self._lock:
+            self._remove((session_id, view))
+            self._entries[(session_id, view)] = (etag, encoding, compressed)
+            self._size += len(compressed)
+            while self._size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return compressed
+    
+    def evict_session(self, session_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                self._remove(key)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[2])
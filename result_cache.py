@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+import qpcr_analyzer
+from models import db, CachedWellAnalysis
+
+# Bounded in-memory tier (wells); 0 disables the cache entirely
+RESULT_CACHE_SIZE = int(os.environ.get('QPCR_RESULT_CACHE_SIZE', 20000))
+# Also keep results in the database so every gunicorn worker benefits
+PERSISTENT_RESULT_CACHE = os.environ.get('QPCR_PERSISTENT_CACHE', '0') == '1'
+
+# SQLite caps the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+def _code_fingerprint():
+    """Version tag that changes whenever the fitting or quality-criteria code changes"""
+    with open(qpcr_analyzer.__file__, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()[:16]
+    return f"{qpcr_analyzer.ANALYZER_VERSION}-{digest}"
+
+CACHE_VERSION = _code_fingerprint()
+
+def well_cache_key(cycles, rfu, version=CACHE_VERSION):
+    """Content hash of a well's data and the analyzer version"""
+    h = hashlib.sha256(version.encode())
+    for values in (cycles, rfu):
+        arr = np.asarray(values, dtype=np.float64)
+        h.update(len(arr).to_bytes(4, 'little'))
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+def prior_fingerprint(prior):
+    """Hash of a warm-start prior (L, k, x0, B) and the window the fit is confined to around it"""
+    h = hashlib.sha256(f"{qpcr_analyzer.WARM_START_X0_WINDOW}/{qpcr_analyzer.WARM_START_K_FACTOR}".encode())
+    h.update(np.asarray(prior, dtype=np.float64).tobytes())
+    return 'prior-' + h.hexdigest()[:16]
+
+class WellResultCache:
+    """Per-well analysis results keyed by content hash, with an LRU tier and an optional database tier"""
+    
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, persistent=PERSISTENT_RESULT_CACHE):
+        self.maxsize = maxsize
+        self.persistent = persistent
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned = False
+    
+    def key_for(self, well_data, mode=None, prior=None):
+        """Cache key of a well under the effective fit configuration.
+        
+        Results of another analysis mode (e.g. 'robust'), of the other fit
+        engine (batch or serial) and from another warm-start prior are kept apart.
+        """
+        parts = [CACHE_VERSION, 'batch' if qpcr_analyzer.BATCH_FIT_ENABLED else 'serial']
+        if mode:
+            parts.append(mode)
+        if prior is not None:
+            parts.append(prior_fingerprint(prior))
+        return well_cache_key(well_data['cycles'], well_data['rfu'], ':'.join(parts))
+    
+    def get_many(self, keys):
+        """Return {key: result} for every cached key; results are fresh copies"""
+        found = {}
+        if self.maxsize <= 0:
+            return found
+
+        with self._lock:
+            for key in keys:
+                text = self._entries.get(key)
+                if text is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = text
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.persistent:
+            stored = self._load_persistent(missing)
+            self._remember(stored)
+            found.update(stored)
+
+        return {key: json.loads(text) for key, text in found.items()}
+    
+    def put_many(self, results):
+        """Store {key: result} in every enabled tier"""
+        if self.maxsize <= 0 or not results:
+            return
+        encoded = {key: json.dumps(result) for key, result in results.items()}
+        self._remember(encoded)
+        if self.persistent:
+            self._store_persistent(encoded)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def _remember(self, encoded):
+        with self._lock:
+            for key, text in encoded.items():
+                self._entries[key] = text
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def _load_persistent(self, keys):
+        try:
+            self._prune_stale()
+            table = CachedWellAnalysis.__table__
+            found = {}
+            with db.engine.connect() as conn:
+                for i in range(0, len(keys), _QUERY_CHUNK):
+                    rows = conn.execute(
+                        select(table.c.cache_key, table.c.result)
+                        .where(table.c.cache_key.in_(keys[i:i + _QUERY_CHUNK]))
+                    )
+                    found.update({row.cache_key: row.result for row in rows})
+            return found
+        except Exception as e:
+            print(f"Result cache read error: {e}")
+            return {}
+    
+    def _store_persistent(self, encoded):
+        # Own transaction, so a cache write can never roll back the analysis save
+        table = CachedWellAnalysis.__table__
+        rows = [{'cache_key': key, 'analyzer_version': CACHE_VERSION, 'result': text}
+                for key, text in encoded.items()]
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(_insert_ignore(table, conn.dialect.name), rows)
+        except IntegrityError:
+            # Another worker stored some of the same wells first
+            pass
+        except Exception as e:
+            print(f"Result cache write error: {e}")
+    
+    def _prune_stale(self):
+        """Drop persisted results from older analyzer versions, once per process"""
+        if self._pruned:
+            return
+        self._pruned = True
+        table = CachedWellAnalysis.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.analyzer_version != CACHE_VERSION))
+
+def _insert_ignore(table, dialect_name):
+    """INSERT that skips keys already present, where the database supports it"""
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=['cache_key'])
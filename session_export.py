@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from models import db, AnalysisSession, WellResult
+
+# Rows fetched from the database cursor at a time; bounds export memory regardless of size
+EXPORT_BATCH_ROWS = 1000
+
+EXPORT_FORMATS = ('csv', 'parquet', 'arrow')
+
+SESSION_COLUMNS = [
+    ('session_id', AnalysisSession.id),
+    ('filename', AnalysisSession.filename),
+    ('assay', AnalysisSession.assay),
+    ('upload_timestamp', AnalysisSession.upload_timestamp)
+]
+
+WELL_COLUMNS = [
+    ('well_id', WellResult.well_id),
+    ('is_good_scurve', WellResult.is_good_scurve),
+    ('r2_score', WellResult.r2_score),
+    ('rmse', WellResult.rmse),
+    ('amplitude', WellResult.amplitude),
+    ('steepness', WellResult.steepness),
+    ('midpoint', WellResult.midpoint),
+    ('baseline', WellResult.baseline),
+    ('ct_threshold', WellResult.ct_threshold),
+    ('ct_sdm', WellResult.ct_sdm),
+    ('efficiency', WellResult.efficiency),
+    ('fit_path', WellResult.fit_path),
+    ('data_points', WellResult.data_points),
+    ('cycle_range', WellResult.cycle_range),
+    ('rfu_range', WellResult.rfu_range),
+    ('anomalies', WellResult.anomalies)
+]
+
+CURVE_COLUMNS = [
+    ('fit_parameters', WellResult.fit_parameters),
+    ('raw_cycles', WellResult.raw_cycles),
+    ('raw_rfu', WellResult.raw_rfu),
+    ('fitted_curve', WellResult.fitted_curve)
+]
+
+def export_columns(include_curves=False):
+    return SESSION_COLUMNS + WELL_COLUMNS + (CURVE_COLUMNS if include_curves else [])
+
+def iter_export_rows(session_filter, include_curves=False, batch_rows=EXPORT_BATCH_ROWS):
+    """Yield lists of row tuples for the selected sessions' wells, batch_rows at a time, from a streaming cursor"""
+    columns = export_columns(include_curves)
+    statement = (
+        select(*(column for _, column in columns))
+        .select_from(WellResult)
+        .join(AnalysisSession, WellResult.session_id == AnalysisSession.id)
+        .where(session_filter)
+        .order_by(AnalysisSession.id, WellResult.id)
+    )
+    # stream_results uses a server-side cursor where the driver has one, so rows are never all in memory
+    with db.engine.connect().execution_options(stream_results=True, yield_per=batch_rows) as conn:
+        for partition in conn.execute(statement).partitions():
+            yield partition
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        # Curves go in one cell each, values separated by ';'
+        return ';'.join(repr(float(v)) for v in value.tolist())
+    return value
+
+def iter_csv(session_filter, include_curves=False):
+    """CSV text chunks, one per database batch"""
+    columns = export_columns(include_curves)
+    anomalies = [name for name, _ in columns].index('anomalies')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    
+    for rows in iter_export_rows(session_filter, include_curves):
+        for row in rows:
+            values = [_csv_value(v) for v in row]
+            values[anomalies] = ';'.join(json.loads(row[anomalies])) if row[anomalies] else ''
+            writer.writerow(values)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands out what was written since the last drain"""
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_schema(pa, include_curves):
+    fields = [
+        pa.field('session_id', pa.int64()),
+        pa.field('filename', pa.string()),
+        pa.field('assay', pa.string()),
+        pa.field('upload_timestamp', pa.timestamp('us')),
+        pa.field('well_id', pa.string()),
+        pa.field('is_good_scurve', pa.bool_())
+    ]
+    fields += [pa.field(name, pa.float64()) for name, _ in WELL_COLUMNS
+               if name not in ('well_id', 'is_good_scurve', 'fit_path', 'data_points', 'anomalies')]
+    fields += [pa.field('fit_path', pa.string()), pa.field('data_points', pa.int64()),
+               pa.field('anomalies', pa.list_(pa.string()))]
+    if include_curves:
+        fields += [pa.field(name, pa.list_(pa.float64())) for name, _ in CURVE_COLUMNS]
+    return pa.schema(fields)
+
+def iter_arrow(session_filter, include_curves=False, file_format='parquet'):
+    """Parquet (one row group per database batch) or Arrow IPC stream chunks; needs pyarrow"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = _arrow_schema(pa, include_curves)
+    names = [name for name, _ in export_columns(include_curves)]
+    sink = _ChunkSink()
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    
+    for rows in iter_export_rows(session_filter, include_curves):
+        columns = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+        columns['anomalies'] = [json.loads(a) if a else [] for a in columns['anomalies']]
+        for name, _ in CURVE_COLUMNS:
+            if name in columns:
+                columns[name] = [None if v is None else v.tolist() for v in columns[name]]
+        writer.write_batch(pa.record_batch([columns[field.name] for field in schema], schema=schema))
+        yield sink.drain()
+    
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, text, true, update
+
+from models import db, AnalysisSession, WellResult, AnalysisJob
+
+# Sessions older than this many days are pruned in the background (0 keeps everything)
+RETENTION_DAYS = float(os.environ.get('QPCR_RETENTION_DAYS', 0))
+# How often each worker checks for expired sessions
+RETENTION_INTERVAL_HOURS = float(os.environ.get('QPCR_RETENTION_INTERVAL_HOURS', 24))
+# Lock file that lets only one worker process on this host do the pruning
+RETENTION_LOCK_FILE = os.environ.get('QPCR_RETENTION_LOCK_FILE',
+                                     os.path.join(tempfile.gettempdir(), 'qpcr-retention.lock'))
+
+# SQLite caps the number of bound parameters per statement
+_ID_CHUNK = 500
+
+_pruner = None
+
+def delete_sessions(session_ids=None, before=None, delete_all=False):
+    """Delete sessions by id, by upload time (before) or all of them, with set-based SQL in one transaction.
+    
+    Wells go first, then jobs are detached, then the sessions themselves; no
+    rows are loaded into the ORM. Returns (sessions deleted, wells deleted).
+    """
+    if session_ids is not None:
+        ids = sorted(set(int(i) for i in session_ids))
+        conditions = [AnalysisSession.id.in_(ids[i:i + _ID_CHUNK]) for i in range(0, len(ids), _ID_CHUNK)]
+    elif before is not None:
+        conditions = [AnalysisSession.upload_timestamp < before]
+    elif delete_all:
+        conditions = [true()]
+    else:
+        raise ValueError('No sessions selected')
+    
+    sessions_deleted = 0
+    wells_deleted = 0
+    try:
+        for condition in conditions:
+            matching = select(AnalysisSession.id).where(condition).scalar_subquery()
+            wells_deleted += db.session.execute(
+                delete(WellResult).where(WellResult.session_id.in_(matching))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            # SQLite does not enforce the foreign key's ON DELETE SET NULL
+            db.session.execute(
+                update(AnalysisJob).where(AnalysisJob.session_id.in_(matching)).values(session_id=None)
+                .execution_options(synchronize_session=False)
+            )
+            sessions_deleted += db.session.execute(
+                delete(AnalysisSession).where(condition).execution_options(synchronize_session=False)
+            ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    # Objects still in the identity map may refer to deleted rows
+    db.session.expire_all()
+    return sessions_deleted, wells_deleted
+
+def compact_database(engine):
+    """Give the space of deleted rows back to the filesystem (SQLite only)"""
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('VACUUM'))
+    return True
+
+def prune_expired_sessions(days=RETENTION_DAYS, compact=True):
+    """Delete sessions uploaded more than days ago and compact the database; returns (sessions, wells) deleted"""
+    if days <= 0:
+        return 0, 0
+    deleted = delete_sessions(before=datetime.utcnow() - timedelta(days=days))
+    if compact and deleted[0]:
+        compact_database(db.engine)
+    return deleted
+
+def _acquire_pruner_lock(path):
+    """Open file handle holding an exclusive lock on path, or None while another process holds it.
+    
+    The lock lasts as long as the handle, so it is freed when its process
+    exits and a waiting worker can take over. Without fcntl (Windows) every
+    caller gets the lock.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return open(path, 'a')
+    handle = open(path, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+def start_retention_pruner(app, on_pruned=None, days=RETENTION_DAYS, interval_hours=RETENTION_INTERVAL_HOURS,
+                           lock_file=RETENTION_LOCK_FILE):
+    """Prune expired sessions now and then every interval_hours on a daemon thread; no-op when retention is off.
+    
+    Every worker starts the thread, but only the one holding lock_file prunes.
+    The others retry the lock each interval and take over if that worker exits.
+    """
+    global _pruner
+    if days <= 0 or _pruner is not None:
+        return None
+    
+    def run():
+        lock = None
+        while True:
+            if lock is None:
+                try:
+                    lock = _acquire_pruner_lock(lock_file)
+                except OSError as e:
+                    print(f"Retention lock {lock_file} unavailable: {e}")
+            if lock is None:
+                time.sleep(interval_hours * 3600)
+                continue
+            with app.app_context():
+                try:
+                    sessions, wells = prune_expired_sessions(days)
+                    if sessions:
+                        print(f"Retention: pruned {sessions} sessions ({wells} wells) older than {days:g} days")
+                        if on_pruned is not None:
+                            on_pruned()
+                except Exception as e:
+                    print(f"Retention pruning failed: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(interval_hours * 3600)
+    
+    _pruner = threading.Thread(target=run, name='qpcr-retention', daemon=True)
+    _pruner.start()
+    return _pruner
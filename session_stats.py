@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import Integer, case, cast, func, select
+
+from models import db, AnalysisSession, WellResult
+from qpcr_analyzer import ANOMALY_CHECKS
+
+# Closed time buckets are cached this long (other workers' deletes show up after at most this)
+STATS_CACHE_SECONDS = int(os.environ.get('QPCR_STATS_CACHE_SECONDS', 3600))
+# Cached (filter, bucket) aggregates per worker
+STATS_CACHE_SIZE = 10000
+
+BUCKET_SIZES = ('day', 'week', 'month')
+
+# Fixed histogram bins, so per-bucket histograms add up to the histogram of any range
+R2_BIN_WIDTH = 0.01
+R2_BINS = 100
+MIDPOINT_BIN_WIDTH = 1  # cycles
+
+def bucket_start(moment, bucket):
+    """Start of the day, ISO week (Monday) or month that contains moment"""
+    day = datetime(moment.year, moment.month, moment.day)
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start + timedelta(days=1)
+
+def _bucket_label(column, bucket, dialect):
+    """SQL expression giving the 'YYYY-MM-DD' start of the bucket a timestamp falls in"""
+    if dialect == 'postgresql':
+        return func.to_char(func.date_trunc(bucket, column), 'YYYY-MM-DD')
+    if bucket == 'week':
+        return func.date(column, 'weekday 0', '-6 days')
+    if bucket == 'month':
+        return func.strftime('%Y-%m-01', column)
+    return func.date(column)
+
+def _floor(expression, dialect):
+    # PostgreSQL rounds when casting to integer; SQLite truncates, which is floor for the non-negative values binned here
+    if dialect == 'postgresql':
+        return cast(func.floor(expression), Integer)
+    return cast(expression, Integer)
+
+def _empty_bucket():
+    return {
+        'sessions': 0,
+        'total_wells': 0,
+        'good_curves': 0,
+        'anomalies': dict.fromkeys(ANOMALY_CHECKS, 0),
+        'r2_bins': {},
+        'midpoint_bins': {},
+        'wells_by_position': {}  # well_id -> [wells, failed]
+    }
+
+class SessionStats:
+    """Aggregate statistics over stored sessions, computed in SQL one time bucket at a time"""
+    
+    def __init__(self, max_age=STATS_CACHE_SECONDS, maxsize=STATS_CACHE_SIZE):
+        self.max_age = max_age
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # (bucket size, assay, bucket start) -> (stored at, aggregates)
+        self._lock = threading.Lock()
+    
+    def invalidate(self):
+        """Drop every cached bucket; called when stored sessions change"""
+        with self._lock:
+            self._entries.clear()
+    
+    def summary(self, start=None, end=None, bucket='day', assay=None):
+        """Statistics for the whole buckets covering [start, end]; the current bucket is never cached"""
+        if start is None:
+            start = db.session.execute(select(func.min(AnalysisSession.upload_timestamp))).scalar()
+        now = datetime.utcnow()
+        end = end or now
+        
+        buckets = []
+        if start is not None:
+            current = bucket_start(start, bucket)
+            while current <= end:
+                buckets.append(current)
+                current = next_bucket(current, bucket)
+        
+        open_bucket = bucket_start(now, bucket)
+        cached = self._cached(bucket, assay, buckets)
+        missing = [b for b in buckets if b not in cached]
+        if missing:
+            computed = self._compute(bucket, assay, missing[0], next_bucket(missing[-1], bucket))
+            for b in missing:
+                cached[b] = computed.get(b) or _empty_bucket()
+            self._store(bucket, assay, {b: cached[b] for b in missing if b < open_bucket})
+        
+        return self._merge(bucket, [(b, cached[b]) for b in buckets], hits=len(buckets) - len(missing))
+    
+    def _cached(self, bucket, assay, buckets):
+        found = {}
+        expired_before = time.monotonic() - self.max_age
+        with self._lock:
+            for b in buckets:
+                entry = self._entries.get((bucket, assay, b))
+                if entry is not None and entry[0] >= expired_before:
+                    self._entries.move_to_end((bucket, assay, b))
+                    found[b] = entry[1]
+        return found
+    
+    def _store(self, bucket, assay, aggregates):
+        stored_at = time.monotonic()
+        with self._lock:
+            for b, values in aggregates.items():
+                self._entries[(bucket, assay, b)] = (stored_at, values)
+                self._entries.move_to_end((bucket, assay, b))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def _compute(self, bucket, assay, start, end):
+        """Per-bucket aggregates of sessions uploaded in [start, end), five GROUP BY queries"""
+        dialect = db.engine.dialect.name
+        label = _bucket_label(AnalysisSession.upload_timestamp, bucket, dialect).label('bucket')
+        in_range = [AnalysisSession.upload_timestamp >= start, AnalysisSession.upload_timestamp < end]
+        if assay:
+            in_range.append(AnalysisSession.assay == assay)
+        
+        results = {}
+        
+        def values(row):
+            b = datetime.fromisoformat(row.bucket)
+            if b not in results:
+                results[b] = _empty_bucket()
+            return results[b]
+        
+        def wells_query(*columns):
+            return (select(label, *columns)
+                    .select_from(WellResult)
+                    .join(AnalysisSession, WellResult.session_id == AnalysisSession.id)
+                    .where(*in_range))
+        
+        # Success rate from the per-session totals; no well rows needed
+        for row in db.session.execute(
+            select(label, func.count(AnalysisSession.id).label('sessions'),
+                   func.sum(AnalysisSession.total_wells).label('total_wells'),
+                   func.sum(AnalysisSession.good_curves).label('good_curves'))
+            .where(*in_range).group_by(label)
+        ):
+            entry = values(row)
+            entry['sessions'] = row.sessions
+            entry['total_wells'] = int(row.total_wells or 0)
+            entry['good_curves'] = int(row.good_curves or 0)
+        
+        # Anomalies are stored as a compact JSON list, so one LIKE per known anomaly counts them in a single scan
+        counts = [func.sum(case((WellResult.anomalies.like(f'%"{name}"%'), 1), else_=0)).label(name)
+                  for name in ANOMALY_CHECKS]
+        for row in db.session.execute(wells_query(*counts).group_by(label)):
+            values(row)['anomalies'] = {name: int(getattr(row, name) or 0) for name in ANOMALY_CHECKS}
+        
+        r2 = WellResult.r2_score
+        r2_bin = case((r2 < 0, 0), (r2 >= 1, R2_BINS - 1),
+                      else_=_floor(r2 / R2_BIN_WIDTH, dialect)).label('bin')
+        for row in db.session.execute(
+            wells_query(r2_bin, func.count().label('wells')).where(r2.isnot(None)).group_by(label, r2_bin)
+        ):
+            values(row)['r2_bins'][row.bin] = row.wells
+        
+        # Midpoints only mean something for wells that amplified
+        midpoint = WellResult.midpoint
+        midpoint_bin = case((midpoint < 0, 0), else_=_floor(midpoint / MIDPOINT_BIN_WIDTH, dialect)).label('bin')
+        for row in db.session.execute(
+            wells_query(midpoint_bin, func.count().label('wells'))
+            .where(midpoint.isnot(None), WellResult.is_good_scurve.is_(True))
+            .group_by(label, midpoint_bin)
+        ):
+            values(row)['midpoint_bins'][row.bin] = row.wells
+        
+        failed = func.sum(case((WellResult.is_good_scurve.is_(False), 1), else_=0))
+        for row in db.session.execute(
+            wells_query(WellResult.well_id, func.count().label('wells'), failed.label('failed'))
+            .group_by(label, WellResult.well_id)
+        ):
+            values(row)['wells_by_position'][row.well_id] = [row.wells, int(row.failed or 0)]
+        
+        return results
+    
+    def _merge(self, bucket, buckets, hits):
+        anomalies = dict.fromkeys(ANOMALY_CHECKS, 0)
+        r2_bins = {}
+        midpoint_bins = {}
+        positions = {}
+        series = []
+        for start, entry in buckets:
+            for name, count in entry['anomalies'].items():
+                anomalies[name] += count
+            for b, count in entry['r2_bins'].items():
+                r2_bins[b] = r2_bins.get(b, 0) + count
+            for b, count in entry['midpoint_bins'].items():
+                midpoint_bins[b] = midpoint_bins.get(b, 0) + count
+            for well_id, (wells, failed) in entry['wells_by_position'].items():
+                totals = positions.setdefault(well_id, [0, 0])
+                totals[0] += wells
+                totals[1] += failed
+            series.append({
+                'bucket': start.date().isoformat(),
+                'sessions': entry['sessions'],
+                'total_wells': entry['total_wells'],
+                'good_curves': entry['good_curves'],
+                'success_rate': entry['good_curves'] / entry['total_wells'] * 100 if entry['total_wells'] else None,
+                'anomalies': {name: count for name, count in entry['anomalies'].items() if count}
+            })
+        
+        total_wells = sum(entry['total_wells'] for _, entry in buckets)
+        good_curves = sum(entry['good_curves'] for _, entry in buckets)
+        return {
+            'bucket': bucket,
+            'from': buckets[0][0].isoformat() if buckets else None,
+            'to': next_bucket(buckets[-1][0], bucket).isoformat() if buckets else None,
+            'summary': {
+                'sessions': sum(entry['sessions'] for _, entry in buckets),
+                'total_wells': total_wells,
+                'good_curves': good_curves,
+                'success_rate': good_curves / total_wells * 100 if total_wells else None
+            },
+            'success_over_time': series,
+            'anomaly_frequencies': anomalies,
+            'r2_histogram': _histogram(r2_bins, R2_BIN_WIDTH),
+            'midpoint_histogram': _histogram(midpoint_bins, MIDPOINT_BIN_WIDTH),
+            'failure_heatmap': [
+                {'well_id': well_id, 'wells': wells, 'failed': failed, 'failure_rate': failed / wells * 100}
+                for well_id, (wells, failed) in sorted(positions.items())
+            ],
+            'cache': {'buckets': len(buckets), 'cached_buckets': hits}
+        }
+
+def _histogram(bins, width):
+    """Non-empty bins in order, each with its [lower, upper) edges"""
+    return {
+        'bin_width': width,
+        'bins': [{'lower': round(b * width, 6), 'upper': round((b + 1) * width, 6), 'count': count}
+                 for b, count in sorted(bins.items())]
+    }
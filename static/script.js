@@ -1,7 +1,11 @@
 // Global variables
 let csvData = null;
+let sessionWellData = null;  // Raw curves of a session loaded from history, decoded from the compact transport
 let analysisResults = {};
 let currentChart = null;
+let historySessions = [];  // Sessions listed so far; further pages are fetched with historyCursor
+let historyCursor = null;
+let historyTotal = null;
 
 // DOM elements
 const fileUpload = document.getElementById('fileUpload');
@@ -169,7 +173,8 @@ async function performAnalysis() {
         console.log('Sending analysis data:', analysisData);
         
         // Send to backend for analysis
-        const response = await fetch('/analyze', {
+        // The raw data is already here, and fitted curves are rebuilt from the fit parameters
+        const response = await fetch('/analyze?curves=compact', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -187,6 +192,7 @@ async function performAnalysis() {
         const results = await response.json();
         console.log('Analysis results:', results);
         analysisResults = results;
+        sessionWellData = null;
         
         displayAnalysisResults(results);
         
@@ -198,6 +204,48 @@ async function performAnalysis() {
     }
 }
 
+// Decode a series sent with ?curves=compact (see curve_transport.encode_series)
+function decodeSeries(encoded) {
+    const n = encoded.count;
+    if (encoded.encoding === 'range') {
+        return Array.from({ length: n }, (_, i) => encoded.start + encoded.step * i);
+    }
+    
+    const bytes = Uint8Array.from(atob(encoded.data), c => c.charCodeAt(0));
+    const view = new DataView(bytes.buffer);
+    if (encoded.encoding === 'f8') {
+        return Array.from({ length: n }, (_, i) => view.getFloat64(i * 8, true));
+    }
+    
+    const width = encoded.dtype === 'i2' ? 2 : 4;
+    const values = new Array(n);
+    let quantized = encoded.start;
+    values[0] = quantized * encoded.scale;
+    for (let i = 1; i < n; i++) {
+        quantized += width === 2 ? view.getInt16((i - 1) * 2, true) : view.getInt32((i - 1) * 4, true);
+        values[i] = quantized * encoded.scale;
+    }
+    (encoded.missing || []).forEach(i => { values[i] = NaN; });
+    return values;
+}
+
+// Fitted sigmoid of a well at the given cycles, from its fit parameters
+function fittedCurve(wellResult, cycles) {
+    if (wellResult.fitted_curve && wellResult.fitted_curve.length === cycles.length) {
+        return wellResult.fitted_curve;
+    }
+    if (!wellResult.fit_parameters || wellResult.fit_parameters.length !== 4) {
+        return [];
+    }
+    const [L, k, x0, B] = wellResult.fit_parameters;
+    return cycles.map(x => L / (1 + Math.exp(-k * (x - x0))) + B);
+}
+
+// Raw well data being shown: the uploaded CSV, or a session loaded from history
+function currentWellData() {
+    return sessionWellData || prepareAnalysisData(csvData);
+}
+
 function prepareAnalysisData(data) {
     console.log('Raw CSV data:', data);
     
@@ -455,6 +503,22 @@ function showWellDetails(wellId) {
                 <span class="parameter-label">Baseline:</span>
                 <span class="parameter-value">${wellResult.baseline ? wellResult.baseline.toFixed(2) : 'N/A'}</span>
             </div>
+            <div class="parameter-item">
+                <span class="parameter-label">Ct (threshold):</span>
+                <span class="parameter-value">${wellResult.ct_threshold != null ? wellResult.ct_threshold.toFixed(2) : 'N/A'}</span>
+            </div>
+            <div class="parameter-item">
+                <span class="parameter-label">Ct (SDM):</span>
+                <span class="parameter-value">${wellResult.ct_sdm != null ? wellResult.ct_sdm.toFixed(2) : 'N/A'}</span>
+            </div>
+            <div class="parameter-item">
+                <span class="parameter-label">Efficiency:</span>
+                <span class="parameter-value">${wellResult.efficiency != null ? (wellResult.efficiency * 100).toFixed(1) + '%' : 'N/A'}</span>
+            </div>
+            <div class="parameter-item">
+                <span class="parameter-label">Fit path:</span>
+                <span class="parameter-value">${wellResult.fit_path || 'N/A'}</span>
+            </div>
         </div>
         ${anomaliesHtml}
     `;
@@ -496,7 +560,7 @@ function showAllWellsOverlay() {
 }
 
 function updateChart(wellId) {
-    const wellData = prepareAnalysisData(csvData)[wellId];
+    const wellData = currentWellData()[wellId];
     const wellResult = analysisResults.individual_results[wellId];
     
     if (!wellData || !wellResult) return;
@@ -509,13 +573,10 @@ function updateChart(wellId) {
     }
     
     // Prepare fit data if available
-    let fitData = [];
-    if (wellResult.fitted_curve) {
-        fitData = wellResult.fitted_curve.map((rfu, index) => ({
-            x: wellData.cycles[index],
-            y: rfu
-        }));
-    }
+    const fitData = fittedCurve(wellResult, wellData.cycles).map((rfu, index) => ({
+        x: wellData.cycles[index],
+        y: rfu
+    }));
     
     const datasets = [
         {
@@ -631,6 +692,8 @@ function populateResultsTable(individualResults) {
             <td>${result.steepness ? result.steepness.toFixed(4) : 'N/A'}</td>
             <td>${result.midpoint ? result.midpoint.toFixed(2) : 'N/A'}</td>
             <td>${result.baseline ? result.baseline.toFixed(2) : 'N/A'}</td>
+            <td>${result.ct_threshold != null ? result.ct_threshold.toFixed(2) : 'N/A'}</td>
+            <td>${result.ct_sdm != null ? result.ct_sdm.toFixed(2) : 'N/A'}</td>
             <td>${anomaliesText}</td>
         `;
         
@@ -666,7 +729,7 @@ function showAllWells() {
         currentChart.destroy();
     }
     
-    const wellData = prepareAnalysisData(csvData);
+    const wellData = currentWellData();
     const datasets = [];
     
     const colors = [
@@ -735,7 +798,7 @@ function showGoodCurvesOnly() {
         currentChart.destroy();
     }
     
-    const wellData = prepareAnalysisData(csvData);
+    const wellData = currentWellData();
     const datasets = [];
     
     const colors = [
@@ -796,6 +859,12 @@ function showGoodCurvesOnly() {
 function exportResults() {
     if (!analysisResults) return;
     
+    // Stored sessions are exported by the server, streamed straight from the database
+    if (analysisResults.session_id) {
+        window.location.href = `/sessions/${analysisResults.session_id}/export`;
+        return;
+    }
+    
     // Prepare CSV data for export
     const csvContent = generateResultsCSV();
     
@@ -814,7 +883,7 @@ function exportResults() {
 function generateResultsCSV() {
     const headers = [
         'Well', 'Status', 'R2_Score', 'RMSE', 'Amplitude', 'Steepness', 
-        'Midpoint', 'Baseline', 'Anomalies'
+        'Midpoint', 'Baseline', 'Ct_Threshold', 'Ct_SDM', 'Efficiency', 'Anomalies'
     ];
     
     let csvContent = headers.join(',') + '\n';
@@ -829,6 +898,9 @@ function generateResultsCSV() {
             result.steepness ? result.steepness.toFixed(4) : 'N/A',
             result.midpoint ? result.midpoint.toFixed(2) : 'N/A',
             result.baseline ? result.baseline.toFixed(2) : 'N/A',
+            result.ct_threshold != null ? result.ct_threshold.toFixed(2) : 'N/A',
+            result.ct_sdm != null ? result.ct_sdm.toFixed(2) : 'N/A',
+            result.efficiency != null ? result.efficiency.toFixed(4) : 'N/A',
             result.anomalies && result.anomalies.length > 0 ? result.anomalies.join(';') : 'None'
         ];
         
@@ -847,7 +919,10 @@ async function loadAnalysisHistory() {
         }
         
         const data = await response.json();
-        displayAnalysisHistory(data.sessions);
+        historySessions = data.sessions;
+        historyCursor = data.next_cursor;
+        historyTotal = data.total;
+        displayAnalysisHistory(historySessions);
     } catch (error) {
         console.error('Error loading history:', error);
         document.getElementById('historyContent').innerHTML = 
@@ -855,6 +930,28 @@ async function loadAnalysisHistory() {
     }
 }
 
+// Append the next page of sessions; the total is already known from the first page
+async function loadMoreHistory() {
+    if (!historyCursor) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`/sessions?cursor=${encodeURIComponent(historyCursor)}&include_total=0`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        historySessions = historySessions.concat(data.sessions);
+        historyCursor = data.next_cursor;
+        displayAnalysisHistory(historySessions);
+    } catch (error) {
+        console.error('Error loading more history:', error);
+        alert('Error loading more history: ' + error.message);
+    }
+}
+
 function displayAnalysisHistory(sessions) {
     const historyContent = document.getElementById('historyContent');
     
@@ -863,6 +960,14 @@ function displayAnalysisHistory(sessions) {
         return;
     }
     
+    const shown = historyTotal != null ? `${sessions.length} of ${historyTotal}` : `${sessions.length}`;
+    const loadMoreHtml = historyCursor ? `
+        <div class="history-more">
+            <span>Showing ${shown} sessions</span>
+            <button class="control-btn" onclick="loadMoreHistory()">Load more</button>
+        </div>
+    ` : '';
+    
     const tableHtml = `
         <table class="history-table">
             <thead>
@@ -895,6 +1000,7 @@ function displayAnalysisHistory(sessions) {
                 `).join('')}
             </tbody>
         </table>
+        ${loadMoreHtml}
     `;
     
     historyContent.innerHTML = tableHtml;
@@ -902,7 +1008,7 @@ function displayAnalysisHistory(sessions) {
 
 async function loadSessionDetails(sessionId) {
     try {
-        const response = await fetch(`/sessions/${sessionId}`);
+        const response = await fetch(`/sessions/${sessionId}?curves=compact`);
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
@@ -911,6 +1017,7 @@ async function loadSessionDetails(sessionId) {
         
         // Convert session data to analysisResults format
         analysisResults = {
+            session_id: data.session.id,
             individual_results: {},
             good_curves: [],
             cycle_info: {
@@ -926,7 +1033,15 @@ async function loadSessionDetails(sessionId) {
         };
         
         // Convert well data
+        sessionWellData = {};
         data.wells.forEach(well => {
+            if (well.raw) {
+                sessionWellData[well.well_id] = {
+                    cycles: decodeSeries(well.raw.cycles),
+                    rfu: decodeSeries(well.raw.rfu)
+                };
+            }
+
             analysisResults.individual_results[well.well_id] = {
                 r2_score: well.r2_score,
                 rmse: well.rmse,
@@ -934,9 +1049,13 @@ async function loadSessionDetails(sessionId) {
                 steepness: well.steepness,
                 midpoint: well.midpoint,
                 baseline: well.baseline,
+                ct_threshold: well.ct_threshold,
+                ct_sdm: well.ct_sdm,
+                efficiency: well.efficiency,
+                fit_path: well.fit_path,
                 is_good_scurve: well.is_good_scurve,
                 anomalies: well.anomalies || [],
-                fitted_curve: well.fitted_curve || [],
+                fit_parameters: well.fit_parameters,
                 data_points: well.data_points,
                 cycle_range: well.cycle_range
             };
@@ -991,12 +1110,15 @@ document.getElementById('clearHistoryBtn').addEventListener('click', async () =>
     }
     
     try {
-        const response = await fetch('/sessions');
-        const data = await response.json();
-        
-        // Delete all sessions
-        for (const session of data.sessions) {
-            await fetch(`/sessions/${session.id}`, { method: 'DELETE' });
+        // One set-based delete on the server instead of a request per session
+        const response = await fetch('/sessions', {
+            method: 'DELETE',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ all: true })
+        });
+        if (!response.ok) {
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
         }
         
         loadAnalysisHistory();
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+
+# app reads its configuration at import time: a throwaway SQLite database and no result caching
+_database_dir = tempfile.mkdtemp(prefix='qpcr-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+os.environ['QPCR_RESULT_CACHE_SIZE'] = '0'
+os.environ['QPCR_PERSISTENT_CACHE'] = '0'
+os.environ['QPCR_RETENTION_DAYS'] = '0'
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    # index.html and the static files are read relative to the working directory
+    os.chdir(REPO_ROOT)
+    return app
+
+def empty_database(app_module):
+    """Delete every stored session and the caches built from them"""
+    from session_retention import delete_sessions
+    with app_module.app.app_context():
+        delete_sessions(delete_all=True)
+    app_module.sessions_deleted()
+
+@pytest.fixture
+def client(app_module):
+    """Test client on an empty database"""
+    empty_database(app_module)
+    return app_module.app.test_client()
+
+@pytest.fixture(scope='session')
+def upload(app_module):
+    """Function that stores a synthetic plate through POST /analyze and returns the response"""
+    from plate_benchmark import synthetic_plate
+    
+    def post(client, seed, n_wells=24, n_cycles=30, filename=None):
+        data = synthetic_plate(n_wells, n_cycles, seed=seed)
+        reply = client.post('/analyze', json=data, headers={'X-Filename': filename or f'plate_{seed}.csv'})
+        assert reply.status_code == 200, reply.get_data(as_text=True)
+        return reply.get_json()
+    return post
+
+@pytest.fixture(scope='module')
+def stored_plates(app_module, upload):
+    """Test client on a database holding five uploaded 24-well plates, and their /analyze responses"""
+    empty_database(app_module)
+    client = app_module.app.test_client()
+    return client, [upload(client, seed) for seed in range(5)]
+
+@pytest.fixture(scope='session')
+def follow():
+    """Function that pages through a cursor-paged listing; returns the first page and all pages"""
+    
+    def pages(client, url, first_args='', page_args='include_total=0'):
+        separator = '&' if '?' in url else '?'
+        first = client.get(f'{url}{separator}{first_args}').get_json()
+        result = [first]
+        while result[-1]['next_cursor']:
+            reply = client.get(f"{url}{separator}{page_args}&cursor={result[-1]['next_cursor']}")
+            assert reply.status_code == 200
+            result.append(reply.get_json())
+        return first, result
+    return pages
@@ -0,0 +1,26 @@
+import pytest
+
+from plate_benchmark import synthetic_plate
+
+def test_json_batch_reports_bad_plates_per_plate(client):
+    plates = [{'filename': 'good.csv', 'data': synthetic_plate(8, 30, seed=1)}, 'not a plate', {'filename': 'empty.csv'}]
+    reply = client.post('/analyze/batch', json={'plates': plates})
+    assert reply.status_code == 200
+    result = reply.get_json()
+    assert result['summary']['analyzed'] == 1
+    assert result['summary']['failed'] == 2
+    errors = {p['filename']: p.get('error') for p in result['plates']}
+    assert errors == {'good.csv': None, 'plate_2.csv': 'Plate must be a JSON object', 'empty.csv': 'No data provided'}
+
+@pytest.mark.parametrize('body', [
+    {'plates': ['plate', 7, None]},
+    {'plates': 'plate.csv'},
+    {'plates': 3},
+    [1, 2],
+    {}
+])
+def test_json_batch_rejects_malformed_plates(client, body):
+    reply = client.post('/analyze/batch', json=body)
+    assert reply.status_code == 400
+    assert reply.get_json()['success'] is False
+    assert client.get('/sessions').get_json()['total'] == 0
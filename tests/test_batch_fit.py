@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import qpcr_analyzer
+from plate_benchmark import synthetic_plate, well_kinds
+
+@pytest.fixture(scope='module')
+def plate():
+    return synthetic_plate(96, 40, seed=3), well_kinds(96, seed=3)
+
+def analyze(data, batch):
+    previous = qpcr_analyzer.BATCH_FIT_ENABLED
+    qpcr_analyzer.BATCH_FIT_ENABLED = batch
+    try:
+        return qpcr_analyzer.batch_analyze_wells(data)
+    finally:
+        qpcr_analyzer.BATCH_FIT_ENABLED = previous
+
+@pytest.fixture(scope='module')
+def results(plate):
+    data, _ = plate
+    return analyze(data, batch=True), analyze(data, batch=False)
+
+def test_batch_matches_curve_fit(plate, results):
+    _, kinds = plate
+    batch, serial = results
+    assert batch['fit_engine']['mode'] == 'batch'
+    assert batch['fit_engine']['batch_fitted_wells'] > 0
+    assert batch['summary'] == serial['summary']
+    for well_id, kind in kinds.items():
+        a = batch['individual_results'][well_id]
+        b = serial['individual_results'][well_id]
+        assert a['is_good_scurve'] == b['is_good_scurve'], well_id
+        if a['is_good_scurve']:
+            assert a['r2_score'] == pytest.approx(b['r2_score'], abs=1e-6)
+            assert a['midpoint'] == pytest.approx(b['midpoint'], abs=1e-3)
+            assert a['amplitude'] == pytest.approx(b['amplitude'], rel=1e-4)
+
+def test_flat_wells_are_never_good(plate, results):
+    _, kinds = plate
+    batch, _ = results
+    flat = [w for w, kind in kinds.items() if kind == 'flat']
+    assert flat
+    assert not any(batch['individual_results'][w]['is_good_scurve'] for w in flat)
+
+def test_missing_readings_are_dropped(plate, results):
+    data, kinds = plate
+    batch, _ = results
+    for well_id in (w for w, kind in kinds.items() if kind == 'nan'):
+        finite = int(np.isfinite(data[well_id]['rfu']).sum())
+        assert finite < len(data[well_id]['rfu'])
+        assert batch['individual_results'][well_id]['data_points'] == finite
+        assert batch['individual_results'][well_id]['is_good_scurve']
+
+def test_all_nan_well_is_reported_not_fitted():
+    data = synthetic_plate(8, 30, seed=1)
+    data['W1']['rfu'] = [float('nan')] * 30
+    for batch in (True, False):
+        result = analyze(data, batch)['individual_results']['W1']
+        assert not result['is_good_scurve']
+
+def test_bound_optimality_projects_the_gradient():
+    from scipy.optimize import curve_fit
+    x = np.arange(1, 41, dtype=float)
+    y = qpcr_analyzer.sigmoid(x, 1000, 0.5, 20, 100)
+    # The amplitude bound sits below the true amplitude, so the constrained optimum rests on it
+    lower, upper = np.array([10, 0.01, 1, 0]), np.array([800, 10, 40, 1200])
+    p, _ = curve_fit(qpcr_analyzer.sigmoid, x, y, p0=[500, 0.4, 18, 90], bounds=(lower, upper),
+                     jac=qpcr_analyzer.sigmoid_jacobian, ftol=1e-12, xtol=1e-12, gtol=1e-12)
+    X, Y, W, P = x[None, :], y[None, :], np.ones((1, 40)), p[None, :]
+    at_lower = P - lower <= 1e-8 * (upper - lower)
+    at_upper = upper - P <= 1e-8 * (upper - lower)
+    assert at_upper[0, 0]
+    assert qpcr_analyzer._bound_optimal(X, Y, W, P, at_lower, at_upper, gtol=1e-3)[0]
+    # Without the bound the same point is far from stationary
+    assert not qpcr_analyzer._bound_optimal(X, Y, W, P, at_lower, np.zeros_like(at_upper), gtol=1e-3)[0]
+    # Nor is a point that merely got stuck on the bound
+    stuck = np.array([[800, 0.557, 20.0, 124.6]])
+    assert not qpcr_analyzer._bound_optimal(X, Y, W, stuck, at_lower, at_upper, gtol=1e-3)[0]
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from curve_transport import decode_series, encode_series, lttb
+
+def test_evenly_spaced_series_is_sent_as_a_range():
+    encoded = encode_series(np.arange(1, 41, dtype=float))
+    assert encoded == {'encoding': 'range', 'start': 1.0, 'step': 1.0, 'count': 40}
+    assert np.array_equal(decode_series(encoded), np.arange(1, 41))
+
+def test_delta_round_trip_within_half_a_step():
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(0, 50, 200)) + 1000
+    encoded = encode_series(values, step=0.01)
+    assert encoded['encoding'] == 'delta'
+    assert np.max(np.abs(decode_series(encoded) - values)) <= 0.005 + 1e-9
+
+def test_missing_values_survive_the_round_trip():
+    values = np.array([np.nan, 1.5, 2.25, np.nan, np.nan, 7.0, np.nan])
+    decoded = decode_series(encode_series(values))
+    assert np.array_equal(np.isnan(decoded), np.isnan(values))
+    assert decoded[~np.isnan(values)] == pytest.approx(values[~np.isnan(values)], abs=0.005)
+
+def test_large_jumps_use_wider_deltas():
+    values = np.array([0.0, 1e6, -1e6, 3.0])
+    encoded = encode_series(values)
+    assert encoded['dtype'] == 'i4'
+    assert decode_series(encoded) == pytest.approx(values, abs=0.005)
+
+@pytest.mark.parametrize('values', [[], [0.1, 0.7, 2.0 / 3.0, -1e-300]])
+def test_full_precision_is_lossless(values):
+    full = encode_series(values, full_precision=True)
+    assert full['encoding'] == 'f8'
+    assert np.array_equal(decode_series(full), np.asarray(values, dtype=float))
+
+def test_lttb_keeps_ends_and_peak():
+    x = np.arange(500, dtype=float)
+    y = np.exp(-((x - 250) / 20) ** 2)
+    selected = lttb(x, y, 50)
+    assert len(selected) == 50
+    assert np.all(np.diff(selected) > 0)
+    assert selected[0] == 0 and selected[-1] == 499
+    assert y[selected].max() > 0.95
+    assert np.array_equal(lttb(x, y, 1000), np.arange(500))
@@ -0,0 +1,68 @@
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+from plate_csv import parse_plate_csv, is_plate_archive, iter_archive_plates
+
+def parse(text, **limits):
+    return parse_plate_csv(io.BytesIO(text.encode('utf-8')), **limits)
+
+def test_parses_wells_and_cycles():
+    names, cycles, rfu, warnings = parse('Cycle,A1,A2\n1,10,20\n2,11,21.5\n3,12,23\n')
+    assert names == ['A1', 'A2']
+    assert cycles.tolist() == [1, 2, 3]
+    assert rfu.tolist() == [[10, 11, 12], [20, 21.5, 23]]
+    assert warnings == []
+
+def test_byte_order_mark_blank_lines_and_leading_columns():
+    text = '﻿Well Name,Cycle Number,B1\r\n\r\nx,1,5\r\nx,2,6\r\n,,\r\nx,3,7\r\n'
+    names, cycles, rfu, _ = parse(text)
+    assert names == ['B1']
+    assert cycles.tolist() == [1, 2, 3]
+    assert rfu.tolist() == [[5, 6, 7]]
+
+def test_cycle_column_detected_without_header():
+    rows = '\n'.join(f'{c},{c * 2}' for c in range(1, 8))
+    names, cycles, rfu, _ = parse('Run,C3\n' + rows + '\n')
+    assert names == ['C3']
+    assert cycles.tolist() == list(range(1, 8))
+
+def test_incomplete_well_is_skipped_with_warning():
+    names, _, rfu, warnings = parse('Cycle,A1,A2\n1,10,20\n2,11,\n3,12,oops\n')
+    assert names == ['A1']
+    assert rfu.shape == (1, 3)
+    assert warnings == ['Well A2: RFU column incomplete, well skipped']
+
+def test_rows_without_a_cycle_number_are_dropped():
+    _, cycles, rfu, _ = parse('Cycle,A1\n1,10\nEnd,99\n2,11\n')
+    assert cycles.tolist() == [1, 2]
+    assert np.array_equal(rfu, [[10, 11]])
+
+@pytest.mark.parametrize('text', ['', '\n\n', 'Cycle\n1\n'])
+def test_empty_or_single_column_file_is_rejected(text):
+    with pytest.raises(ValueError, match='empty or invalid'):
+        parse(text)
+
+def test_upload_limits():
+    with pytest.raises(ValueError, match='Too many rows'):
+        parse('Cycle,A1\n' + ''.join(f'{c},1\n' for c in range(1, 12)), max_cycles=10)
+    with pytest.raises(ValueError, match='Too many columns'):
+        parse('Cycle,A1,A2,A3\n1,1,1,1\n', max_wells=2)
+
+def test_archive_yields_csv_members_in_order():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('run1.csv', 'Cycle,A1\n1,1\n')
+        archive.writestr('notes.txt', 'ignored')
+        archive.writestr('__MACOSX/._run1.csv', 'ignored')
+        archive.writestr('plates/run2.CSV', 'Cycle,A1\n1,2\n')
+    buffer.seek(0)
+    assert is_plate_archive('upload.bin', buffer)
+    assert buffer.tell() == 0
+    plates = [(name, parse_plate_csv(member)[2].tolist()) for name, member in iter_archive_plates(buffer, 'runs.zip')]
+    assert plates == [('runs.zip/run1.csv', [[1.0]]), ('runs.zip/plates/run2.CSV', [[2.0]])]
+
+def test_plain_csv_is_not_an_archive():
+    assert not is_plate_archive('plate.csv', io.BytesIO(b'Cycle,A1\n1,1\n'))
@@ -0,0 +1,47 @@
+import pytest
+
+def good_wells(client, session_id):
+    wells = client.get(f'/sessions/{session_id}?curves=0').get_json()['wells']
+    return {w['well_id'] for w in wells if w['is_good_scurve']}
+
+def test_reclassify_applies_new_thresholds(client, upload):
+    session_id = upload(client, seed=1)['session_id']
+    before = good_wells(client, session_id)
+    assert before
+    
+    dry = client.post(f'/sessions/{session_id}/reclassify',
+                      json={'thresholds': {'min_r2': 0.99999}, 'dry_run': True}).get_json()
+    assert dry['dry_run'] and dry['previous_good_curves'] == len(before)
+    assert good_wells(client, session_id) == before
+    
+    reply = client.post(f'/sessions/{session_id}/reclassify', json={'thresholds': {'min_r2': 0.99999}}).get_json()
+    after = good_wells(client, session_id)
+    assert after < before
+    assert reply['good_curves'] == len(after) == dry['good_curves']
+    assert set(reply['now_poor']) == before - after
+    assert reply['now_good'] == []
+    session = client.get('/sessions').get_json()['sessions'][0]
+    assert session['good_curves'] == len(after)
+    assert session['success_rate'] == pytest.approx(len(after) / session['total_wells'] * 100)
+    
+    # Back to the defaults restores the original classification
+    client.post(f'/sessions/{session_id}/reclassify', json={})
+    assert good_wells(client, session_id) == before
+
+@pytest.mark.parametrize('thresholds', [{'min_r3': 0.9}, {'min_r2': 'high'}])
+def test_reclassify_rejects_bad_thresholds(client, upload, thresholds):
+    session_id = upload(client, seed=2)['session_id']
+    reply = client.post(f'/sessions/{session_id}/reclassify', json={'thresholds': thresholds})
+    assert reply.status_code == 400
+
+def test_reclassify_unknown_session(client):
+    assert client.post('/sessions/999/reclassify', json={}).status_code == 404
+
+@pytest.mark.parametrize('dry_run', ['false', '0', 0, 1, None])
+def test_reclassify_dry_run_must_be_boolean(client, upload, dry_run):
+    session_id = upload(client, seed=2)['session_id']
+    before = good_wells(client, session_id)
+    reply = client.post(f'/sessions/{session_id}/reclassify',
+                        json={'thresholds': {'min_r2': 0.99999}, 'dry_run': dry_run})
+    assert reply.status_code == 400
+    assert good_wells(client, session_id) == before
@@ -0,0 +1,38 @@
+import pytest
+
+import qpcr_analyzer
+from plate_benchmark import synthetic_plate
+from result_cache import WellResultCache
+
+@pytest.fixture
+def engine():
+    """Restores the fit engine setting after a test switches it"""
+    previous = qpcr_analyzer.BATCH_FIT_ENABLED
+    yield
+    qpcr_analyzer.BATCH_FIT_ENABLED = previous
+
+def test_key_follows_fit_configuration(engine):
+    cache = WellResultCache(maxsize=100, persistent=False)
+    well = synthetic_plate(1, 30, seed=1)['W1']
+    prior = [1000.0, 0.5, 20.0, 100.0]
+    qpcr_analyzer.BATCH_FIT_ENABLED = True
+    keys = [cache.key_for(well), cache.key_for(well, 'robust'), cache.key_for(well, prior=prior),
+            cache.key_for(well, prior=[1000.0, 0.5, 21.0, 100.0])]
+    assert cache.key_for(well, prior=tuple(prior)) == keys[2]
+    qpcr_analyzer.BATCH_FIT_ENABLED = False
+    keys.append(cache.key_for(well))
+    assert len(set(keys)) == len(keys)
+
+def test_cached_results_are_reused_only_under_the_same_configuration(engine):
+    cache = WellResultCache(maxsize=100, persistent=False)
+    data = synthetic_plate(8, 30, seed=2)
+    first = qpcr_analyzer.batch_analyze_wells(data, cache=cache)
+    priors = {w: r['fit_parameters'] for w, r in first['individual_results'].items() if r['is_good_scurve']}
+    assert qpcr_analyzer.batch_analyze_wells(data, cache=cache)['result_cache']['hits'] == 8
+    
+    warm = qpcr_analyzer.batch_analyze_wells(data, cache=cache, priors=priors)['result_cache']
+    assert warm['hits'] == 8 - len(priors)
+    assert qpcr_analyzer.batch_analyze_wells(data, cache=cache, priors=priors)['result_cache']['hits'] == 8
+    
+    qpcr_analyzer.BATCH_FIT_ENABLED = not qpcr_analyzer.BATCH_FIT_ENABLED
+    assert qpcr_analyzer.batch_analyze_wells(data, cache=cache)['result_cache']['hits'] == 0
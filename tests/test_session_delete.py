@@ -0,0 +1,43 @@
+import pytest
+
+def test_bulk_delete_by_ids(client, upload):
+    ids = [upload(client, seed)['session_id'] for seed in range(3)]
+    reply = client.delete('/sessions', json={'ids': [ids[0], ids[2], 12345]})
+    assert reply.status_code == 200
+    assert reply.get_json()['deleted_sessions'] == 2
+    assert reply.get_json()['deleted_wells'] == 48
+    
+    listing = client.get('/sessions').get_json()
+    assert listing['total'] == 1
+    assert [s['id'] for s in listing['sessions']] == [ids[1]]
+    assert {w['session_id'] for w in client.get('/wells?limit=1000').get_json()['wells']} == {ids[1]}
+    assert client.get(f'/sessions/{ids[0]}').status_code == 404
+
+@pytest.mark.parametrize('body', [
+    {'ids': ['x']},
+    {'ids': [None]},
+    {'ids': [True]},
+    {'ids': [1.9]},
+    {'ids': [1.0]},
+    {'ids': ['3']},
+    {'ids': [{'id': 1}]},
+    {'ids': 5},
+    {'before': 'yesterday'},
+    {'older_than_days': 'many'},
+    {'all': 'yes'},
+    {}
+])
+def test_bulk_delete_rejects_bad_requests(client, upload, body):
+    upload(client, seed=4)
+    reply = client.delete('/sessions', json=body)
+    assert reply.status_code == 400
+    assert reply.get_json()['success'] is False
+    assert client.get('/sessions').get_json()['total'] == 1
+
+def test_bulk_delete_all(client, upload):
+    for seed in range(2):
+        upload(client, seed)
+    reply = client.delete('/sessions', json={'all': True}).get_json()
+    assert reply['deleted_sessions'] == 2
+    assert client.get('/sessions').get_json()['total'] == 0
+    assert client.get('/stats').get_json()['summary']['sessions'] == 0
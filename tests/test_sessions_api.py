@@ -0,0 +1,19 @@
+def test_sessions_pages_cover_every_session_once(stored_plates, follow):
+    client, responses = stored_plates
+    first, pages = follow(client, '/sessions?limit=2')
+    assert first['total'] == 5
+    assert [page['count'] for page in pages] == [2, 2, 1]
+    assert all('total' not in page for page in pages[1:])
+    ids = [session['id'] for page in pages for session in page['sessions']]
+    # Newest first; the plates were uploaded in order
+    assert ids == sorted((r['session_id'] for r in responses), reverse=True)
+
+def test_sessions_total_follows_filters(stored_plates):
+    client, _ = stored_plates
+    reply = client.get('/sessions?filename=plate_3').get_json()
+    assert reply['total'] == reply['count'] == 1
+    assert reply['next_cursor'] is None
+
+def test_sessions_bad_cursor_is_rejected(stored_plates):
+    client, _ = stored_plates
+    assert client.get('/sessions?cursor=not-a-cursor').status_code == 400
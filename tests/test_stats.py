@@ -0,0 +1,47 @@
+import math
+
+from session_stats import MIDPOINT_BIN_WIDTH, R2_BIN_WIDTH, R2_BINS
+
+def test_stats_match_stored_wells(stored_plates):
+    client, responses = stored_plates
+    wells = []
+    for response in responses:
+        wells += client.get(f"/sessions/{response['session_id']}?curves=0").get_json()['wells']
+    
+    stats = client.get('/stats').get_json()
+    assert stats['summary']['sessions'] == len(responses)
+    assert stats['summary']['total_wells'] == len(wells)
+    assert stats['summary']['good_curves'] == sum(w['is_good_scurve'] for w in wells)
+    
+    positions = {}
+    for well in wells:
+        totals = positions.setdefault(well['well_id'], [0, 0])
+        totals[0] += 1
+        totals[1] += not well['is_good_scurve']
+    assert {row['well_id']: [row['wells'], row['failed']] for row in stats['failure_heatmap']} == positions
+    
+    r2_bins = {}
+    for well in wells:
+        r2 = well['r2_score']
+        if r2 is not None:
+            b = 0 if r2 < 0 else R2_BINS - 1 if r2 >= 1 else math.floor(r2 / R2_BIN_WIDTH)
+            r2_bins[b] = r2_bins.get(b, 0) + 1
+    assert {round(row['lower'] / R2_BIN_WIDTH): row['count'] for row in stats['r2_histogram']['bins']} == r2_bins
+    
+    midpoint_bins = {}
+    for well in wells:
+        if well['is_good_scurve'] and well['midpoint'] is not None:
+            b = max(0, math.floor(well['midpoint'] / MIDPOINT_BIN_WIDTH))
+            midpoint_bins[b] = midpoint_bins.get(b, 0) + 1
+    assert {round(row['lower'] / MIDPOINT_BIN_WIDTH): row['count']
+            for row in stats['midpoint_histogram']['bins']} == midpoint_bins
+    
+    anomalies = {}
+    for well in wells:
+        for name in set(well['anomalies']):
+            anomalies[name] = anomalies.get(name, 0) + 1
+    assert {name: count for name, count in stats['anomaly_frequencies'].items() if count} == anomalies
+
+def test_stats_rejects_unknown_bucket(stored_plates):
+    client, _ = stored_plates
+    assert client.get('/stats?bucket=hour').status_code == 400
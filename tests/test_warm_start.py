@@ -0,0 +1,43 @@
+import pytest
+
+import qpcr_analyzer
+from plate_benchmark import synthetic_plate
+
+@pytest.fixture(scope='module')
+def plate():
+    data = synthetic_plate(8, 40, seed=5)
+    return data, qpcr_analyzer.batch_analyze_wells(data)['individual_results']
+
+def analyze(data, priors, batch):
+    previous = qpcr_analyzer.BATCH_FIT_ENABLED
+    qpcr_analyzer.BATCH_FIT_ENABLED = batch
+    try:
+        return qpcr_analyzer.batch_analyze_wells(data, priors=priors)['individual_results']
+    finally:
+        qpcr_analyzer.BATCH_FIT_ENABLED = previous
+
+def shifted_priors(cold, offset):
+    return {well_id: [L, k, x0 + offset, B] for well_id, result in cold.items() if result['is_good_scurve']
+            for L, k, x0, B in [result['fit_parameters']]}
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_good_prior_warm_starts(plate, batch):
+    data, cold = plate
+    priors = shifted_priors(cold, 0.5)
+    warm = analyze(data, priors, batch)
+    assert any(warm[w].get('fit_start') == 'warm' for w in priors)
+    for well_id in priors:
+        assert warm[well_id]['midpoint'] == pytest.approx(cold[well_id]['midpoint'], abs=1e-3)
+
+@pytest.mark.parametrize('batch', [True, False])
+@pytest.mark.parametrize('offset', [-8, -5.5, 6, 8])
+def test_wrong_prior_falls_back_to_cold_fit(plate, batch, offset):
+    data, cold = plate
+    priors = shifted_priors(cold, offset)
+    assert priors
+    warm = analyze(data, priors, batch)
+    for well_id in priors:
+        # The true midpoint lies outside the prior's window, so only the cold fit can find it
+        assert warm[well_id].get('fit_start') != 'warm', well_id
+        assert warm[well_id]['midpoint'] == pytest.approx(cold[well_id]['midpoint'], abs=1e-3)
+        assert warm[well_id]['r2_score'] == pytest.approx(cold[well_id]['r2_score'], abs=1e-6)
@@ -0,0 +1,26 @@
+import pytest
+
+@pytest.mark.parametrize('sort', ['-upload_timestamp', 'r2_score', '-midpoint', 'amplitude', 'well_id'])
+def test_wells_pages_cover_every_well_once_in_order(stored_plates, follow, sort):
+    client, _ = stored_plates
+    first, pages = follow(client, f'/wells?sort={sort}&limit=7', first_args='include_total=1')
+    wells = [well for page in pages for well in page['wells']]
+    keys = [(well['session_id'], well['well_id']) for well in wells]
+    assert len(keys) == len(set(keys)) == first['total']
+    
+    name = sort.lstrip('-')
+    values = [well[name] for well in wells]
+    assert values == sorted(values, reverse=sort.startswith('-'))
+
+def test_wells_filters(stored_plates):
+    client, _ = stored_plates
+    reply = client.get('/wells?is_good_scurve=1&min_r2_score=0.99&limit=1000').get_json()
+    assert reply['wells']
+    assert all(w['is_good_scurve'] and w['r2_score'] >= 0.99 for w in reply['wells'])
+    assert client.get('/wells?sort=rfu').status_code == 400
+    assert client.get('/wells?min_midpoint=abc').status_code == 400
+
+def test_wells_cursor_belongs_to_its_sort(stored_plates):
+    client, _ = stored_plates
+    cursor = client.get('/wells?sort=r2_score&limit=3').get_json()['next_cursor']
+    assert client.get(f'/wells?sort=midpoint&cursor={cursor}').status_code == 400
@@ -0,0 +1,190 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select
+
+from models import db, AnalysisSession, WellResult
+
+# Page sizes of GET /wells
+WELLS_PAGE_SIZE = int(os.environ.get('QPCR_WELLS_PAGE_SIZE', 100))
+WELLS_MAX_PAGE_SIZE = 1000
+# Sessions one /wells/compare request may span
+COMPARE_MAX_SESSIONS = 1000
+
+# Indexed numeric columns: min_<name>/max_<name> filters (inclusive) and sorting
+RANGE_COLUMNS = {
+    'r2_score': WellResult.r2_score,
+    'midpoint': WellResult.midpoint,
+    'amplitude': WellResult.amplitude,
+    'steepness': WellResult.steepness
+}
+
+SORT_COLUMNS = {
+    **RANGE_COLUMNS,
+    'well_id': WellResult.well_id,
+    'upload_timestamp': AnalysisSession.upload_timestamp
+}
+
+# Scalar columns only; curve blobs are never read by the query
+WELL_FIELDS = [
+    ('is_good_scurve', WellResult.is_good_scurve),
+    ('r2_score', WellResult.r2_score),
+    ('rmse', WellResult.rmse),
+    ('amplitude', WellResult.amplitude),
+    ('steepness', WellResult.steepness),
+    ('midpoint', WellResult.midpoint),
+    ('baseline', WellResult.baseline),
+    ('ct_threshold', WellResult.ct_threshold),
+    ('ct_sdm', WellResult.ct_sdm),
+    ('efficiency', WellResult.efficiency),
+    ('data_points', WellResult.data_points),
+    ('fit_path', WellResult.fit_path)
+]
+
+def _id_list(value):
+    return [int(i) for i in value.split(',') if i]
+
+def session_conditions(args):
+    """Session selection shared by the well queries: session_ids=1,2,3, from/to (ISO dates) and assay"""
+    conditions = []
+    if args.get('session_ids'):
+        conditions.append(AnalysisSession.id.in_(_id_list(args['session_ids'])))
+    if args.get('from'):
+        conditions.append(AnalysisSession.upload_timestamp >= datetime.fromisoformat(args['from']))
+    if args.get('to'):
+        conditions.append(AnalysisSession.upload_timestamp <= datetime.fromisoformat(args['to']))
+    if args.get('assay'):
+        conditions.append(AnalysisSession.assay == args['assay'])
+    return conditions
+
+def well_conditions(args):
+    """Filters on well_results from query arguments; raises ValueError on malformed values"""
+    conditions = []
+    for name, column in RANGE_COLUMNS.items():
+        if args.get(f'min_{name}'):
+            conditions.append(column >= float(args[f'min_{name}']))
+        if args.get(f'max_{name}'):
+            conditions.append(column <= float(args[f'max_{name}']))
+    if args.get('is_good_scurve'):
+        conditions.append(WellResult.is_good_scurve.is_(args['is_good_scurve'].lower() not in ('0', 'false', 'no')))
+    if args.get('well_id'):
+        conditions.append(WellResult.well_id.in_([w for w in args['well_id'].split(',') if w]))
+    return conditions
+
+def parse_sort(value):
+    """(name, descending) from sort=<column> or sort=-<column>"""
+    name = (value or '-upload_timestamp').lstrip('-')
+    if name not in SORT_COLUMNS:
+        raise ValueError(f"cannot sort by '{name}'; use one of {', '.join(SORT_COLUMNS)}")
+    return name, value.startswith('-') if value else True
+
+def encode_well_cursor(sort_name, value, well_row_id):
+    """Opaque cursor pointing just past a well in the current sort order"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort_name, value, well_row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_well_cursor(cursor, sort_name):
+    name, value, well_row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    if name != sort_name:
+        raise ValueError('cursor belongs to another sort order')
+    if sort_name == 'upload_timestamp':
+        value = datetime.fromisoformat(value)
+    return value, int(well_row_id)
+
+def _well_dict(row):
+    return {
+        'session_id': row.session_id,
+        'filename': row.filename,
+        'assay': row.assay,
+        'upload_timestamp': row.upload_timestamp.isoformat(),
+        'well_id': row.well_id,
+        **{name: getattr(row, name) for name, _ in WELL_FIELDS},
+        'anomalies': json.loads(row.anomalies) if row.anomalies else []
+    }
+
+def query_wells(conditions, sort_name, descending, limit, cursor=None, include_total=False):
+    """One page of wells matching conditions, in sort order with the well row id as tie-breaker.
+    
+    Pagination is keyset-based, so deep pages cost the same as the first.
+    Wells without a value in the sort column are left out, since a NULL has
+    no place in the order. Returns (well dicts, next cursor or None, total
+    or None).
+    """
+    sort_column = SORT_COLUMNS[sort_name]
+    statement = (
+        select(WellResult.id, WellResult.session_id, WellResult.well_id, WellResult.anomalies,
+               AnalysisSession.filename, AnalysisSession.assay, AnalysisSession.upload_timestamp,
+               *(column for _, column in WELL_FIELDS))
+        .select_from(WellResult)
+        .join(AnalysisSession, WellResult.session_id == AnalysisSession.id)
+        .where(*conditions, sort_column.isnot(None))
+    )
+    
+    total = None
+    if include_total:
+        total = db.session.execute(select(func.count()).select_from(statement.subquery())).scalar()
+    
+    if cursor is not None:
+        value, well_row_id = cursor
+        if descending:
+            after = or_(sort_column < value, and_(sort_column == value, WellResult.id < well_row_id))
+        else:
+            after = or_(sort_column > value, and_(sort_column == value, WellResult.id > well_row_id))
+        statement = statement.where(after)
+    
+    order = (sort_column.desc(), WellResult.id.desc()) if descending else (sort_column.asc(), WellResult.id.asc())
+    rows = db.session.execute(statement.order_by(*order).limit(limit + 1)).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_well_cursor(sort_name, getattr(last, sort_name), last.id)
+    return [_well_dict(row) for row in rows], next_cursor, total
+
+def compare_well(well_id, conditions, max_sessions=COMPARE_MAX_SESSIONS):
+    """One well position across the selected sessions, as arrays aligned on the sessions in upload order.
+    
+    Entry i of every array belongs to session i; sessions without the well
+    have None there. Raises ValueError when more than max_sessions match.
+    """
+    sessions = db.session.execute(
+        select(AnalysisSession.id, AnalysisSession.filename, AnalysisSession.assay, AnalysisSession.upload_timestamp)
+        .where(*conditions)
+        .order_by(AnalysisSession.upload_timestamp, AnalysisSession.id)
+        .limit(max_sessions + 1)
+    ).all()
+    if len(sessions) > max_sessions:
+        raise ValueError(f'more than {max_sessions} sessions selected; narrow the selection')
+    
+    # The session filter goes in again as a subquery rather than as the ids found above
+    selected = select(AnalysisSession.id).where(*conditions)
+    wells = {
+        row.session_id: row for row in db.session.execute(
+            select(WellResult.session_id, WellResult.fit_parameters, *(column for _, column in WELL_FIELDS))
+            .where(WellResult.well_id == well_id, WellResult.session_id.in_(selected))
+        )
+    }
+    
+    aligned = [wells.get(session.id) for session in sessions]
+    values = {name: [getattr(row, name) if row is not None else None for row in aligned] for name, _ in WELL_FIELDS}
+    values['fit_parameters'] = [
+        row.fit_parameters.tolist() if row is not None and row.fit_parameters is not None else None for row in aligned
+    ]
+    return {
+        'well_id': well_id,
+        'count': len(sessions),
+        'found': sum(1 for row in aligned if row is not None),
+        'sessions': {
+            'session_id': [session.id for session in sessions],
+            'filename': [session.filename for session in sessions],
+            'assay': [session.assay for session in sessions],
+            'upload_timestamp': [session.upload_timestamp.isoformat() for session in sessions]
+        },
+        'wells': values
+    }